@@ -0,0 +1,216 @@
+"""Local JSON API over the dashboard's aggregates.
+
+Serves calculate_kpis, monthly_joiners_leavers, quarterly_growth and
+department_performance for a filter spec given as query parameters, so
+other internal tools can poll numbers instead of scraping the dashboard.
+Responses carry an ETag derived from the dataset version and the
+normalised query; a matching If-None-Match is answered with 304 without
+touching the data, and computed bodies are cached until the dataset
+version changes.
+
+Usage:
+    python api_server.py --port 8502
+
+    GET /kpis?departments=Corporate&departments=Tax&years=2024
+    GET /monthly?freq=Q&start_date=2023-01-01
+    GET /quarterly?offices=Chicago
+    GET /departments?as_of=2024-12-31
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, APP_DIR)
+
+import main as app  # noqa: E402  (the dashboard module; its UI only runs under `streamlit run`)
+
+LIST_PARAMS = ('years', 'attorneys', 'departments', 'offices')
+
+
+def parse_filters(query):
+    """Filter spec (see main.filter_rows) plus as_of / freq from parsed query parameters"""
+    filters = {}
+    for key in ('start_date', 'end_date'):
+        if query.get(key):
+            filters[key] = pd.Timestamp(query[key][-1])
+    for key in LIST_PARAMS:
+        # Repeated parameters (?departments=A&departments=B) or comma-separated years
+        values = [v for value in query.get(key, []) for v in (value.split(',') if key == 'years' else [value])]
+        if values:
+            filters[key] = sorted(int(v) for v in values) if key == 'years' else sorted(values)
+
+    as_of_date = pd.Timestamp(query['as_of'][-1]).normalize() if query.get('as_of') else None
+    freq = query.get('freq', ['M'])[-1].upper()
+    if freq not in app.PERIOD_GRANULARITIES.values():
+        raise ValueError(f"freq must be one of {sorted(app.PERIOD_GRANULARITIES.values())}")
+    return filters, as_of_date, freq
+
+
+def to_json_value(value):
+    """Plain JSON scalars (NaN becomes null)"""
+    if isinstance(value, (np.integer,)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return None if np.isnan(value) else float(value)
+    return value
+
+
+def frame_records(df):
+    """DataFrame rows as JSON-ready records (dates as ISO strings, periods as labels)"""
+    if df is None or df.empty:
+        return []
+    df = df.assign(**{col: df[col].astype(str) for col in df.columns if isinstance(df[col].dtype, pd.PeriodDtype)})
+    return json.loads(df.to_json(orient='records', date_format='iso'))
+
+
+ENDPOINTS = {
+    '/kpis': lambda df, freq: {k: to_json_value(v) for k, v in app.calculate_kpis(df).items()},
+    '/monthly': lambda df, freq: frame_records(app.monthly_joiners_leavers(df, freq)),
+    '/quarterly': lambda df, freq: frame_records(app.quarterly_growth(df)),
+    '/departments': lambda df, freq: frame_records(app.department_performance(df))
+}
+
+
+class ResponseCache:
+    """Thread-safe LRU of rendered bodies for the current dataset version"""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self.version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, version, key):
+        with self._lock:
+            if version != self.version:
+                # A new dataset version invalidates every cached response
+                self.version = version
+                self._entries.clear()
+                return None
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, version, key, body):
+        with self._lock:
+            if version != self.version:
+                return
+            self._entries[key] = body
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class DatasetHolder:
+    """The shared dataset, reloaded after `ttl` seconds like the dashboard's cache_resource"""
+
+    def __init__(self, ttl=3600):
+        self.ttl = ttl
+        self._dataset = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._dataset is None or time.monotonic() - self._loaded_at > self.ttl:
+                # Not fingerprinted: the dashboard's changelog diffs against its own last load
+                self._dataset = app.build_shared_dataset(record_changes=False)
+                self._loaded_at = time.monotonic()
+            return self._dataset
+
+
+class AggregateHandler(BaseHTTPRequestHandler):
+    cache = ResponseCache()
+    datasets = DatasetHolder()
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path not in ENDPOINTS:
+            return self.send_json(404, {'error': f"unknown endpoint {url.path}", 'endpoints': sorted(ENDPOINTS)})
+
+        try:
+            filters, as_of_date, freq = parse_filters(parse_qs(url.query))
+        except ValueError as e:
+            return self.send_json(400, {'error': str(e)})
+
+        dataset = self.datasets.get()
+        if as_of_date is not None and dataset['as_of_index'] is None:
+            return self.send_json(400, {'error': "as_of is not available: the dataset has no start dates"})
+        # The ETag only depends on the dataset version and the normalised request
+        canonical = json.dumps([url.path, filters, as_of_date, freq], default=str, sort_keys=True)
+        etag = '"' + hashlib.sha1(f"{dataset['version']}|{canonical}".encode('utf-8')).hexdigest()[:20] + '"'
+        if etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        body = self.cache.get(dataset['version'], canonical)
+        if body is None:
+            roster = dataset['frame']
+            if as_of_date is not None:
+                roster = app.as_of(dataset['as_of_index'], as_of_date)['roster']
+            df = app.filtered_view(roster, app.filter_rows(roster, filters))
+            payload = {
+                'dataset_version': dataset['version'],
+                'as_of': as_of_date.date().isoformat() if as_of_date is not None else None,
+                'filters': filters,
+                'data': ENDPOINTS[url.path](df, freq)
+            }
+            body = json.dumps(payload, default=str).encode('utf-8')
+            self.cache.put(dataset['version'], canonical, body)
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.getLogger('api_server').info("%s %s", self.address_string(), format % args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--ttl", type=int, default=3600, help="seconds before the dataset is reloaded")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    AggregateHandler.datasets = DatasetHolder(args.ttl)
+    server = ThreadingHTTPServer((args.host, args.port), AggregateHandler)
+    print(f"Serving aggregates on http://{args.host}:{args.port} ({', '.join(sorted(ENDPOINTS))})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
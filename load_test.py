@@ -0,0 +1,279 @@
+"""Concurrent-session load test for the Joiners & Leavers dashboard.
+
+Drives N simulated sessions through Streamlit's AppTest against the
+synthetic dataset (no network needed): login via check_password, filter
+changes, per-tab interactions and CSV downloads. Each session runs in its
+own process (AppTest keeps per-run state in process-wide singletons, so
+sessions cannot share one), all started together. Reports p50/p95/p99
+rerun latency, throughput and peak RSS, and exits non-zero when a session
+fails or a latency budget is exceeded so it can gate releases.
+
+Usage:
+    python load_test.py --sessions 20 --iterations 5 --max-p95 2.0
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(APP_DIR, "main.py")
+PASSWORD = "joiners2025"
+
+
+def install_shared_runtime():
+    """Give a session process one mock runtime that outlives its AppTest runs.
+
+    AppTest installs a fresh mock Runtime singleton for each run and clears it
+    when the run ends, along with the media files the download buttons point
+    at. Its per-run swaps are redirected to a private subclass, and one mock
+    (with a real in-memory media file manager and cache storage) is installed
+    as the process singleton instead. Only safe with one AppTest run at a time
+    in the process, which is why every session has its own process.
+    """
+    from unittest.mock import MagicMock
+
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.testing.v1 import app_test
+
+    class PerRunRuntimeSlot(Runtime):
+        pass
+
+    app_test.Runtime = PerRunRuntimeSlot
+
+    storage = MemoryMediaFileStorage("/mock/media")
+    shared_runtime = MagicMock(spec=Runtime)
+    shared_runtime.media_file_mgr = MediaFileManager(storage)
+    shared_runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = shared_runtime
+    return storage
+
+
+def widget(at, kind, label):
+    """Find a widget by label in the current element tree (None if not rendered)"""
+    for element in getattr(at, kind):
+        if element.label == label:
+            return element
+    return None
+
+
+def timed_run(at, samples, action):
+    """Rerun the app and record the latency of this action"""
+    started = time.perf_counter()
+    at.run()
+    samples.append((action, time.perf_counter() - started, len(at.exception)))
+
+
+def login(at, samples, failures):
+    """Log in through check_password's sidebar form; False (with a failure recorded) if the form is missing"""
+    timed_run(at, samples, "initial load")
+    password = widget(at, "text_input", "Enter Password")
+    button = widget(at, "button", "Login")
+    if password is None or button is None:
+        failures.append("login form not rendered")
+        return False
+    password.input(PASSWORD)
+    button.click()
+    timed_run(at, samples, "login")
+    return True
+
+
+def change_filters(at, samples, rng):
+    """Pick random department / office / attorney / year selections"""
+    search = widget(at, "text_input", "Find Attorney")
+    if search is not None and rng.random() < 0.5:
+        # Attorney options come from the search box, a keystroke at a time
+        search.input(rng.choice("abcdefghijklmnoprstw"))
+        timed_run(at, samples, "attorney search")
+
+    for label in ("Department", "Office", "Attorney"):
+        multiselect = widget(at, "multiselect", label)
+        if multiselect is not None and multiselect.options and rng.random() < 0.5:
+            multiselect.set_value(rng.sample(multiselect.options, k=1))
+            timed_run(at, samples, f"filter {label.lower()}")
+
+    year = widget(at, "multiselect", "Year")
+    if year is not None and len(year.options) > 1:
+        year.set_value(rng.sample(year.options, k=rng.randint(1, len(year.options))))
+        timed_run(at, samples, "filter year")
+
+
+def clear_filters(at, samples):
+    """Reset the multiselect filters to their defaults"""
+    for label in ("Department", "Office", "Attorney"):
+        multiselect = widget(at, "multiselect", label)
+        if multiselect is not None and multiselect.value:
+            multiselect.set_value([])
+            timed_run(at, samples, "clear filters")
+    year = widget(at, "multiselect", "Year")
+    if year is not None and year.value != year.options:
+        year.set_value(year.options)
+        timed_run(at, samples, "clear filters")
+
+
+def switch_tabs(at, samples, rng):
+    """Interact with widgets inside the tabs (tab clicks alone do not rerun the script)"""
+    granularity = widget(at, "radio", "Granularity")
+    if granularity is not None:
+        granularity.set_value(rng.choice(granularity.options))
+        timed_run(at, samples, "trends granularity")
+
+    breakdown = widget(at, "selectbox", "Headcount by")
+    if breakdown is not None and breakdown.options:
+        breakdown.set_value(rng.choice(breakdown.options))
+        timed_run(at, samples, "headcount breakdown")
+
+    as_of = widget(at, "date_input", "As of")
+    if as_of is not None:
+        today = datetime.date.today()
+        as_of.set_value(today if rng.random() < 0.5 else datetime.date(today.year - 1, 12, 31))
+        timed_run(at, samples, "as of date")
+
+
+def download(at, samples, storage):
+    """Fetch the filtered-data CSV the download button points at"""
+    for element in at.sidebar:
+        if getattr(element, "type", None) == "download_button":
+            started = time.perf_counter()
+            content = storage.get_file(os.path.basename(element.proto.url)).content
+            samples.append(("download", time.perf_counter() - started, 0 if content else 1))
+
+
+def run_session(session_id, iterations, seed, rows, start_at):
+    """Script one user session in this process.
+
+    Returns {'samples': (action, seconds, errors) tuples, 'failures'
+    (messages for a session that could not be scripted to the end),
+    'started' / 'finished' (wall-clock seconds of the scripted part) and
+    'peak_rss_bytes'}. The dataset and caches are warmed before `start_at`,
+    when every session starts together.
+    """
+    # Offline, synthetic data (the same in every session); main.py imports sibling modules
+    os.environ["JOINERS_LEAVERS_DATA"] = "synthetic"
+    os.environ["JOINERS_LEAVERS_SAMPLE_ROWS"] = str(rows)
+    sys.path.insert(0, APP_DIR)
+    np.random.seed(seed)
+
+    from streamlit.testing.v1 import AppTest
+
+    storage = install_shared_runtime()
+    AppTest.from_file(APP_PATH, default_timeout=300).run()
+    time.sleep(max(start_at - time.time(), 0))
+
+    rng = random.Random(seed + session_id)
+    samples, failures = [], []
+    started = time.time()
+    try:
+        at = AppTest.from_file(APP_PATH, default_timeout=300)
+        if login(at, samples, failures):
+            for _ in range(iterations):
+                change_filters(at, samples, rng)
+                switch_tabs(at, samples, rng)
+                download(at, samples, storage)
+                clear_filters(at, samples)
+    except Exception as e:
+        failures.append(f"{type(e).__name__}: {e}")
+    finished = time.time()
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "samples": samples,
+        "failures": failures,
+        "started": started,
+        "finished": finished,
+        "peak_rss_bytes": max_rss if sys.platform == "darwin" else max_rss * 1024
+    }
+
+
+def summarize(samples, failures, elapsed, peak_rss_bytes):
+    """Latency percentiles (overall and per action), throughput and the largest session process's peak RSS"""
+    reruns = np.array([seconds for action, seconds, _ in samples if action != "download"])
+    report = {
+        "reruns": int(reruns.size),
+        "errors": int(sum(errors for _, _, errors in samples)),
+        "failed_sessions": failures,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_reruns_per_second": round(reruns.size / elapsed, 3) if elapsed > 0 else 0.0,
+        "latency_seconds": {
+            f"p{q}": round(float(np.percentile(reruns, q)), 4) for q in (50, 95, 99)
+        } if reruns.size else {},
+        "peak_rss_mb": round(peak_rss_bytes / 1024 ** 2, 1),
+        "actions": {}
+    }
+    for action in sorted({action for action, _, _ in samples}):
+        seconds = np.array([s for a, s, _ in samples if a == action])
+        report["actions"][action] = {
+            "count": int(seconds.size),
+            "p50": round(float(np.percentile(seconds, 50)), 4),
+            "p95": round(float(np.percentile(seconds, 95)), 4)
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20, help="concurrent simulated sessions")
+    parser.add_argument("--iterations", type=int, default=3, help="filter/tab/download rounds per session")
+    parser.add_argument("--rows", type=int, default=100, help="rows in the synthetic dataset")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--max-p95", type=float, help="fail if p95 rerun latency exceeds this many seconds")
+    parser.add_argument("--max-p99", type=float, help="fail if p99 rerun latency exceeds this many seconds")
+    args = parser.parse_args()
+
+    # Sessions start together once every process has loaded the app (a minute's allowance,
+    # plus more for larger runs); fresh interpreters, so no state leaks in from this one
+    start_at = time.time() + 60 + args.sessions * 2
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=args.sessions, mp_context=context) as pool:
+        futures = [pool.submit(run_session, i, args.iterations, args.seed, args.rows, start_at)
+                   for i in range(args.sessions)]
+        sessions = []
+        for future in futures:
+            try:
+                sessions.append(future.result())
+            except Exception as e:
+                # A session process that died outright
+                sessions.append({"samples": [], "failures": [f"{type(e).__name__}: {e}"],
+                                 "started": start_at, "finished": start_at, "peak_rss_bytes": 0})
+    samples = [sample for session in sessions for sample in session["samples"]]
+    session_failures = [f"session {i}: {failure}" for i, session in enumerate(sessions) for failure in session["failures"]]
+    elapsed = max(session["finished"] for session in sessions) - min(session["started"] for session in sessions)
+
+    report = summarize(samples, session_failures, elapsed, max(session["peak_rss_bytes"] for session in sessions))
+    report["sessions"] = args.sessions
+    report["rows"] = args.rows
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failures = []
+    if report["failed_sessions"]:
+        failures.append(f"{len(report['failed_sessions'])} sessions failed")
+    if report["errors"]:
+        failures.append(f"{report['errors']} runs raised exceptions")
+    latency = report["latency_seconds"]
+    if args.max_p95 is not None and latency.get("p95", 0) > args.max_p95:
+        failures.append(f"p95 latency {latency['p95']}s exceeds {args.max_p95}s")
+    if args.max_p99 is not None and latency.get("p99", 0) > args.max_p99:
+        failures.append(f"p99 latency {latency['p99']}s exceeds {args.max_p99}s")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
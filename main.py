@@ -3,13 +3,29 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 from plotly.subplots import make_subplots
 import datetime
 from dateutil.relativedelta import relativedelta
 import requests
-from io import StringIO
+from io import StringIO, BytesIO
 import calendar
 import re
+import bisect
+import unicodedata
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from functools import partial
+
+from simulation import tenure_hazard, simulate_revenue_at_risk
+import sqlite_store
+import snapshot_store
 
 # Set page configuration
 st.set_page_config(
@@ -123,36 +139,542 @@ def check_password():
     return False
 
 # Data loading and processing
-@st.cache_data(ttl=3600, show_spinner=False)
+def workbook_path():
+    """Path of the source workbook (JOINERS_LEAVERS_WORKBOOK, else a local 2023_Joiners_Leavers.xlsx)"""
+    path = os.environ.get('JOINERS_LEAVERS_WORKBOOK') or '2023_Joiners_Leavers.xlsx'
+    return path if os.path.exists(path) else None
+
+def read_workbook(path, title_rows=20):
+    """Stream the export blocks out of the source workbook into the raw layout parse_export reads.
+    
+    The workbook is opened read-only with cached values (no formula is
+    re-evaluated) and read one row at a time. Only sheets with a block
+    header row are used, and of those only the header rows, the attorney
+    and Totals rows below them, and the few rows above each header that
+    can hold its block title. Each kept row keeps only the block's name
+    columns and labelled columns (numeric per-month flag columns are
+    dropped), so memory follows the cells used rather than the sheet's
+    used range. The Billings / Collections toggle the workbook was saved
+    with is recorded in df.attrs['basis'].
+    """
+    import openpyxl
+    
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    kept, basis = [], None
+    try:
+        for sheet in workbook.worksheets:
+            recent = deque(maxlen=title_rows)
+            block_columns = None
+            for values in sheet.iter_rows(values_only=True):
+                cells = {j: value for j, value in enumerate(values)
+                         if value is not None and not (isinstance(value, str) and not value.strip())}
+                if not cells:
+                    continue
+                texts = [value.strip() for value in cells.values() if isinstance(value, str)]
+                if basis is None and any('toggle' in text.lower() for text in texts):
+                    basis = next((text for text in texts if text in ('Billings', 'Collections')), None)
+                
+                if any(text in EXPORT_HEADER_LABELS for text in texts):
+                    # A block header: its name columns come before the first label
+                    labels = {j: value for j, value in cells.items()
+                              if not isinstance(value, (int, float)) or isinstance(value, bool)}
+                    first_label = min(labels)
+                    titles = ({j: value for j, value in row.items() if j < first_label} for row in recent)
+                    kept.extend(row for row in titles if row)
+                    recent.clear()
+                    kept.append(labels)
+                    block_columns = set(labels) | set(range(first_label))
+                    continue
+                
+                if block_columns is not None:
+                    row = {j: value for j, value in cells.items() if j in block_columns}
+                    if row:
+                        kept.append(row)
+                    # The block ends at its Totals row; later rows may hold the next block's title
+                    if any(isinstance(value, str) and value.strip().lower() in ('total', 'totals')
+                           for j, value in row.items() if j < first_label):
+                        block_columns = None
+                else:
+                    recent.append(cells)
+    finally:
+        workbook.close()
+    
+    columns = sorted({j for row in kept for j in row})
+    position = {j: k for k, j in enumerate(columns)}
+    raw = np.full((len(kept), len(columns)), None, dtype=object)
+    for i, row in enumerate(kept):
+        for j, value in row.items():
+            raw[i, position[j]] = value
+    df = pd.DataFrame(raw, columns=[f"Unnamed: {j}" for j in columns])
+    df.attrs['basis'] = basis
+    return df
+
 def load_data():
+    """Load and clean the dataset; the source used is recorded in df.attrs['source']"""
     try:
-        # First try to load data from GitHub
+        # Synthetic data can be forced (e.g. for offline load tests) with
+        # JOINERS_LEAVERS_DATA=synthetic and an optional JOINERS_LEAVERS_SAMPLE_ROWS
+        if os.environ.get('JOINERS_LEAVERS_DATA') == 'synthetic':
+            df = clean_data(create_sample_data(int(os.environ.get('JOINERS_LEAVERS_SAMPLE_ROWS', 100))))
+            df.attrs['source'] = 'synthetic'
+            return df
+        
+        # The source workbook, when available, is read directly instead of its CSV export
+        path = workbook_path()
+        if path:
+            try:
+                raw = read_workbook(path)
+                df = clean_data(raw)
+                df.attrs['source'] = 'workbook'
+                df.attrs['basis'] = raw.attrs['basis']
+                return df
+            except Exception as e:
+                workbook_error = f"Could not read {path}: {e}"
+        else:
+            workbook_error = None
+        
+        # Then try to load data from GitHub
         url = "https://raw.githubusercontent.com/username/repository/main/2023_Joiners_Leavers.csv"
         try:
             response = requests.get(url)
             response.raise_for_status()  # Raise an exception for 4XX/5XX responses
             data = StringIO(response.text)
             df = pd.read_csv(data)
-            st.toast("✅ Data successfully loaded from GitHub")
+            source = 'github'
         except:
             # If GitHub fails, try to load from local file
             try:
                 df = pd.read_csv("2023_Joiners_Leavers.csv")
-                st.toast("✅ Data loaded from local file")
+                source = 'local'
             except:
                 # Create sample data for demo purposes
-                st.warning("⚠️ Could not load data from GitHub or local file. Using sample data.")
                 df = create_sample_data()
+                source = 'sample'
                 
         # Clean and preprocess data
         df = clean_data(df)
+        df.attrs['source'] = source
+        if workbook_error:
+            df.attrs['error'] = workbook_error
         return df
     
     except Exception as e:
-        st.error(f"Error loading data: {e}")
-        return create_sample_data()
+        df = clean_data(create_sample_data())
+        df.attrs['source'] = 'sample'
+        df.attrs['error'] = str(e)
+        return df
+
+def dataset_version(df):
+    """Content fingerprint of a cleaned dataset, used as the cache key for derived results"""
+    row_hashes = pd.util.hash_pandas_object(df, index=True).to_numpy()
+    column_key = '|'.join(map(str, df.columns)).encode('utf-8')
+    return hashlib.sha1(row_hashes.tobytes() + column_key).hexdigest()[:16]
+
+def freeze_frame(df):
+    """Rebuild a frame on read-only arrays so that no session can modify shared data in place"""
+    columns = {}
+    for col in df.columns:
+        values = df[col].to_numpy(copy=True)
+        values.flags.writeable = False
+        columns[col] = values
+    frozen = pd.DataFrame(columns, index=df.index, copy=False)
+    frozen.attrs.update(df.attrs)
+    return frozen
+
+def ingest_dataset():
+    """Load, clean and dimension-map the export into a read-only frame"""
+    return freeze_frame(join_dimension_mapping(load_data()))
+
+def current_mapping_version():
+    """Content version of the mapping file in effect (None without one, or when it cannot be read)"""
+    path = mapping_path()
+    if path is None:
+        return None
+    try:
+        return load_mapping(path, file_signature(path))['version']
+    except Exception:
+        # join_dimension_mapping reports the error and falls back to the unmapped roster
+        return None
+
+def dataset_is_stale(dataset):
+    """Whether a newer snapshot was published or the mapping file changed since the dataset was loaded"""
+    if (dataset['mapping'] or {}).get('version') != current_mapping_version():
+        return True
+    path = snapshot_path()
+    return bool(path) and snapshot_store.snapshot_version(path) not in (None, dataset['version'])
+
+def build_shared_dataset(record_changes=True):
+    """Load and freeze the dataset with everything derived from it once per load.
+    
+    With a snapshot file configured (JOINERS_LEAVERS_SNAPSHOT) the frame and
+    its billing prefix sums are mapped read-only from the snapshot, which the
+    first process to start writes when it does not exist yet (or rewrites
+    when it was built against a different dimension mapping file).
+    
+    Returns a dict with the read-only cleaned 'frame', its content 'version'
+    (the cache key for everything derived from it), the point-in-time
+    'as_of_index', the 'attorney_index' for profile lookups, the
+    'name_index' behind the attorney search boxes, the 'sort_index' behind
+    the paginated tables, the data 'source', the ingestion 'validation'
+    report, the dimension 'mapping' coverage and the 'changes' since the
+    previous dataset version (None on the first load). Other readers of the
+    data pass record_changes=False so that the load is not fingerprinted
+    and the dashboard's changelog baseline stays where it was.
+    """
+    path = snapshot_path()
+    if path:
+        header = snapshot_store.read_header(path)
+        if header is None or (header['attrs'].get('mapping') or {}).get('version') != current_mapping_version():
+            df = ingest_dataset()
+            write_dataset_snapshot(df, path, dataset_version(df))
+        df, arrays, version = snapshot_store.read_snapshot(path)
+        as_of_index = build_as_of_index(df, billings=(arrays['month_ordinals'], arrays['cumulative_billings']))
+    else:
+        df = ingest_dataset()
+        version = dataset_version(df)
+        as_of_index = build_as_of_index(df)
+    changes = dataset_changes(df) if record_changes else None
+    return {
+        'frame': df,
+        'version': version,
+        'as_of_index': as_of_index,
+        'attorney_index': build_attorney_index(df, as_of_index),
+        'name_index': build_name_index(df),
+        'sort_index': build_sort_index(df),
+        'source': df.attrs.get('source'),
+        'error': df.attrs.get('error'),
+        'basis': df.attrs.get('basis'),
+        'validation': df.attrs.get('validation'),
+        'mapping': df.attrs.get('mapping'),
+        'changes': changes
+    }
+
+@st.cache_resource(ttl=3600, show_spinner=False)
+def load_shared_dataset():
+    """Load the dataset once per process; every session reads the same immutable object"""
+    return build_shared_dataset()
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def cached_as_of(_dataset, version, date):
+    """Point-in-time roster shared by every session looking at the same date"""
+    result = as_of(_dataset['as_of_index'], date)
+    result['roster'] = freeze_frame(result['roster'])
+    result['ordinals'] = event_ordinals(result['roster'])
+    for ordinals in result['ordinals'].values():
+        for values in ordinals.values():
+            values.flags.writeable = False
+    result['cube'] = build_cube(result['roster'], result['ordinals'])
+    result['sort_index'] = build_sort_index(result['roster'])
+    return result
+
+def shared_as_of(dataset, date):
+    """Shared as-of view of the dataset for a date"""
+    return cached_as_of(dataset, dataset['version'], pd.Timestamp(date).normalize())
+
+def filtered_view(frame, rows):
+    """Materialise a filtered view from row positions (the full frame itself when nothing is filtered)"""
+    if len(rows) == len(frame):
+        return frame
+    return frame.take(rows)
+
+def view_key(dataset, as_of_date, rows):
+    """Cache key of a filtered view: dataset version, as-of date and a digest of the row positions"""
+    return f"{dataset['version']}:{as_of_date}:{hashlib.sha1(np.asarray(rows, dtype=np.int64).tobytes()).hexdigest()}"
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def shared_filtered_view(_frame, key, _rows):
+    """Read-only filtered view, materialised once per distinct row set (see view_key).
+    
+    Sessions keep only their row positions; reruns and sessions with the
+    same filters reuse one frame instead of each copying the rows again.
+    """
+    if len(_rows) == len(_frame):
+        return _frame
+    return freeze_frame(_frame.take(_rows))
+
+def filter_rows(frame, filters):
+    """Row positions matching a filter spec (the in-memory twin of sqlite_store.compile_filters).
+    
+    Keys: 'start_date' / 'end_date' (inclusive bounds on Start Date), and
+    'years', 'attorneys', 'departments', 'offices' (value lists).
+    """
+    mask = np.ones(len(frame), dtype=bool)
+    if 'Start Date' in frame.columns:
+        start_dates = frame['Start Date'].to_numpy()
+        if filters.get('start_date') is not None:
+            mask &= start_dates >= pd.Timestamp(filters['start_date']).to_datetime64()
+        if filters.get('end_date') is not None:
+            mask &= start_dates <= pd.Timestamp(filters['end_date']).to_datetime64()
+    for key, col in (('years', 'Start Year'), ('attorneys', 'Attorney Name'),
+                     ('departments', 'Department'), ('offices', 'Office')):
+        if filters.get(key) and col in frame.columns:
+            mask &= frame[col].isin(filters[key]).to_numpy()
+    return np.flatnonzero(mask)
+
+def snapshot_path():
+    """Path of the optional memory-mapped dataset snapshot (JOINERS_LEAVERS_SNAPSHOT) shared by worker processes"""
+    return os.environ.get('JOINERS_LEAVERS_SNAPSHOT') or None
+
+def write_dataset_snapshot(df, path, version):
+    """Publish the frame and its cumulative billings matrix as a snapshot for every worker to map"""
+    billings, month_ordinals = billing_matrix(df)
+    cumulative_billings = np.zeros((len(df), len(month_ordinals) + 1))
+    np.cumsum(billings, axis=1, out=cumulative_billings[:, 1:])
+    return snapshot_store.write_snapshot(df, path, version, {
+        'month_ordinals': month_ordinals,
+        'cumulative_billings': cumulative_billings
+    })
+
+# Load-to-load change tracking
+# Tenure is measured to today, so it changes on every load without the data changing
+FINGERPRINT_VOLATILE = ['Tenure Months']
+
+# Columns whose previous values are kept so the changelog can show before and after
+FINGERPRINT_VALUES = ['Start Date', 'Leave Date', 'Estimated Book', 'Department', 'Office', 'Practice Group']
+
+def fingerprint_path():
+    """Directory keeping the last two load fingerprints (JOINERS_LEAVERS_FINGERPRINTS); unset keeps them in-process"""
+    return os.environ.get('JOINERS_LEAVERS_FINGERPRINTS') or None
+
+def dataset_fingerprint(df):
+    """Per-row and per-cell content hashes of a cleaned load, keyed by attorney and section.
+    
+    Keys are the normalised attorney name, the export block ('section') and
+    the occurrence within both, so every row has a unique key. 'cells'
+    holds one hash per row and content column (every billing month is its
+    own column) and 'row_hash' combines them, so unchanged rows are skipped
+    with one comparison. 'version' hashes the keys, columns and row hashes:
+    unlike dataset_version it leaves out FINGERPRINT_VOLATILE, so a reload
+    of the same export on a later day keeps the same fingerprint version.
+    """
+    names = df['Attorney Name'].fillna('').astype(str) if 'Attorney Name' in df.columns else pd.Series('', index=df.index)
+    sections = df['Block'].fillna('').astype(str) if 'Block' in df.columns else pd.Series('', index=df.index)
+    base = names.map(normalise_name) + '|' + sections
+    keys = base + '|' + base.groupby(base).cumcount().astype(str)
+    
+    columns = [str(col) for col in df.columns if col not in FINGERPRINT_VOLATILE]
+    cells = np.column_stack([pd.util.hash_pandas_object(df[col], index=False).to_numpy() for col in columns]) \
+        if columns else np.zeros((len(df), 0), dtype=np.uint64)
+    
+    frame = pd.DataFrame({'Key': keys.to_numpy(), 'Attorney Name': names.to_numpy(), 'Section': sections.to_numpy()})
+    for col in FINGERPRINT_VALUES:
+        if col in df.columns:
+            frame[col] = df[col].to_numpy()
+    
+    row_hash = pd.util.hash_pandas_object(pd.DataFrame(cells), index=False).to_numpy()
+    key_hash = pd.util.hash_pandas_object(frame['Key'], index=False).to_numpy()
+    version = hashlib.sha1(key_hash.tobytes() + row_hash.tobytes() + '|'.join(columns).encode('utf-8')).hexdigest()[:16]
+    
+    return {
+        'frame': frame,
+        'row_hash': row_hash,
+        'cells': cells,
+        'columns': columns,
+        'version': version,
+        'loaded_at': datetime.datetime.now().isoformat(timespec='seconds')
+    }
+
+def write_fingerprint(fingerprint, path):
+    """Store a fingerprint in the snapshot file format (skipped when the file holds the same version)"""
+    frame = fingerprint['frame'].copy()
+    frame.attrs = {'columns': fingerprint['columns'], 'loaded_at': fingerprint['loaded_at']}
+    snapshot_store.write_snapshot(frame, path, fingerprint['version'], {
+        'row_hash': fingerprint['row_hash'],
+        'cells': fingerprint['cells']
+    })
+
+def read_fingerprint(path):
+    """Map a stored fingerprint (None if there is none)"""
+    if snapshot_store.snapshot_version(path) is None:
+        return None
+    frame, arrays, version = snapshot_store.read_snapshot(path)
+    return {
+        'frame': frame,
+        'row_hash': arrays['row_hash'],
+        'cells': arrays['cells'],
+        'columns': frame.attrs['columns'],
+        'version': version,
+        'loaded_at': frame.attrs['loaded_at']
+    }
+
+@st.cache_resource(show_spinner=False)
+def fingerprint_history():
+    """In-process fingerprints of the current and previous content versions"""
+    return {}
+
+def record_fingerprint(fingerprint):
+    """Remember a load's fingerprint; returns (previous, current) for the last two content versions.
+    
+    Reloading the same content (see dataset_fingerprint) keeps the stored
+    fingerprint and its load time, so the changes shown stay those of the
+    last real change.
+    """
+    directory = fingerprint_path()
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        current_path = os.path.join(directory, 'current.fingerprint')
+        previous_path = os.path.join(directory, 'previous.fingerprint')
+        if snapshot_store.snapshot_version(current_path) not in (None, fingerprint['version']):
+            os.replace(current_path, previous_path)
+        write_fingerprint(fingerprint, current_path)
+        return read_fingerprint(previous_path), read_fingerprint(current_path)
+    
+    history = fingerprint_history()
+    current = history.get('current')
+    if current is None or current['version'] != fingerprint['version']:
+        if current is not None:
+            history['previous'] = current
+        history['current'] = fingerprint
+    return history.get('previous'), history['current']
+
+def format_change_value(value):
+    """Changelog cell text for a before / after value"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ''
+    if isinstance(value, (pd.Timestamp, datetime.date, np.datetime64)):
+        return f"{pd.Timestamp(value):%Y-%m-%d}"
+    if isinstance(value, (float, np.floating)):
+        return f"{value:,.2f}"
+    return str(value)
+
+def diff_fingerprints(previous, current, frame):
+    """Changelog between two loads in O(n): one hash lookup per row, cells compared only for changed rows.
+    
+    `frame` is the current load. Changes are 'New joiner' / 'New leaver'
+    (rows added), 'Removed', 'Left' (a leave date appeared), 'Estimate
+    revised', 'Billings restated' (a month present in both loads changed)
+    and 'Updated' for any other field. Months only one of the loads carries
+    are not restatements. Before is known for the FINGERPRINT_VALUES
+    columns; restated months show the new amount.
+    """
+    previous_keys = previous['frame']['Key'].to_numpy()
+    current_keys = current['frame']['Key'].to_numpy()
+    rows = pd.Index(previous_keys).get_indexer(current_keys)
+    entries = []
+    
+    added = np.flatnonzero(rows < 0)
+    if len(added):
+        leave_dates = frame['Leave Date'].to_numpy()[added] if 'Leave Date' in frame.columns else np.full(len(added), np.datetime64('NaT'))
+        entries.append(pd.DataFrame({
+            'Attorney Name': current['frame']['Attorney Name'].to_numpy()[added],
+            'Section': current['frame']['Section'].to_numpy()[added],
+            'Change': np.where(pd.isna(leave_dates), 'New joiner', 'New leaver'),
+            'Field': '',
+            'Before': '',
+            'After': [format_change_value(value) for value in leave_dates]
+        }))
+    
+    removed = np.ones(len(previous_keys), dtype=bool)
+    removed[rows[rows >= 0]] = False
+    removed = np.flatnonzero(removed)
+    if len(removed):
+        entries.append(pd.DataFrame({
+            'Attorney Name': previous['frame']['Attorney Name'].to_numpy()[removed],
+            'Section': previous['frame']['Section'].to_numpy()[removed],
+            'Change': 'Removed',
+            'Field': '',
+            'Before': '',
+            'After': ''
+        }))
+    
+    # Matched rows whose content hash moved; compare their cells over the columns both loads have
+    changed = np.flatnonzero((rows >= 0) & (current['row_hash'] != previous['row_hash'][np.maximum(rows, 0)]))
+    previous_columns = {col: i for i, col in enumerate(previous['columns'])}
+    common = [(i, previous_columns[col], col) for i, col in enumerate(current['columns']) if col in previous_columns]
+    if len(changed) and common:
+        current_positions, previous_positions, names = zip(*common)
+        differs = (current['cells'][np.ix_(changed, current_positions)] !=
+                   previous['cells'][np.ix_(rows[changed], previous_positions)])
+        for j, col in enumerate(names):
+            hit = changed[differs[:, j]]
+            if not len(hit):
+                continue
+            before = previous['frame'][col].to_numpy()[rows[hit]] if col in previous['frame'].columns else np.full(len(hit), None)
+            if col == 'Leave Date':
+                change = np.where(pd.isna(before), 'Left', 'Updated')
+            elif col == 'Estimated Book':
+                change = 'Estimate revised'
+            elif BILLING_MONTH_PATTERN.match(col):
+                change = 'Billings restated'
+            else:
+                change = 'Updated'
+            entries.append(pd.DataFrame({
+                'Attorney Name': current['frame']['Attorney Name'].to_numpy()[hit],
+                'Section': current['frame']['Section'].to_numpy()[hit],
+                'Change': change,
+                'Field': col[:10] if BILLING_MONTH_PATTERN.match(col) else col,
+                'Before': [format_change_value(value) for value in before],
+                'After': [format_change_value(value) for value in frame[col].to_numpy()[hit]]
+            }))
+    
+    if not entries:
+        return pd.DataFrame(columns=['Attorney Name', 'Section', 'Change', 'Field', 'Before', 'After'])
+    return pd.concat(entries, ignore_index=True)
+
+def dataset_changes(df):
+    """Fingerprint a load and diff it against the previous content version (None on the first load)"""
+    previous, current = record_fingerprint(dataset_fingerprint(df))
+    if previous is None:
+        return None
+    return {
+        'since': previous['loaded_at'],
+        'loaded_at': current['loaded_at'],
+        'changelog': diff_fingerprints(previous, current, df)
+    }
+
+def sqlite_store_path():
+    """Path of the optional SQLite store (JOINERS_LEAVERS_SQLITE); unset keeps filtering in pandas"""
+    return os.environ.get('JOINERS_LEAVERS_SQLITE') or None
+
+@st.cache_resource(show_spinner=False)
+def sqlite_pools():
+    """Open connection pools shared by every session: store path -> (key, pool)"""
+    return {'lock': threading.Lock(), 'pools': {}}
 
-def create_sample_data():
+def cached_sqlite_pool(roster, key, path):
+    """Connection pool on the SQLite store at `path`, rebuilt when `key` changes.
+    
+    One pool per store path: a new key rewrites the store and the pool it
+    replaces is closed, so no connections are left behind.
+    """
+    registry = sqlite_pools()
+    with registry['lock']:
+        current = registry['pools'].get(path)
+        if current is not None and current[0] == key:
+            return current[1]
+        sqlite_store.build_store(roster, path, key, billing_month_columns(roster))
+        pool = sqlite_store.ConnectionPool(path)
+        registry['pools'][path] = (key, pool)
+    if current is not None:
+        current[1].close()
+    return pool
+
+def memory_report(dataset):
+    """Bytes held once per process for the shared dataset versus by the current session"""
+    shared_bytes = dataset['frame'].memory_usage(index=True, deep=True).sum()
+    index = dataset['as_of_index']
+    if index is not None:
+        shared_bytes += sum(value.nbytes for value in index.values() if isinstance(value, np.ndarray))
+    
+    session_bytes = 0
+    for value in st.session_state.to_dict().values():
+        session_bytes += value.nbytes if isinstance(value, np.ndarray) else sys.getsizeof(value)
+    
+    try:
+        import resource
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak_rss_bytes = peak_rss if sys.platform == 'darwin' else peak_rss * 1024
+    except ImportError:
+        peak_rss_bytes = None
+    
+    return {
+        'shared_bytes': int(shared_bytes),
+        'session_bytes': int(session_bytes),
+        'peak_rss_bytes': peak_rss_bytes
+    }
+
+def create_sample_data(n_rows=100):
     """Create sample data for demonstration purposes"""
     # Create a date range for the past 2 years
     today = datetime.datetime.now()
@@ -165,9 +687,12 @@ def create_sample_data():
              'James Martinez', 'Mary Williams', 'Thomas Robinson', 'Patricia Clark',
              'Charles Rodriguez', 'Linda Lewis', 'Daniel Lee', 'Elizabeth Hall']
     
+    # Monthly billing columns are headed by month-end dates, like the real export
+    month_ends = pd.date_range(start=date_range[0], end=today, freq='M')
+    
     # Create sample data
     data = []
-    for i in range(100):
+    for i in range(n_rows):
         start_date = date_range[np.random.randint(0, len(date_range)-20)]
         end_date = None
         
@@ -179,8 +704,20 @@ def create_sample_data():
         
         name = np.random.choice(names)
         estimated_book = np.random.randint(100000, 2000000)
-        ttm = estimated_book * (0.8 + np.random.random() * 0.4)  # 80-120% of estimated
-        annualized = ttm * (0.9 + np.random.random() * 0.3)  # 90-120% of TTM
+        
+        # Billings ramp up over the first six months, then run at 60-140% of estimate
+        billings = {}
+        employed = []
+        for month_end in month_ends:
+            employed.append(month_end >= start_date and (end_date is None or month_end - pd.offsets.MonthEnd(1) < end_date))
+            ramp = min(1.0, sum(employed) / 6)
+            billings[month_end.strftime('%Y-%m-%d')] = (
+                round(estimated_book / 12 * ramp * (0.6 + np.random.random() * 0.8), 2) if employed[-1] else 0.0
+            )
+        
+        # TTM over the last twelve months, annualized over the months employed in that window
+        ttm = sum(list(billings.values())[-12:])
+        annualized = ttm * 12 / max(sum(employed[-12:]), 1)
         variance = annualized - estimated_book
         
         data.append({
@@ -193,19 +730,225 @@ def create_sample_data():
             'Annualized': annualized,
             'Variance to Est': variance,
             'Department': np.random.choice(['Litigation', 'Corporate', 'IP', 'Tax', 'Family Law']),
-            'Office': np.random.choice(['New York', 'Chicago', 'Los Angeles', 'Miami', 'Austin'])
+            'Office': np.random.choice(['New York', 'Chicago', 'Los Angeles', 'Miami', 'Austin']),
+            **billings
         })
     
     df = pd.DataFrame(data)
     return df
 
+EXPORT_HEADER_LABELS = ['Start Date', 'Leave Date']
+
+def parse_export(df):
+    """Split the spreadsheet export into attorney rows and per-block Totals rows.
+    
+    The export stacks titled blocks ("New Hire Billings", "Leaver Billings"),
+    each with its own header row and a closing Totals row. The unlabelled
+    columns before the header labels hold names: the display name, the
+    billing name and any group members. Returns (rows, totals), both with a
+    'Block' column, or None when no block header is found.
+    """
+    header_rows = np.flatnonzero(df.isin(EXPORT_HEADER_LABELS).any(axis=1).to_numpy())
+    if not len(header_rows):
+        return None
+    
+    raw = df.to_numpy(dtype=object)
+    filled = df.notna().to_numpy()
+    ends = list(header_rows[1:]) + [len(raw)]
+    row_blocks, totals_blocks = [], []
+    
+    for i, (header, end) in enumerate(zip(header_rows, ends)):
+        labels = [str(label).strip() if filled[header, j] else '' for j, label in enumerate(raw[header])]
+        first_label = min(j for j, label in enumerate(labels) if label)
+        
+        # Block title: the nearest text above the header in the name columns
+        title = f"Block {i + 1}"
+        for r in range(header - 1, header_rows[i - 1] if i else -1, -1):
+            if filled[r, :first_label].any():
+                title = str(raw[r, :first_label][filled[r, :first_label]][0]).strip()
+                break
+        
+        block = raw[header + 1:end]
+        block_filled = filled[header + 1:end]
+        name_cols = [j for j in range(first_label) if block_filled[:, j].any()]
+        if not name_cols:
+            continue
+        
+        # Rows end at the block's Totals row; blank rows are padding
+        names = pd.Series(block[:, name_cols[0]]).astype(str).str.strip().str.lower()
+        is_total = names.isin(['total', 'totals']).to_numpy()
+        last = np.flatnonzero(is_total)[0] if is_total.any() else len(block)
+        has_name = block_filled[:, name_cols].any(axis=1)
+        
+        # Keep text labels (dates included); numeric labels are per-month flag columns
+        columns = {}
+        for k, j in enumerate(name_cols):
+            columns[j] = 'Attorney Name' if k == 0 else 'Billing Name' if k == 1 else f'Group Member {k - 1}'
+        for j in range(first_label, len(labels)):
+            label = labels[j]
+            if label and pd.isna(pd.to_numeric(label, errors='coerce')) and label not in columns.values():
+                columns[j] = label
+        
+        keep = list(columns)
+        rows = pd.DataFrame(block[:last][has_name[:last]][:, keep], columns=list(columns.values()))
+        rows['Block'] = title
+        row_blocks.append(rows)
+        if is_total.any():
+            totals = pd.DataFrame(block[is_total][:, keep], columns=list(columns.values()))
+            totals['Block'] = title
+            totals_blocks.append(totals)
+    
+    if not row_blocks:
+        return None
+    return (pd.concat(row_blocks, ignore_index=True),
+            pd.concat(totals_blocks, ignore_index=True) if totals_blocks else pd.DataFrame())
+
+# Data-quality rules run at ingestion: rule -> (severity, description)
+VALIDATION_RULES = {
+    'unparsable_dates': ('error', "Dates that could not be parsed (left blank)"),
+    'coerced_numbers': ('error', "Non-numeric values in numeric columns (coerced to 0)"),
+    'missing_numbers': ('warning', "Blank book or billing figures (filled with 0)"),
+    'missing_start_date': ('warning', "Active attorneys with no start date"),
+    'leavers_without_start': ('info', "Leavers with no start date (counted as leavers at their leave date; no tenure or cohort)"),
+    'leave_before_start': ('error', "Leave date before start date"),
+    'duplicate_attorneys': ('warning', "Attorney names on more than one row"),
+    'name_mismatch': ('info', "Display name differs from the billing name"),
+    'zero_billings': ('info', "Monthly billings all zero"),
+    'negative_billings': ('error', "Negative monthly billings"),
+    'totals_mismatch': ('error', "Totals rows that disagree with the sum of their rows")
+}
+
+def leavers_without_start(df):
+    """Leavers listed without a start date, like every row of the export's "Leaver Billings" block.
+    
+    They are handled as their own category rather than as bad rows: they
+    count as leavers from their leave date (and as on staff until then),
+    but have no tenure, start-year cohort or ramp, and start-date filters
+    and views leave them out.
+    """
+    if 'Leave Date' not in df.columns:
+        return np.zeros(len(df), dtype=bool)
+    leave = df['Leave Date'].to_numpy(dtype='datetime64[ns]')
+    if 'Start Date' not in df.columns:
+        return ~np.isnat(leave)
+    return ~np.isnat(leave) & np.isnat(df['Start Date'].to_numpy(dtype='datetime64[ns]'))
+
+def unparsed_mask(original, parsed):
+    """Values present in the export that came out missing after parsing"""
+    if original.dtype != object:
+        # Typed columns (e.g. generated data) had nothing to coerce
+        return np.zeros(len(original), dtype=bool)
+    present = original.notna() & original.astype(str).str.strip().ne('')
+    return (present & parsed.isna()).to_numpy()
+
+def normalised_name_codes(*columns):
+    """Integer codes that are equal when names match after trimming and case-folding (-1 if missing).
+    
+    Only the distinct names are normalised, so the cost does not grow with
+    repeated names.
+    """
+    combined = pd.concat([pd.Series(np.asarray(col, dtype=object)) for col in columns], ignore_index=True)
+    codes, uniques = pd.factorize(combined)
+    normalised = pd.Series(uniques, dtype=object).astype(str).str.strip().str.casefold()
+    unique_codes = pd.factorize(normalised)[0]
+    codes = np.where(codes >= 0, unique_codes[np.maximum(codes, 0)] if len(unique_codes) else -1, -1)
+    return np.split(codes, np.cumsum([len(col) for col in columns])[:-1])
+
+def validate_data(df, unparsable=None, missing=None, totals=None, sample_size=200):
+    """Run the data-quality rules as whole-column masks over a cleaned frame.
+    
+    unparsable / missing map a column to the mask of values that clean_data
+    could not parse or found blank (before blanking dates and zero-filling
+    numbers); totals holds the export's Totals rows. Returns a report with
+    the rows checked, the seconds taken and, per rule, its severity,
+    description, count, affected columns and a sample of row positions.
+    """
+    started = time.perf_counter()
+    unparsable, missing = unparsable or {}, missing or {}
+    found = {}
+    
+    def record(rule, mask=None, columns=(), count=None):
+        found[rule] = {
+            'count': int(mask.sum()) if count is None else count,
+            'columns': list(columns),
+            'rows': np.flatnonzero(mask)[:sample_size].tolist() if mask is not None else []
+        }
+    
+    def combine(masks, cols):
+        flagged = [col for col in cols if masks[col].any()]
+        mask = np.zeros(len(df), dtype=bool)
+        for col in flagged:
+            mask |= masks[col]
+        return mask, flagged
+    
+    date_cols = [col for col in unparsable if 'date' in col.lower()]
+    record('unparsable_dates', *combine(unparsable, date_cols))
+    record('coerced_numbers', *combine(unparsable, [col for col in unparsable if col not in date_cols]))
+    record('missing_numbers', *combine(missing, list(missing)))
+    
+    start = df['Start Date'].to_numpy() if 'Start Date' in df.columns else np.full(len(df), np.datetime64('NaT'))
+    if 'Leave Date' in df.columns:
+        leave = df['Leave Date'].to_numpy()
+        record('missing_start_date', np.isnat(leave) & np.isnat(start), ['Start Date'])
+        record('leavers_without_start', leavers_without_start(df), ['Start Date', 'Leave Date'])
+        record('leave_before_start', leave < start, ['Start Date', 'Leave Date'])
+    
+    if 'Attorney Name' in df.columns:
+        names = df['Attorney Name'].to_numpy()
+        if 'Billing Name' in df.columns:
+            name_codes, billing_codes = normalised_name_codes(names, df['Billing Name'].to_numpy())
+            record('name_mismatch', (name_codes >= 0) & (billing_codes >= 0) & (name_codes != billing_codes),
+                   ['Attorney Name', 'Billing Name'])
+        else:
+            name_codes = normalised_name_codes(names)[0]
+        counts = np.bincount(name_codes[name_codes >= 0], minlength=max(name_codes.max(initial=-1) + 1, 1))
+        record('duplicate_attorneys', (name_codes >= 0) & (counts[np.maximum(name_codes, 0)] > 1), ['Attorney Name'])
+    
+    month_cols = billing_month_columns(df)
+    if month_cols:
+        billings = df[month_cols].to_numpy(dtype=float)
+        record('zero_billings', (billings == 0).all(axis=1), month_cols[:1] + month_cols[-1:])
+        negative = billings < 0
+        record('negative_billings', negative.any(axis=1),
+               [col for col, flagged in zip(month_cols, negative.any(axis=0)) if flagged])
+    
+    if totals is not None and not totals.empty:
+        mismatches = []
+        checked = [col for col in ['Estimated Book', 'TTM', 'Annualized', 'Variance to Est'] + month_cols
+                   if col in totals.columns and col in df.columns]
+        for _, total_row in totals.iterrows():
+            block = total_row.get('Block')
+            rows = df if 'Block' not in df.columns or pd.isna(block) else df[df['Block'] == block]
+            expected = pd.to_numeric(total_row[checked], errors='coerce')
+            actual = rows[checked].sum()
+            diff = (expected - actual).abs()
+            bad = expected.notna() & (diff > np.maximum(0.01, 1e-6 * expected.abs()))
+            mismatches += [f"{block}: {col}" if pd.notna(block) else col for col in bad[bad].index]
+        record('totals_mismatch', None, mismatches, count=len(mismatches))
+    
+    rules = []
+    for rule, (severity, description) in VALIDATION_RULES.items():
+        if rule in found:
+            rules.append({'rule': rule, 'severity': severity, 'description': description, **found[rule]})
+    
+    return {
+        'rows_checked': len(df),
+        'seconds': time.perf_counter() - started,
+        'rules': rules
+    }
+
 def clean_data(df):
     """Clean and preprocess the data"""
     # Make a copy to avoid modifying the original
     df = df.copy()
     
     # Check if we need to find header rows (real data might need this)
-    if 'Unnamed' in str(df.columns[0]):
+    totals = None
+    parsed = parse_export(df) if 'Unnamed' in str(df.columns[0]) else None
+    if parsed is not None:
+        # The spreadsheet export: attorney rows from every block, Totals rows kept aside
+        df, totals = parsed
+    elif 'Unnamed' in str(df.columns[0]):
         # Find the header row based on column content
         potential_headers = df.iloc[:20].apply(lambda row: sum(['date' in str(val).lower() or 
                                                               'name' in str(val).lower() or
@@ -244,16 +987,28 @@ def clean_data(df):
     if column_mapping:
         df = df.rename(columns=column_mapping)
     
+    # Spreadsheet "Totals" rows are not attorneys; keep them aside for validation
+    if totals is None and 'Attorney Name' in df.columns:
+        names = pd.Series(df['Attorney Name'].unique())
+        total_labels = names[names.astype(str).str.strip().str.lower().isin(['total', 'totals'])]
+        is_total = df['Attorney Name'].isin(total_labels).to_numpy()
+        if is_total.any():
+            totals = df[is_total]
+            df = df[~is_total].reset_index(drop=True)
+    
     # Identify required columns, or try to find close matches
     required_cols = [
         'Start Date', 'Leave Date', 'Attorney Name', 'Estimated Book', 
         'TTM', 'Annualized', 'Variance to Est'
     ]
     
-    # Find and convert date columns
+    # Find and convert date columns, noting values that fail to parse
+    unparsable, missing = {}, {}
     date_cols = [col for col in df.columns if 'date' in str(col).lower()]
     for col in date_cols:
-        df[col] = pd.to_datetime(df[col], errors='coerce')
+        parsed_dates = pd.to_datetime(df[col], errors='coerce')
+        unparsable[col] = unparsed_mask(df[col], parsed_dates)
+        df[col] = parsed_dates
     
     # Make sure Start Date is in datetime format
     if 'Start Date' in df.columns:
@@ -267,13 +1022,17 @@ def clean_data(df):
         df['Leave Date'] = pd.to_datetime(df['Leave Date'], errors='coerce')
     
     # Convert numeric columns
-    numeric_cols = ['Estimated Book', 'TTM', 'Annualized', 'Variance to Est', 'Start Year']
+    numeric_cols = ['Estimated Book', 'TTM', 'Annualized', 'Variance to Est', 'Start Year'] + billing_month_columns(df)
     for col in numeric_cols:
         if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+            parsed_numbers = pd.to_numeric(df[col], errors='coerce')
+            unparsable[col] = unparsed_mask(df[col], parsed_numbers)
+            if col != 'Start Year':
+                missing[col] = (parsed_numbers.isna().to_numpy() & ~unparsable[col])
+            df[col] = parsed_numbers
     
-    # Fill NaN values for numeric columns
-    numeric_cols = df.select_dtypes(include=['number']).columns
+    # Fill NaN values for numeric columns (Start Year stays missing without a start date)
+    numeric_cols = df.select_dtypes(include=['number']).columns.drop('Start Year', errors='ignore')
     df[numeric_cols] = df[numeric_cols].fillna(0)
     
     # Replace any remaining NaN with appropriate values
@@ -287,6 +1046,174 @@ def clean_data(df):
         df['Tenure Months'] = ((df['End Date For Calc'] - df['Start Date']).dt.days / 30.44).round(1)
         df.drop('End Date For Calc', axis=1, inplace=True)
     
+    df.attrs['validation'] = validate_data(df, unparsable, missing, totals)
+    return df
+
+BILLING_MONTH_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}')
+
+def billing_month_columns(df):
+    """Find the monthly billing columns (headed by month-end dates, e.g. '2024-01-31')"""
+    return [col for col in df.columns if BILLING_MONTH_PATTERN.match(str(col))]
+
+def billing_matrix(df):
+    """Return the attorney x month billings matrix over a complete month calendar.
+    
+    Returns (values, month_ordinals) where values[i, j] is row i's billings in
+    month month_ordinals[j] (months since 1970-01). Months missing from the
+    export are filled with zeros.
+    """
+    month_cols = billing_month_columns(df)
+    if not month_cols:
+        return np.zeros((len(df), 0)), np.empty(0, dtype=np.int64)
+    
+    col_months = date_ordinals(pd.Series([str(col)[:10] for col in month_cols]))['M']
+    first_month = col_months.min()
+    month_ordinals = np.arange(first_month, col_months.max() + 1)
+    
+    values = np.zeros((len(df), len(month_ordinals)))
+    # Columns for the same month (if repeated) are summed
+    np.add.at(values.T, col_months - first_month,
+              df[month_cols].apply(pd.to_numeric, errors='coerce').fillna(0).to_numpy(dtype=float).T)
+    
+    return values, month_ordinals
+
+# Dimension mapping (attorney -> department / office / practice group)
+MAPPING_COLUMNS = ['Department', 'Office', 'Practice Group']
+
+def mapping_path():
+    """Path of the optional attorney mapping file (JOINERS_LEAVERS_MAPPING, else a local attorney_mapping.csv)"""
+    path = os.environ.get('JOINERS_LEAVERS_MAPPING') or 'attorney_mapping.csv'
+    return path if os.path.exists(path) else None
+
+def file_signature(path):
+    """Cheap change detector for an input file (path, modification time, size)"""
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def load_mapping(path, signature):
+    """Read a mapping file into one row per (attorney key, effective date), sorted.
+    
+    The file needs an 'Attorney Name' column and any of Department, Office
+    and Practice Group; an optional 'Effective Date' column dates moves
+    between groups (blank means effective from the start). Names are keyed
+    with normalise_name, the reconciled attorney ID the search index uses.
+    `signature` is only part of the cache key, so an edited file is re-read.
+    """
+    with open(path, 'rb') as f:
+        content = f.read()
+    if path.lower().endswith(('.xlsx', '.xls')):
+        raw = pd.read_excel(BytesIO(content))
+    else:
+        raw = pd.read_csv(BytesIO(content))
+    raw.columns = [str(col).strip() for col in raw.columns]
+    if 'Attorney Name' not in raw.columns:
+        raise ValueError(f"{path} has no 'Attorney Name' column")
+    
+    names = raw['Attorney Name'].dropna()
+    table = pd.DataFrame({'Key': names.map(normalise_name)}, index=names.index)
+    effective = raw['Effective Date'] if 'Effective Date' in raw.columns else pd.Series(pd.NaT, index=raw.index)
+    table['Effective Date'] = pd.to_datetime(effective.loc[names.index], errors='coerce')
+    for col in MAPPING_COLUMNS:
+        if col in raw.columns:
+            table[col] = raw.loc[names.index, col].where(raw.loc[names.index, col].notna(), None)
+    table = table[table['Key'] != ''].sort_values(['Key', 'Effective Date'], na_position='first', ignore_index=True)
+    
+    return {'table': table, 'version': hashlib.sha1(content).hexdigest()[:16]}
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def cached_dimension_join(_names, _reference_days, roster_key, _mapping, mapping_version):
+    """Effective-dated hash join of roster names onto the mapping, rebuilt only when either input changes.
+    
+    Distinct names are keyed once and looked up in a hash index over the
+    mapping keys. Within an attorney's mapping rows (sorted by effective
+    date) each roster row takes the last row effective on or before its
+    reference day, or the earliest row if all of them are later. Returns
+    {'matched': whether each row's attorney is in the mapping, 'columns':
+    {column: values}} with None where a row has no mapping.
+    """
+    table = _mapping['table']
+    key_index = pd.Index(pd.unique(table['Key'].to_numpy()))
+    
+    names, name_codes = np.unique(np.asarray(_names, dtype=object).astype(str), return_inverse=True)
+    roster_codes = key_index.get_indexer([normalise_name(name) for name in names])[name_codes]
+    matched = roster_codes >= 0
+    matched.flags.writeable = False
+    
+    # A mapping without rows (a header-only file) maps nobody
+    if len(key_index) == 0:
+        return {
+            'matched': matched,
+            'columns': {col: np.full(len(matched), None, dtype=object) for col in MAPPING_COLUMNS if col in table.columns}
+        }
+    
+    # One sorted composite (attorney code, effective day) key, searched per roster row
+    mapping_codes = key_index.get_indexer(table['Key'])
+    effective = table['Effective Date'].to_numpy(dtype='datetime64[D]').astype(np.int64)
+    dated = ~table['Effective Date'].isna().to_numpy()
+    first_day = min(effective[dated].min() if dated.any() else 0, _reference_days.min(initial=0)) - 1
+    last_day = max(effective[dated].max() if dated.any() else 0, _reference_days.max(initial=0)) + 1
+    span = int(last_day - first_day) + 1
+    mapping_keys = mapping_codes * span + np.where(dated, effective - first_day, 0)
+    group_start = np.searchsorted(mapping_keys, np.arange(len(key_index)) * span)
+    
+    query = np.where(matched, roster_codes, 0) * span + np.clip(_reference_days - first_day, 0, span - 1)
+    rows = np.searchsorted(mapping_keys, query, side='right') - 1
+    rows = np.maximum(rows, group_start[np.where(matched, roster_codes, 0)])
+    
+    joined = {}
+    for col in MAPPING_COLUMNS:
+        if col in table.columns:
+            values = table[col].to_numpy(dtype=object)[rows]
+            values[~matched] = None
+            values.flags.writeable = False
+            joined[col] = values
+    return {'matched': matched, 'columns': joined}
+
+def join_dimension_mapping(df, path=None):
+    """Attach Department / Office / Practice Group from the mapping file to a cleaned roster.
+    
+    Active attorneys take the group effective today and leavers the group
+    effective on their leave date. Mapped values take precedence; columns
+    the export already had keep their value where an attorney is unmapped.
+    Coverage is recorded in df.attrs['mapping']. A mapping file that cannot
+    be read leaves the roster unmapped, with the error in df.attrs['error'].
+    """
+    path = path or mapping_path()
+    if path is None or 'Attorney Name' not in df.columns or df.empty:
+        return df
+    
+    today = np.datetime64(datetime.date.today(), 'D').astype(np.int64)
+    if 'Leave Date' in df.columns:
+        leave = date_ordinals(df['Leave Date'])
+        reference_days = np.where(leave['valid'], leave['D'], today)
+    else:
+        reference_days = np.full(len(df), today)
+    names = df['Attorney Name'].fillna('').to_numpy(dtype=object)
+    roster_key = hashlib.sha1(pd.util.hash_array(names.astype(str)).tobytes() + reference_days.tobytes()).hexdigest()
+    
+    signature = file_signature(path)
+    try:
+        mapping = load_mapping(path, signature)
+        joined = cached_dimension_join(names, reference_days, roster_key, mapping, mapping['version'])
+    except Exception as e:
+        mapping_error = f"Could not read {path}: {e}"
+        df.attrs['error'] = f"{df.attrs['error']}; {mapping_error}" if df.attrs.get('error') else mapping_error
+        return df
+    
+    df = df.assign(**{
+        col: pd.Series(values, index=df.index).combine_first(df[col]) if col in df.columns else values
+        for col, values in joined['columns'].items()
+    })
+    matched = joined['matched']
+    df.attrs['mapping'] = {
+        'path': os.path.basename(path),
+        'version': mapping['version'],
+        'signature': list(signature),
+        'matched_rows': int(matched.sum()),
+        'rows': len(df),
+        'unmatched_names': sorted(set(df['Attorney Name'].to_numpy()[~matched].astype(str)))[:50]
+    }
     return df
 
 # KPI calculations
@@ -324,8 +1251,9 @@ def calculate_kpis(df):
     
     # Joiners and leavers counts
     if 'Leave Date' in df.columns:
-        kpis['joiners_count'] = len(df[df['Leave Date'].isna()])
-        kpis['leavers_count'] = len(df[df['Leave Date'].notna()])
+        left = df['Leave Date'].notna().to_numpy()
+        kpis['joiners_count'] = int((~left).sum())
+        kpis['leavers_count'] = int(left.sum())
         
         # Calculate retention rate
         if len(df) > 0:
@@ -340,9 +1268,9 @@ def calculate_kpis(df):
     # Average tenure (for all attorneys and for leavers)
     if 'Tenure Months' in df.columns:
         kpis['avg_tenure_months'] = df['Tenure Months'].mean()
-        leavers_df = df[df['Leave Date'].notna()]
-        if not leavers_df.empty:
-            kpis['avg_leaver_tenure_months'] = leavers_df['Tenure Months'].mean()
+        left = df['Leave Date'].notna().to_numpy()
+        if left.any():
+            kpis['avg_leaver_tenure_months'] = df['Tenure Months'].where(left).mean()
         else:
             kpis['avg_leaver_tenure_months'] = 0
     else:
@@ -351,120 +1279,1546 @@ def calculate_kpis(df):
     
     return kpis
 
-# Time-based analysis functions
-def monthly_joiners_leavers(df):
-    """Calculate monthly joiners and leavers for trend analysis"""
-    if 'Start Date' not in df.columns or df.empty:
+# Point-in-time ("as of") queries
+def build_as_of_index(df, billings=None):
+    """Build an interval index over employment spans and billing months.
+    
+    Start and leave dates are stored as sorted day ordinals (with the row
+    order that sorts them), and billings as a cumulative attorney x month
+    matrix, so any date can be queried without rescanning the roster.
+    Leavers without a start date (see leavers_without_start) are kept in
+    their own leave-date order.
+    `billings` passes in a precomputed (month_ordinals, cumulative_billings)
+    pair, e.g. mapped from a snapshot.
+    """
+    start = date_ordinals(df['Start Date']) if 'Start Date' in df.columns else None
+    if start is None or not start['valid'].any():
+        return None
+    
+    leave = date_ordinals(df['Leave Date']) if 'Leave Date' in df.columns else None
+    
+    # Rows without a start date sort last (never started); a missing leave date is open-ended
+    start_days = np.where(start['valid'], start['D'], np.iinfo(np.int64).max)
+    if leave is not None:
+        leave_days = np.where(leave['valid'], leave['D'], np.iinfo(np.int64).max)
+    else:
+        leave_days = np.full(len(df), np.iinfo(np.int64).max)
+    
+    start_order = np.argsort(start_days, kind='stable')
+    # Leavers without a start date join the roster once they have left
+    no_start = np.flatnonzero(leavers_without_start(df))
+    no_start_order = no_start[np.argsort(leave_days[no_start], kind='stable')]
+    
+    if billings is not None:
+        month_ordinals, cumulative_billings = billings
+    else:
+        billings, month_ordinals = billing_matrix(df)
+        # Prefix sums along months: any trailing window is a difference of two columns
+        cumulative_billings = np.zeros((len(df), len(month_ordinals) + 1))
+        np.cumsum(billings, axis=1, out=cumulative_billings[:, 1:])
+    
+    return {
+        'frame': df,
+        'start_days': start_days,
+        'leave_days': leave_days,
+        'start_order': start_order,
+        'sorted_start_days': start_days[start_order],
+        'no_start_order': no_start_order,
+        'sorted_no_start_leave_days': leave_days[no_start_order],
+        'month_ordinals': month_ordinals,
+        'start_months': start['M'],
+        'leave_months': leave['M'] if leave is not None else np.full(len(df), np.iinfo(np.int64).max),
+        'cumulative_billings': cumulative_billings
+    }
+
+def as_of(index, date):
+    """Return the roster exactly as it stood on `date`.
+    
+    The roster holds everyone who had started by `date`, plus the leavers
+    without a start date who had left by then (counted as leavers, with no
+    tenure). Leave dates after `date` are blanked (they had not happened
+    yet) and tenure is measured to `date`. For past dates, when monthly
+    billings are available, TTM, Annualized and Variance to Est are
+    recomputed from the twelve completed months ending on or before
+    `date`; today's roster keeps the export's own figures.
+    """
+    if index is None:
+        return None
+    
+    date = pd.Timestamp(date).normalize()
+    day = date.to_datetime64().astype('datetime64[D]').astype(np.int64)
+    
+    # Everyone who started on or before the date (binary search on sorted starts),
+    # and the leavers without a start date who had left by then
+    n_started = np.searchsorted(index['sorted_start_days'], day, side='right')
+    n_left = np.searchsorted(index['sorted_no_start_leave_days'], day, side='right')
+    rows = np.sort(np.concatenate([index['start_order'][:n_started], index['no_start_order'][:n_left]]))
+    
+    roster = index['frame'].iloc[rows].copy()
+    leave_days = index['leave_days'][rows]
+    left = leave_days <= day
+    
+    if 'Leave Date' in roster.columns:
+        roster['Leave Date'] = roster['Leave Date'].where(left)
+    
+    # Tenure up to the leave date, or up to the as-of date for people still active
+    # (unknown without a start date)
+    end_days = np.where(left, leave_days, day)
+    start_days = index['start_days'][rows]
+    has_start = start_days != np.iinfo(np.int64).max
+    roster['Tenure Months'] = np.where(has_start, (end_days - np.where(has_start, start_days, day)) / 30.44, np.nan).round(1)
+    
+    # Trailing twelve completed months of billings (today's figures are the export's own)
+    month_ordinals = index['month_ordinals']
+    if len(month_ordinals) and date != pd.Timestamp.today().normalize():
+        last_month = date.to_datetime64().astype('datetime64[M]').astype(np.int64)
+        if not date.is_month_end:
+            last_month -= 1
+        hi = int(np.clip(last_month - month_ordinals[0] + 1, 0, len(month_ordinals)))
+        lo = max(hi - 12, 0)
+        
+        ttm = index['cumulative_billings'][rows, hi] - index['cumulative_billings'][rows, lo]
+        # Annualize over the months employed inside the window (joiners with < 12 months)
+        first_month = np.maximum(index['start_months'][rows], month_ordinals[0] + lo)
+        last_employed = np.where(left, index['leave_months'][rows], month_ordinals[0] + hi - 1)
+        employed = np.clip(np.minimum(last_employed, month_ordinals[0] + hi - 1) - first_month + 1, 1, 12)
+        
+        roster['TTM'] = ttm
+        roster['Annualized'] = ttm * 12 / employed
+        if 'Estimated Book' in roster.columns:
+            roster['Variance to Est'] = roster['Annualized'] - roster['Estimated Book']
+    
+    return {
+        'as_of': date,
+        'roster': roster
+    }
+
+# Pre-aggregated cube of additive measures
+CUBE_DIMENSIONS = ['Department', 'Office', 'Attorney Name']
+
+# Measures attributed to the start month (the roster's filters select rows by start date)
+CUBE_ROSTER_MEASURES = ['Joiners', 'Left', 'Estimated Book', 'Leavers Book', 'Annualized',
+                        'Variance to Est', 'Tenure Months', 'Leaver Tenure Months',
+                        'Tenure Known', 'Leaver Tenure Known']
+
+# Month of the roster cells for rows without a start date: sorts before every real month,
+# and only counts when no start-date bound applies (as with filter_rows)
+CUBE_NO_START_MONTH = np.iinfo(np.int64).min
+
+def cube_table(months, codes, measures, sizes):
+    """Sum facts into sparse cells: one per distinct (month, dimension codes), sorted by month.
+    
+    codes and sizes map each dimension to its per-fact codes and its number of labels.
+    """
+    month_values, key = np.unique(months, return_inverse=True)
+    key = np.asarray(key, dtype=np.int64).ravel()
+    for col, code in codes.items():
+        key = key * sizes[col] + code
+    cell_keys, cells = np.unique(key, return_inverse=True)
+    
+    # Decode the cell keys back into per-dimension code arrays
+    cell_codes = {}
+    for col in reversed(list(codes)):
+        cell_codes[col] = (cell_keys % sizes[col]).astype(np.int32)
+        cell_keys = cell_keys // sizes[col]
+    
+    return {
+        'month': month_values[cell_keys],
+        'codes': {col: cell_codes[col] for col in codes},
+        'measures': {name: np.bincount(cells, weights=values, minlength=len(cell_keys))
+                     for name, values in measures.items()}
+    }
+
+def build_cube(df, ordinals=None):
+    """Materialise additive measures at month x department x office x attorney grain.
+    
+    Each dimension is dictionary-encoded once ('labels' maps code -> value).
+    'roster' cells hold the start-month measures (joiners, estimated book,
+    annualized, variance, tenure, and the part of each that has since left;
+    rows without a start date sit in CUBE_NO_START_MONTH cells) and
+    'leavers' cells count leave events by leave month. Billings are dense
+    per attorney (the as-of index keeps that matrix), so 'billings' cells are
+    rolled up to month x department x office. Cells are contiguous arrays
+    sorted by month, so any sidebar selection is a month slice plus a code
+    lookup, and any view is a bincount over the selected cells. `ordinals`
+    passes the roster's event_ordinals when already computed. Returns None
+    when the roster lacks the columns the measures need.
+    """
+    required = ['Start Date', 'Leave Date', 'Attorney Name', 'Estimated Book',
+                'Annualized', 'Variance to Est', 'Tenure Months']
+    if any(col not in df.columns for col in required):
+        return None
+    
+    labels, row_codes = {}, {}
+    for col in CUBE_DIMENSIONS:
+        if col in df.columns:
+            codes, uniques = pd.factorize(df[col], use_na_sentinel=False)
+            labels[col] = np.asarray(uniques, dtype=object)
+            row_codes[col] = codes.astype(np.int64)
+    sizes = {col: max(len(values), 1) for col, values in labels.items()}
+    
+    ordinals = ordinals if ordinals is not None else event_ordinals(df)
+    start, leave = ordinals['start'], ordinals['leave']
+    left = leave['valid'].astype(float)
+    tenure = df['Tenure Months'].to_numpy(dtype=float)
+    # Tenure is unknown without a start date: averages only cover the known ones, as Series.mean does
+    tenure_known = (~np.isnan(tenure)).astype(float)
+    tenure = np.nan_to_num(tenure)
+    book = df['Estimated Book'].to_numpy(dtype=float)
+    start_months = np.where(start['valid'], start['M'], CUBE_NO_START_MONTH)
+    
+    roster_measures = {
+        'Joiners': np.ones(len(df)),
+        'Left': left,
+        'Estimated Book': book,
+        'Leavers Book': book * left,
+        'Annualized': df['Annualized'].to_numpy(dtype=float),
+        'Variance to Est': df['Variance to Est'].to_numpy(dtype=float),
+        'Tenure Months': tenure,
+        'Leaver Tenure Months': tenure * left,
+        'Tenure Known': tenure_known,
+        'Leaver Tenure Known': tenure_known * left
+    }
+    roster = cube_table(start_months, row_codes, roster_measures, sizes)
+    
+    leaving = leave['valid']
+    leavers = cube_table(leave['M'][leaving], {col: codes[leaving] for col, codes in row_codes.items()},
+                         {'Leavers': np.ones(int(leaving.sum()))}, sizes)
+    
+    # Sum the attorney x month matrix into department x office groups, then sparsify
+    group_codes = {col: codes for col, codes in row_codes.items() if col != 'Attorney Name'}
+    group_key = np.zeros(len(df), dtype=np.int64)
+    for col, codes in group_codes.items():
+        group_key = group_key * sizes[col] + codes
+    groups, group_of_row = np.unique(group_key, return_inverse=True)
+    values, month_ordinals = billing_matrix(df)
+    group_billings = np.zeros((len(groups), len(month_ordinals)))
+    np.add.at(group_billings, group_of_row, values)
+    group_rows, cols = np.nonzero(group_billings)
+    first_rows = np.unique(group_of_row, return_index=True)[1]
+    billings = cube_table(month_ordinals[cols],
+                          {col: codes[first_rows][group_rows] for col, codes in group_codes.items()},
+                          {'Billings': group_billings[group_rows, cols]}, sizes)
+    
+    return {
+        'labels': labels,
+        'roster': roster,
+        'leavers': leavers,
+        'billings': billings
+    }
+
+def cube_mask(cube, table, filters):
+    """Boolean mask over a cube table's cells for a filter spec (see filter_rows).
+    
+    Date bounds apply at month grain; callers check cube_is_exact first when
+    the bounds may fall mid-month.
+    """
+    cells = cube[table]
+    months = cells['month']
+    mask = np.ones(len(months), dtype=bool)
+    
+    # Cells are sorted by month, so a date window is one contiguous slice
+    lo, hi = 0, len(months)
+    if filters.get('start_date') is not None:
+        lo = np.searchsorted(months, date_ordinals([filters['start_date']])['M'][0], side='left')
+    if filters.get('end_date') is not None:
+        hi = np.searchsorted(months, date_ordinals([filters['end_date']])['M'][0], side='right')
+    if filters.get('start_date') is not None or filters.get('end_date') is not None:
+        # Rows without a start date fail any start-date bound
+        lo = max(lo, np.searchsorted(months, CUBE_NO_START_MONTH, side='right'))
+    mask[:lo] = False
+    mask[hi:] = False
+    
+    if filters.get('years'):
+        mask &= np.isin(months // 12 + 1970, np.asarray(filters['years'], dtype=np.int64))
+    
+    for key, col in (('attorneys', 'Attorney Name'), ('departments', 'Department'), ('offices', 'Office')):
+        if filters.get(key) and col in cube['labels']:
+            if col not in cells['codes']:
+                raise ValueError(f"The cube's {table} cells are not broken down by {col}")
+            # Lookup table over the dimension's codes instead of comparing strings per cell
+            lookup = pd.Series(cube['labels'][col]).isin(filters[key]).to_numpy()
+            mask &= lookup[cells['codes'][col]]
+    return mask
+
+def cube_is_exact(index, filters):
+    """Whether month-grain cells answer the filter spec exactly.
+    
+    True when no start date falls in the part of a boundary month that the
+    date window cuts off (always the case for whole-month windows).
+    """
+    if index is None:
+        return False
+    sorted_days = index['sorted_start_days']
+    for key, side in (('start_date', 'start'), ('end_date', 'end')):
+        if filters.get(key) is None:
+            continue
+        date = pd.Timestamp(filters[key]).normalize()
+        day = date.to_datetime64().astype('datetime64[D]').astype(np.int64)
+        if side == 'start':
+            month_start = date.replace(day=1).to_datetime64().astype('datetime64[D]').astype(np.int64)
+            cut = np.searchsorted(sorted_days, day, side='left') - np.searchsorted(sorted_days, month_start, side='left')
+        else:
+            month_end = (date + pd.offsets.MonthEnd(0)).to_datetime64().astype('datetime64[D]').astype(np.int64)
+            cut = np.searchsorted(sorted_days, month_end, side='right') - np.searchsorted(sorted_days, day, side='right')
+        if cut:
+            return False
+    return True
+
+def cube_rollup(cube, table, mask, by=()):
+    """Sum a table's measures over the selected cells, grouped by dimensions and/or 'Month'"""
+    cells = cube[table]
+    if not by:
+        return {name: float(values[mask].sum()) for name, values in cells['measures'].items()}
+    
+    keys = []
+    for col in by:
+        keys.append(cells['month'][mask] if col == 'Month' else cells['codes'][col][mask])
+    if not mask.any():
+        return pd.DataFrame(columns=list(by) + list(cells['measures']))
+    groups, inverse = np.unique(np.column_stack(keys), axis=0, return_inverse=True)
+    inverse = np.asarray(inverse).ravel()
+    
+    result = {}
+    for i, col in enumerate(by):
+        result[col] = groups[:, i] if col == 'Month' else cube['labels'][col][groups[:, i]]
+    for name, values in cells['measures'].items():
+        result[name] = np.bincount(inverse, weights=values[mask], minlength=len(groups))
+    return pd.DataFrame(result)
+
+def cube_distinct(cube, mask, col, by=None):
+    """Distinct values of a dimension among selected roster cells (per `by` dimension if given)"""
+    cells = cube['roster']
+    codes = cells['codes'][col][mask]
+    # Missing names are not counted, as with Series.nunique
+    valid = ~pd.isna(cube['labels'][col][codes])
+    if by is None:
+        return len(np.unique(codes[valid]))
+    group_codes = cells['codes'][by][mask][valid]
+    pairs = np.unique(group_codes.astype(np.int64) * len(cube['labels'][col]) + codes[valid])
+    counts = np.bincount(pairs // len(cube['labels'][col]), minlength=len(cube['labels'][by]))
+    return pd.Series(counts, index=cube['labels'][by])
+
+def cube_kpis(cube, filters):
+    """calculate_kpis answered from the cube"""
+    mask = cube_mask(cube, 'roster', filters)
+    totals = cube_rollup(cube, 'roster', mask)
+    total = totals['Joiners']
+    leavers = totals['Left']
+    num_attorneys = cube_distinct(cube, mask, 'Attorney Name')
+    
+    return {
+        'total_estimated_book': totals['Estimated Book'],
+        'total_annualized': totals['Annualized'],
+        'total_variance': totals['Variance to Est'],
+        'revenue_per_attorney': totals['Annualized'] / num_attorneys if num_attorneys > 0 else 0,
+        'joiners_count': int(total - leavers),
+        'leavers_count': int(leavers),
+        'retention_rate': ((total - leavers) / total) * 100 if total > 0 else 0,
+        'avg_tenure_months': totals['Tenure Months'] / totals['Tenure Known'] if totals['Tenure Known'] > 0 else np.nan,
+        'avg_leaver_tenure_months': (
+            totals['Leaver Tenure Months'] / totals['Leaver Tenure Known'] if totals['Leaver Tenure Known'] > 0 else np.nan
+        ) if leavers > 0 else 0
+    }
+
+def cube_quarterly_growth(cube, filters):
+    """quarterly_growth answered from the cube (book by start quarter, split by whether they left)"""
+    # Rows without a start date have no start quarter
+    mask = cube_mask(cube, 'roster', filters) & (cube['roster']['month'] != CUBE_NO_START_MONTH)
+    if not mask.any():
         return pd.DataFrame()
     
-    # Ensure dates are in datetime format
-    df['Start Date'] = pd.to_datetime(df['Start Date'], errors='coerce')
+    by_month = cube_rollup(cube, 'roster', mask, by=('Month',))
+    quarters = by_month['Month'].to_numpy() // 3
+    unique_quarters, inverse = np.unique(quarters, return_inverse=True)
+    book = np.bincount(inverse, weights=by_month['Estimated Book'], minlength=len(unique_quarters))
+    leavers_book = np.bincount(inverse, weights=by_month['Leavers Book'], minlength=len(unique_quarters))
+    
+    quarter_starts = period_start_dates(unique_quarters, 'Q')
+    quarterly_data = pd.DataFrame({
+        'Quarter': quarter_starts.to_period('Q'),
+        'Joiners Book': book - leavers_book,
+        'Leavers Book': leavers_book
+    })
+    quarterly_data['Net Growth'] = quarterly_data['Joiners Book'] - quarterly_data['Leavers Book']
+    quarterly_data['Quarter Label'] = quarterly_data['Quarter'].astype(str)
+    return quarterly_data
+
+def cube_department_performance(cube, filters):
+    """department_performance answered from the cube"""
+    if 'Department' not in cube['labels']:
+        return None
+    
+    mask = cube_mask(cube, 'roster', filters)
+    dept_data = cube_rollup(cube, 'roster', mask, by=('Department',))
+    if dept_data.empty:
+        return None
+    dept_data = dept_data[dept_data['Department'].notna()]
+    attorneys = cube_distinct(cube, mask, 'Attorney Name', by='Department')
+    
+    dept_data = pd.DataFrame({
+        'Department': dept_data['Department'].to_numpy(),
+        'Estimated Book': dept_data['Estimated Book'].to_numpy(),
+        'Annualized': dept_data['Annualized'].to_numpy(),
+        'Attorney Name': attorneys.reindex(dept_data['Department'].to_numpy()).to_numpy(),
+        'Variance to Est': dept_data['Variance to Est'].to_numpy()
+    }).sort_values('Department', ignore_index=True)
+    dept_data['Revenue per Attorney'] = dept_data['Annualized'] / dept_data['Attorney Name'].where(dept_data['Attorney Name'] > 0, 1)
+    dept_data['Performance Ratio'] = (dept_data['Annualized'] / dept_data['Estimated Book'].where(dept_data['Estimated Book'] > 0, 1)) * 100
+    return dept_data
+
+# Attorney drill-down
+def build_attorney_index(df, as_of_index):
+    """Map every attorney name to their row positions once per dataset load.
+    
+    Profiles read that row of the as-of index's shared billing prefix sums,
+    so opening one is a dict lookup plus O(months) work, whatever the
+    roster size.
+    """
+    if 'Attorney Name' not in df.columns:
+        return None
+    positions = df.groupby('Attorney Name', sort=True).indices
+    return {
+        'frame': df,
+        'names': list(positions),
+        'positions': positions,
+        'as_of_index': as_of_index
+    }
+
+def attorney_profile(index, position):
+    """One attorney's record, monthly series (billings, TTM, annualized, variance) and KPIs"""
+    record = index['frame'].iloc[position]
+    as_of_index = index['as_of_index']
+    series = pd.DataFrame(columns=['Month', 'Tenure Month', 'Billings', 'TTM', 'Annualized', 'Variance to Est'])
+    
+    if as_of_index is not None and len(as_of_index['month_ordinals']):
+        month_ordinals = as_of_index['month_ordinals']
+        cumulative = as_of_index['cumulative_billings'][position]
+        j = np.arange(len(month_ordinals))
+        window_start = np.maximum(j - 11, 0)
+        ttm = cumulative[j + 1] - cumulative[window_start]
+        
+        # Employed months inside each trailing window, as in as_of()
+        no_date = np.iinfo(np.int64).max
+        started = as_of_index['start_days'][position] != no_date
+        left = as_of_index['leave_days'][position] != no_date
+        start_month = as_of_index['start_months'][position] if started else month_ordinals[0]
+        last_month = as_of_index['leave_months'][position] if left else month_ordinals[-1]
+        first_employed = np.maximum(start_month, month_ordinals[window_start])
+        employed = np.clip(np.minimum(last_month, month_ordinals) - first_employed + 1, 1, 12)
+        annualized = ttm * 12 / employed
+        
+        # Only months on the books carry a run-rate
+        on_books = (month_ordinals >= start_month) & (month_ordinals <= last_month)
+        annualized = np.where(on_books, annualized, np.nan)
+        estimated_book = float(record['Estimated Book']) if 'Estimated Book' in record.index else np.nan
+        
+        series = pd.DataFrame({
+            'Month': period_start_dates(month_ordinals, 'M'),
+            'Tenure Month': np.where(started, month_ordinals - start_month, -1),
+            'Billings': np.diff(cumulative),
+            'TTM': np.where(on_books, ttm, np.nan),
+            'Annualized': annualized,
+            'Variance to Est': annualized - estimated_book
+        })
+    
+    billed = series['Billings'].to_numpy(dtype=float)
+    kpis = {
+        'estimated_book': record.get('Estimated Book', np.nan),
+        'ttm': record.get('TTM', np.nan),
+        'annualized': record.get('Annualized', np.nan),
+        'variance': record.get('Variance to Est', np.nan),
+        'tenure_months': record.get('Tenure Months', np.nan),
+        'months_billed': int((billed > 0).sum()),
+        'best_month': float(billed.max()) if len(billed) else 0.0
+    }
+    return {'record': record, 'series': series, 'kpis': kpis}
+
+# Attorney search
+def normalise_name(text):
+    """Case-fold, strip accents and punctuation so 'José O'Neil' matches 'jose o neil'"""
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    return re.sub(r'[^0-9a-z]+', ' ', text).strip()
+
+def build_name_index(df):
+    """Build a sorted token index over attorney names and their aliases.
+    
+    Every attorney name is an entry; its billing name and group members are
+    aliases that find the same entry. Each normalised token is stored once
+    per (alias, entry) in one sorted list, so any prefix is a contiguous
+    range found by binary search. Entries are numbered in name order, which
+    doubles as the ranking.
+    """
+    if 'Attorney Name' not in df.columns:
+        return None
+    
+    names = pd.Series(pd.unique(df['Attorney Name'].dropna().to_numpy())).astype(str).sort_values(ignore_index=True)
+    entry_of = pd.Series(np.arange(len(names)), index=names.to_numpy())
+    
+    # Distinct (alias, entry) pairs across the alias columns
+    alias_cols = [col for col in df.columns if col in ('Attorney Name', 'Billing Name') or col.startswith('Group Member')]
+    pairs = pd.concat(
+        [pd.DataFrame({'alias': df[col].to_numpy(), 'name': df['Attorney Name'].to_numpy()}) for col in alias_cols],
+        ignore_index=True
+    ).dropna().astype(str).drop_duplicates()
+    pairs = pairs[pairs['name'].isin(entry_of.index)]
+    
+    # Normalise each distinct alias once
+    aliases = pd.unique(pairs['alias'].to_numpy())
+    alias_tokens = {alias: normalise_name(alias).split() for alias in aliases}
+    
+    tokens, entries, first = [], [], []
+    for alias, entry in zip(pairs['alias'].to_numpy(), entry_of[pairs['name'].to_numpy()].to_numpy()):
+        for position, token in enumerate(alias_tokens[alias]):
+            tokens.append(token)
+            entries.append(entry)
+            first.append(position == 0)
+    
+    order = np.argsort(np.array(tokens, dtype=object), kind='stable') if tokens else np.empty(0, dtype=np.int64)
+    return {
+        'names': names.to_numpy(dtype=object),
+        'tokens': [tokens[i] for i in order],
+        'token_entry': np.asarray(entries, dtype=np.int64)[order],
+        'token_first': np.asarray(first, dtype=bool)[order]
+    }
+
+def search_names(index, query, k=10):
+    """Top-k attorney names matching every word of the query as a token prefix.
+    
+    Names whose first word matches the first query word rank ahead of
+    matches elsewhere in a name or alias; ties go alphabetically.
+    """
+    terms = normalise_name(query).split()
+    if index is None or not terms:
+        return []
+    
+    n = len(index['names'])
+    candidates = ranks = None
+    for term in terms:
+        lo = bisect.bisect_left(index['tokens'], term)
+        hi = bisect.bisect_left(index['tokens'], term + '\uffff')
+        entries = index['token_entry'][lo:hi]
+        if candidates is None:
+            candidates = entries
+            ranks = entries + np.where(index['token_first'][lo:hi], 0, n)
+        else:
+            keep = np.isin(candidates, entries)
+            candidates, ranks = candidates[keep], ranks[keep]
+        if not len(candidates):
+            return []
+    
+    # The k best distinct entries: partition on rank first when the range is large
+    if len(ranks) > 4 * k:
+        best = np.argpartition(ranks, 4 * k)[:4 * k]
+        if len(np.unique(candidates[best])) < k:
+            best = np.arange(len(ranks))
+        candidates, ranks = candidates[best], ranks[best]
+    order = np.argsort(ranks, kind='stable')
+    entries = pd.unique(candidates[order])[:k]
+    return index['names'][entries].tolist()
+
+# Presorted, paginated tables
+SORT_KEYS = ['Start Date', 'Leave Date', 'Estimated Book']
+
+TABLE_PAGE_SIZE = 50
+
+# Table sort choices: label -> (sort key, ascending)
+JOINER_SORTS = {
+    'Start Date (newest first)': ('Start Date', False),
+    'Start Date (oldest first)': ('Start Date', True),
+    'Estimated Book (largest first)': ('Estimated Book', False),
+    'Estimated Book (smallest first)': ('Estimated Book', True)
+}
+LEAVER_SORTS = {
+    'Leave Date (newest first)': ('Leave Date', False),
+    'Leave Date (oldest first)': ('Leave Date', True),
+    'Estimated Book (largest first)': ('Estimated Book', False),
+    'Estimated Book (smallest first)': ('Estimated Book', True)
+}
+
+def build_sort_index(df):
+    """Argsort indexes of the roster on its table sort keys, built once per dataset version (or as-of view).
     
-    # Get valid dates only
-    valid_start_dates_df = df.dropna(subset=['Start Date'])
+    For each key 'order' lists row positions from the largest (newest)
+    value down, followed by the rows missing the key, and 'valid' counts
+    the rows that have it. 'left' flags the rows with a leave date.
+    """
+    index = {}
+    for col in SORT_KEYS:
+        if col not in df.columns:
+            continue
+        values = df[col].to_numpy()
+        missing = pd.isna(values)
+        keys = values.astype('datetime64[ns]').astype(np.int64) if values.dtype.kind == 'M' else values.astype(float)
+        valid = np.flatnonzero(~missing)
+        # Stable descending order: argsort the negated keys
+        order = np.concatenate([valid[np.argsort(-keys[valid], kind='stable')], np.flatnonzero(missing)])
+        order.flags.writeable = False
+        index[col] = {'order': order, 'valid': len(valid)}
+    
+    left = df['Leave Date'].notna().to_numpy() if 'Leave Date' in df.columns else np.zeros(len(df), dtype=bool)
+    left.flags.writeable = False
+    index['left'] = left
+    return index
+
+def table_page(sort_index, col, member=None, page=0, page_size=TABLE_PAGE_SIZE, ascending=False):
+    """Row positions of one page of the roster sorted on `col`, restricted to the rows flagged in `member`.
+    
+    Walks the presorted order in growing chunks and stops once the page is
+    filled, so a page costs O(page size) work (divided by the share of rows
+    `member` keeps) however large the roster is. Rows missing the key come
+    last in either direction.
+    """
+    entry = sort_index[col]
+    order = entry['order']
+    valid = order[:entry['valid']]
+    segments = [valid[::-1] if ascending else valid, order[entry['valid']:]]
+    
+    wanted = (page + 1) * page_size
+    hits, found = [], 0
+    for segment in segments:
+        start, chunk = 0, max(page_size * 4, 256)
+        while start < len(segment) and found < wanted:
+            block = segment[start:start + chunk]
+            if member is not None:
+                block = block[member[block]]
+            hits.append(block)
+            found += len(block)
+            start += chunk
+            chunk *= 2
+    
+    if not hits:
+        return np.empty(0, dtype=np.intp)
+    return np.concatenate(hits)[page * page_size:wanted]
+
+def top_rows(values, k, largest=True):
+    """Positions of the k largest (or smallest) values, best first, by partial selection rather than a full sort"""
+    keys = np.asarray(values)
+    keys = keys.astype('datetime64[ns]').astype(np.int64) if keys.dtype.kind == 'M' else keys.astype(float)
+    candidates = np.flatnonzero(~np.isnan(keys) if keys.dtype.kind == 'f' else keys != np.iinfo(np.int64).min)
+    if len(candidates) == 0:
+        return candidates
+    signed = -keys[candidates] if largest else keys[candidates]
+    if len(candidates) > k:
+        picked = np.argpartition(signed, k - 1)[:k]
+        candidates, signed = candidates[picked], signed[picked]
+    return candidates[np.argsort(signed, kind='stable')]
+
+# Revenue forecasting for recent joiners
+def tenure_aligned_billings(df, max_months=36, through=None):
+    """Align each attorney's monthly billings by month of tenure (0 = start month).
     
-    # Create monthly joiners counts
-    if not valid_start_dates_df.empty:
-        # Group by year and month
-        valid_start_dates_df['Year-Month'] = valid_start_dates_df['Start Date'].dt.to_period('M')
-        monthly_joiners = valid_start_dates_df.groupby('Year-Month').size().reset_index(name='Joiners')
-        monthly_joiners['Date'] = monthly_joiners['Year-Month'].dt.to_timestamp()
+    Returns (aligned, data_end_month): aligned[i, k] is row i's billings in its
+    k-th month of tenure, NaN where that month is not observed (before the
+    data starts, after the last month with billings, or after leaving).
+    `through` (a date) also leaves out the months not yet completed on it,
+    as for an as-of roster.
+    """
+    values, month_ordinals = billing_matrix(df)
+    if values.shape[1] == 0 or 'Start Date' not in df.columns:
+        return None, None
+    
+    # Last month that has any billings at all (the export carries empty future months)
+    billed_months = np.flatnonzero(values.sum(axis=0) != 0)
+    if billed_months.size == 0:
+        return None, None
+    data_end_month = month_ordinals[billed_months[-1]]
+    if through is not None:
+        data_end_month = min(data_end_month, last_completed_month(through))
+    
+    start = date_ordinals(df['Start Date'])
+    if 'Leave Date' in df.columns:
+        leave = date_ordinals(df['Leave Date'])
+        last_month = np.where(leave['valid'], np.minimum(leave['M'], data_end_month), data_end_month)
     else:
-        monthly_joiners = pd.DataFrame(columns=['Date', 'Joiners'])
+        last_month = np.full(len(df), data_end_month)
+    
+    tenure_months = np.arange(max_months)
+    cols = (start['M'] - month_ordinals[0])[:, None] + tenure_months[None, :]
+    observed = (start['valid'][:, None] & (cols >= 0) &
+                (month_ordinals[0] + cols <= last_month[:, None]))
+    
+    rows = np.arange(len(df))[:, None]
+    aligned = np.where(observed, values[rows, np.clip(cols, 0, values.shape[1] - 1)], np.nan)
+    
+    return aligned, data_end_month
+
+def fit_ramp_curve(aligned, monthly_book, min_attorneys=3):
+    """Fit the firm's ramp curve from tenure-aligned billings.
+    
+    The curve is the median share of monthly estimated book billed in each
+    month of tenure; months with fewer than `min_attorneys` observations
+    carry the previous value forward.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratios = aligned / monthly_book[:, None]
+    ratios[~np.isfinite(ratios)] = np.nan
+    
+    counts = np.sum(~np.isnan(ratios), axis=0)
+    curve = np.full(ratios.shape[1], np.nan)
+    enough = counts >= min_attorneys
+    if enough.any():
+        curve[enough] = np.nanmedian(ratios[:, enough], axis=0)
+    
+    # Carry the last fitted value forward (and backfill the start) so the curve is complete
+    fitted = np.flatnonzero(~np.isnan(curve))
+    if fitted.size == 0:
+        return np.ones(ratios.shape[1]), ratios
+    carry = np.maximum.accumulate(np.where(np.isnan(curve), 0, np.arange(len(curve))))
+    curve = curve[np.maximum(carry, fitted[0])]
+    
+    return curve, ratios
+
+def forecast_joiner_revenue(df, recent_months=18, horizon=12, max_months=36, through=None):
+    """Project next-12-month billings for recent joiners from the firm's ramp curve.
+    
+    Every attorney is fitted in one vectorized batch: the ramp curve gives the
+    expected share of monthly estimated book by month of tenure, and each
+    joiner's own level relative to that curve is shrunk towards the firm-wide
+    level according to how much of their ramp has been observed. Prediction
+    intervals (P10/P90) combine the spread of attorney levels with month-to-month
+    noise. Also projects the Variance to Est at the end of the current year.
+    `through` (a date) fits and projects from that date, as for an as-of roster.
+    """
+    if df.empty or 'Estimated Book' not in df.columns:
+        return pd.DataFrame()
+    
+    aligned, data_end_month = tenure_aligned_billings(df, max_months, through=through)
+    if aligned is None:
+        return pd.DataFrame()
+    
+    monthly_book = pd.to_numeric(df['Estimated Book'], errors='coerce').fillna(0).to_numpy(dtype=float) / 12
+    monthly_book = np.where(monthly_book > 0, monthly_book, np.nan)
+    curve, ratios = fit_ramp_curve(aligned, monthly_book)
+    
+    # Each attorney's level relative to the curve over the months observed so far
+    observed = ~np.isnan(ratios)
+    expected_share = np.where(observed, curve[None, :], 0).sum(axis=1)
+    actual_share = np.nansum(ratios, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        raw_level = np.where(expected_share > 0, actual_share / expected_share, np.nan)
+    
+    # Credibility weighting: a few ramp months say little about long-run level
+    credibility = expected_share / (expected_share + 3.0)
+    established = observed.sum(axis=1) >= 12
+    firm_level = np.nanmedian(raw_level[established]) if np.any(established & ~np.isnan(raw_level)) else 1.0
+    level = np.where(np.isnan(raw_level), firm_level, credibility * raw_level + (1 - credibility) * firm_level)
+    
+    # Uncertainty: spread of established attorneys' levels, and monthly noise around the curve
+    level_cv = np.nanstd(raw_level[established]) / firm_level if np.sum(established & ~np.isnan(raw_level)) > 1 else 0.5
+    with np.errstate(divide='ignore', invalid='ignore'):
+        residuals = ratios / (curve[None, :] * level[:, None]) - 1
+    residuals = residuals[np.isfinite(residuals)]
+    month_cv = np.std(residuals) if residuals.size > 1 else 0.5
+    forecast_cv = np.sqrt(level_cv ** 2 * (1 - credibility) + month_cv ** 2 / horizon)
+    
+    # Recent, still-active joiners only
+    start = date_ordinals(df['Start Date'])
+    tenure_now = data_end_month - start['M']
+    active = df['Leave Date'].isna().to_numpy() if 'Leave Date' in df.columns else np.ones(len(df), dtype=bool)
+    recent = start['valid'] & active & (tenure_now >= 0) & (tenure_now < recent_months) & ~np.isnan(monthly_book)
+    if not recent.any():
+        return pd.DataFrame()
+    
+    # Next `horizon` months of tenure for every joiner at once
+    future_tenure = np.clip(tenure_now[:, None] + np.arange(1, horizon + 1)[None, :], 0, len(curve) - 1)
+    projected = monthly_book[:, None] * level[:, None] * curve[future_tenure]
+    next_12 = projected.sum(axis=1)
+    
+    # Year-end TTM: actual months up to the data end plus projected months to December
+    year_end_month = (data_end_month // 12) * 12 + 11
+    months_to_year_end = int(year_end_month - data_end_month)
+    window_tenure = tenure_now[:, None] + np.arange(months_to_year_end - 11, months_to_year_end + 1)[None, :]
+    in_window = (window_tenure >= 0) & (window_tenure < max_months)
+    actual_part = np.where(in_window & (window_tenure <= tenure_now[:, None]),
+                           np.nan_to_num(aligned[np.arange(len(df))[:, None], np.clip(window_tenure, 0, max_months - 1)]), 0)
+    projected_part = projected[:, :months_to_year_end].sum(axis=1) if months_to_year_end > 0 else 0
+    year_end_ttm = actual_part.sum(axis=1) + projected_part
+    employed = np.clip(np.sum(window_tenure >= 0, axis=1), 1, 12)
+    year_end_annualized = year_end_ttm * 12 / employed
+    
+    forecast = pd.DataFrame({
+        'Attorney Name': df['Attorney Name'].to_numpy() if 'Attorney Name' in df.columns else None,
+        'Start Date': df['Start Date'].to_numpy(),
+        'Months Observed': tenure_now + 1,
+        'Ramp Level': level,
+        'Next 12M Forecast': next_12,
+        'Forecast P10': np.maximum(next_12 * (1 - 1.2816 * forecast_cv), 0),
+        'Forecast P90': next_12 * (1 + 1.2816 * forecast_cv),
+        'Year-End Annualized': year_end_annualized,
+        'Year-End Variance to Est': year_end_annualized - monthly_book * 12
+    }, index=df.index)
+    
+    return forecast[recent].sort_values('Next 12M Forecast', ascending=False)
+
+def forecast_total_interval(forecast, n_draws=10_000, chunk=1_000, seed=0):
+    """P10 and P90 of the summed next-12-month forecast.
+    
+    Quantiles do not add, so the band for a group of joiners is taken over
+    simulated totals: each draw samples every attorney around their point
+    forecast with the spread their own P10 / P90 imply, and sums them.
+    """
+    point = forecast['Next 12M Forecast'].to_numpy(dtype=float)
+    spread = (forecast['Forecast P90'].to_numpy(dtype=float) - point) / 1.2816
+    rng = np.random.default_rng(seed)
+    totals = np.empty(n_draws)
+    # Chunked over draws so memory stays at chunk x attorneys
+    for lo in range(0, n_draws, chunk):
+        z = rng.standard_normal((min(chunk, n_draws - lo), len(point)))
+        totals[lo:lo + len(z)] = np.maximum(point + spread * z, 0).sum(axis=1)
+    return np.percentile(totals, [10, 90])
+
+@st.cache_data(show_spinner=False)
+def cached_revenue_forecast(_roster, version, as_of_date):
+    """Revenue forecast for an as-of roster's recent joiners, computed once per dataset version and date"""
+    through = None if as_of_date == datetime.date.today() else as_of_date
+    return forecast_joiner_revenue(_roster, through=through)
+
+# Attrition simulation
+def revenue_at_risk(df, horizon=24, n_paths=100_000, seed=0, as_of_date=None):
+    """Simulate annualized revenue lost to attrition over the horizon, per department.
+    
+    Tenure-dependent leave probabilities are estimated from the roster's
+    Start Date / Leave Date history, then applied to every active attorney in
+    `n_paths` vectorized scenarios (chunked across a process pool). Returns
+    the expected loss and loss percentiles per department plus a firm total.
+    Tenure is measured to `as_of_date` (default today), as for an as-of roster.
+    """
+    if 'Start Date' not in df.columns or 'Annualized' not in df.columns or df.empty:
+        return pd.DataFrame()
     
-    # Create monthly leavers counts (if Leave Date is available)
+    start = date_ordinals(df['Start Date'])
     if 'Leave Date' in df.columns:
-        df['Leave Date'] = pd.to_datetime(df['Leave Date'], errors='coerce')
-        valid_leave_dates_df = df.dropna(subset=['Leave Date'])
-        
-        if not valid_leave_dates_df.empty:
-            valid_leave_dates_df['Year-Month'] = valid_leave_dates_df['Leave Date'].dt.to_period('M')
-            monthly_leavers = valid_leave_dates_df.groupby('Year-Month').size().reset_index(name='Leavers')
-            monthly_leavers['Date'] = monthly_leavers['Year-Month'].dt.to_timestamp()
+        leave = date_ordinals(df['Leave Date'])
+        leave_months = np.where(leave['valid'], leave['M'], -1)
+    else:
+        leave_months = np.full(len(df), -1)
+    
+    today = np.datetime64(as_of_date or datetime.date.today(), 'M').astype(np.int64)
+    # Leavers without a start date have no tenure to place their exit at, so the
+    # life table (like the active roster below) only uses rows with a start date
+    has_start = start['valid']
+    hazard = tenure_hazard(start['M'][has_start], leave_months[has_start], today)
+    
+    active = has_start & (leave_months < 0)
+    if not active.any():
+        return pd.DataFrame()
+    
+    if 'Department' in df.columns:
+        group_codes, groups = pd.factorize(df['Department'].fillna('Unassigned')[active], sort=True)
+    else:
+        group_codes, groups = np.zeros(int(active.sum()), dtype=np.int64), pd.Index(['All'])
+    
+    annualized = df['Annualized'].to_numpy(dtype=float)[active]
+    losses = simulate_revenue_at_risk(
+        tenure=today - start['M'][active],
+        annualized=annualized,
+        group_codes=group_codes,
+        n_groups=len(groups),
+        hazard=hazard,
+        horizon=horizon,
+        n_paths=n_paths,
+        seed=seed
+    )
+    
+    # Firm total as an extra column so percentiles are taken over whole-firm paths
+    losses = np.column_stack([losses, losses.sum(axis=1)])
+    percentiles = np.percentile(losses, [50, 90, 95, 99], axis=0)
+    
+    return pd.DataFrame({
+        'Department': list(groups) + ['Firm Total'],
+        'Active Attorneys': np.append(np.bincount(group_codes, minlength=len(groups)), len(annualized)),
+        'Annualized': np.append(np.bincount(group_codes, weights=annualized, minlength=len(groups)), annualized.sum()),
+        'Expected Loss': losses.mean(axis=0),
+        'P50 Loss': percentiles[0],
+        'P90 Loss': percentiles[1],
+        'P95 Loss': percentiles[2],
+        'P99 Loss': percentiles[3]
+    })
+
+@st.cache_data(show_spinner=False)
+def cached_revenue_at_risk(_roster, version, as_of_date, horizon=24):
+    """Revenue-at-risk simulation of an as-of roster, run once per dataset version and date"""
+    return revenue_at_risk(_roster, horizon=horizon, as_of_date=as_of_date)
+
+# Billings-to-collections lag and cash conversion
+COLLECTION_MAX_LAG = 12
+CONVERSION_MAX_LAG = 6
+
+def collections_path():
+    """Path of the optional collections export (JOINERS_LEAVERS_COLLECTIONS, else a local collections.csv)"""
+    path = os.environ.get('JOINERS_LEAVERS_COLLECTIONS') or 'collections.csv'
+    return path if os.path.exists(path) else None
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def load_collections(path, signature):
+    """Read a collections export into one row of monthly collections per attorney.
+    
+    The export has an 'Attorney Name' column and one column per month headed
+    by its month-end date, like the billing months of the main export. Rows
+    for the same attorney (after normalise_name) are summed. Returns
+    {'keys', 'values', 'month_ordinals', 'version'}; `signature` (see
+    file_signature) is only part of the cache key.
+    """
+    with open(path, 'rb') as f:
+        content = f.read()
+    if path.lower().endswith(('.xlsx', '.xls')):
+        raw = pd.read_excel(BytesIO(content))
+    else:
+        raw = pd.read_csv(BytesIO(content))
+    raw.columns = [str(col).strip() for col in raw.columns]
+    if 'Attorney Name' not in raw.columns or not billing_month_columns(raw):
+        raise ValueError(f"{path} needs an 'Attorney Name' column and monthly collection columns")
+    
+    raw = raw[raw['Attorney Name'].notna()]
+    values, month_ordinals = billing_matrix(raw)
+    keys, rows = np.unique(raw['Attorney Name'].map(normalise_name).to_numpy(dtype=str), return_inverse=True)
+    summed = np.zeros((len(keys), values.shape[1]))
+    np.add.at(summed, rows, values)
+    
+    return {
+        'keys': keys,
+        'values': summed,
+        'month_ordinals': month_ordinals,
+        'version': hashlib.sha1(content).hexdigest()[:16]
+    }
+
+def align_collections(df, collections, through=None):
+    """Align billings and collections by attorney and month.
+    
+    Returns (billed, collected, month_ordinals, matched): both matrices are
+    df rows x months over the union of the two calendars, trimmed to the
+    months that carry any billings or collections. `matched` flags the rows
+    whose attorney appears in the collections export (other rows collect 0).
+    `through` (a date) leaves out the months not yet completed on it, as for
+    an as-of roster.
+    """
+    billed, billed_months = billing_matrix(df)
+    collected_months = collections['month_ordinals']
+    months = np.union1d(billed_months, collected_months)
+    if len(months) == 0:
+        return np.zeros((len(df), 0)), np.zeros((len(df), 0)), months, np.zeros(len(df), dtype=bool)
+    months = np.arange(months[0], months[-1] + 1)
+    
+    rows = pd.Index(collections['keys']).get_indexer(df['Attorney Name'].fillna('').map(normalise_name))
+    matched = rows >= 0
+    
+    aligned_billed = np.zeros((len(df), len(months)))
+    aligned_billed[:, billed_months - months[0]] = billed
+    aligned_collected = np.zeros((len(df), len(months)))
+    aligned_collected[np.ix_(np.flatnonzero(matched), collected_months - months[0])] = collections['values'][rows[matched]]
+    
+    if through is not None:
+        completed = months <= last_completed_month(through)
+        aligned_billed, aligned_collected, months = aligned_billed[:, completed], aligned_collected[:, completed], months[completed]
+    
+    active = np.flatnonzero((aligned_billed != 0).any(axis=0) | (aligned_collected != 0).any(axis=0))
+    if active.size == 0:
+        return aligned_billed[:, :0], aligned_collected[:, :0], months[:0], matched
+    window = slice(active[0], active[-1] + 1)
+    return aligned_billed[:, window], aligned_collected[:, window], months[window], matched
+
+def lagged_correlation(billed, collected, max_lag=COLLECTION_MAX_LAG, min_months=6):
+    """Correlation of each row's billings with its collections `lag` months later, for every lag.
+    
+    Every lag is one vectorised pass over all rows (rows x lags result); NaN
+    where fewer than `min_months` months overlap or a series is flat.
+    """
+    n_rows, n_months = billed.shape
+    correlation = np.full((n_rows, max_lag + 1), np.nan)
+    for lag in range(min(max_lag, n_months - min_months) + 1):
+        x = billed[:, :n_months - lag]
+        y = collected[:, lag:]
+        x = x - x.mean(axis=1, keepdims=True)
+        y = y - y.mean(axis=1, keepdims=True)
+        denominator = np.sqrt((x * x).sum(axis=1) * (y * y).sum(axis=1))
+        np.divide((x * y).sum(axis=1), denominator, out=correlation[:, lag], where=denominator > 0)
+    return correlation
+
+def conversion_curves(billed, collected, max_lag=CONVERSION_MAX_LAG, min_months=12):
+    """Cumulative share of each row's billings collected within 0..max_lag months.
+    
+    Collections are modelled as a distributed lag of billings, collected[t]
+    = sum_k w[k] * billed[t - k], fitted for every row at once: the lagged
+    billings are a strided view, the normal equations one einsum, and the
+    small systems one batched ridge-regularised solve. The curve
+    is the running total of the weights, ending at the row's realization
+    within max_lag months. Weights are not clipped at zero: month-to-month
+    billings are strongly autocorrelated, so single weights are noisy but
+    their total is well determined, and clipping would bias it upwards.
+    NaN for rows with fewer than `min_months` billed months.
+    """
+    n_rows, n_months = billed.shape
+    curves = np.full((n_rows, max_lag + 1), np.nan)
+    valid = np.count_nonzero(billed, axis=1) >= min_months
+    if n_months <= max_lag + 1 or not valid.any():
+        return curves
+    
+    # lagged[r, t, k] = billed[r, t + max_lag - k], i.e. billings k months before collection month t + max_lag
+    lagged = np.lib.stride_tricks.sliding_window_view(billed[valid], max_lag + 1, axis=1)[:, :, ::-1]
+    target = collected[valid, max_lag:]
+    gram = np.einsum('rtj,rtk->rjk', lagged, lagged)
+    moments = np.einsum('rtj,rt->rj', lagged, target)
+    # Ridge scaled to the billings' month-to-month variation, not their level: the level is
+    # common to every lag, so a level-scaled ridge smears a clean lag over its neighbours
+    # (a floor keeps flat billings solvable)
+    centred = lagged - lagged.mean(axis=1, keepdims=True)
+    variation = np.einsum('rtj,rtj->r', centred, centred) / (max_lag + 1)
+    ridge = np.maximum(1e-2 * variation, 1e-9 * np.trace(gram, axis1=1, axis2=2))
+    gram += ridge[:, None, None] * np.eye(max_lag + 1)
+    weights = np.linalg.solve(gram, moments[:, :, None])[:, :, 0]
+    
+    curves[valid] = np.cumsum(weights, axis=1)
+    return curves
+
+def collection_analytics(df, collections, through=None):
+    """Collection lag and cash conversion for every attorney at once.
+    
+    Returns {'attorneys', 'month_ordinals', 'billed', 'collected',
+    'curves'}: 'attorneys' shares df's index and holds each matched
+    attorney's 'Typical Lag' (the lag with the highest billings /
+    collections correlation), 'Lag Correlation' and 'Realization' (share of
+    billings collected within CONVERSION_MAX_LAG months); 'curves' are the
+    per-row cumulative conversion curves. The aligned matrices let any
+    filtered subset pool its own firm-level figures. `through` is passed to
+    align_collections.
+    """
+    billed, collected, month_ordinals, matched = align_collections(df, collections, through=through)
+    correlation = lagged_correlation(billed, collected)
+    curves = conversion_curves(billed, collected)
+    curves[~matched] = np.nan
+    
+    has_lag = matched & ~np.all(np.isnan(correlation), axis=1)
+    typical_lag = np.argmax(np.nan_to_num(correlation, nan=-np.inf), axis=1)
+    attorneys = pd.DataFrame({
+        'Attorney Name': df['Attorney Name'].to_numpy(),
+        'Typical Lag': np.where(has_lag, typical_lag, np.nan),
+        'Lag Correlation': np.where(has_lag, correlation[np.arange(len(df)), typical_lag], np.nan),
+        'Realization': curves[:, -1] * 100
+    }, index=df.index)
+    
+    return {
+        'attorneys': attorneys[matched],
+        'month_ordinals': month_ordinals,
+        'billed': billed,
+        'collected': collected,
+        'curves': curves
+    }
+
+def collection_summary(analytics, rows):
+    """Firm-level collection figures pooled over a subset of rows (positions into the analysed frame).
+    
+    Returns {'lag', 'realization', 'monthly', 'conversion'}: the typical lag
+    of the pooled series, the billings-weighted realization, a monthly frame
+    of billings, collections and realization (collections over the billings
+    `lag` months earlier), and the billings-weighted cumulative conversion
+    curve with the pooled correlation at each lag. None without billings.
+    """
+    billed = analytics['billed'][rows].sum(axis=0, keepdims=True)
+    collected = analytics['collected'][rows].sum(axis=0, keepdims=True)
+    if billed.shape[1] == 0 or not billed.any():
+        return None
+    
+    correlation = lagged_correlation(billed, collected)[0]
+    lag = int(np.nanargmax(correlation)) if not np.all(np.isnan(correlation)) else 0
+    n_months = billed.shape[1]
+    
+    lagged_billed = np.full(n_months, np.nan)
+    lagged_billed[lag:] = billed[0, :n_months - lag]
+    realization = np.full(n_months, np.nan)
+    np.divide(collected[0], lagged_billed, out=realization, where=lagged_billed > 0)
+    monthly = pd.DataFrame({
+        'Month': period_start_dates(analytics['month_ordinals'], 'M'),
+        'Billed': billed[0],
+        'Collected': collected[0],
+        'Realization': realization * 100
+    })
+    
+    # Rows without a fitted curve drop out of the billings-weighted average
+    curves = analytics['curves'][rows]
+    fitted = ~np.isnan(curves[:, 0])
+    weights = analytics['billed'][rows][fitted].sum(axis=1)
+    conversion = np.full(CONVERSION_MAX_LAG + 1, np.nan)
+    if weights.sum() > 0:
+        conversion = weights @ curves[fitted] / weights.sum()
+    
+    return {
+        'lag': lag,
+        'realization': conversion[-1] * 100,
+        'monthly': monthly,
+        'conversion': pd.DataFrame({
+            'Lag (Months)': np.arange(CONVERSION_MAX_LAG + 1),
+            'Conversion': conversion * 100,
+            'Correlation': correlation[:CONVERSION_MAX_LAG + 1]
+        })
+    }
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def cached_collection_analytics(_roster, version, as_of_date, collections_path, collections_signature):
+    """Collection analytics for an as-of roster, computed once per dataset version, date and collections version and shared read-only"""
+    through = None if as_of_date == datetime.date.today() else as_of_date
+    analytics = collection_analytics(_roster, load_collections(collections_path, collections_signature), through=through)
+    for values in analytics.values():
+        if isinstance(values, np.ndarray):
+            values.flags.writeable = False
+    analytics['attorneys'] = freeze_frame(analytics['attorneys'])
+    return analytics
+
+# Peer percentile benchmarking
+PEER_GROUPS = ['Department', 'Office', 'Start Year', 'Book Band']
+
+PEER_METRICS = ['Annualized', 'Variance to Est', 'Ramp Speed']
+
+BOOK_BANDS = [0, 500_000, 1_000_000, 2_000_000, 5_000_000, np.inf]
+BOOK_BAND_LABELS = ['Under $500K', '$500K-$1M', '$1M-$2M', '$2M-$5M', '$5M+']
+
+def ramp_speed(df, months=6, min_months=3, through=None):
+    """Average share of monthly estimated book billed over the first `months` months of tenure.
+    
+    NaN for attorneys with fewer than `min_months` of those months observed
+    or without an estimated book. `through` limits the billings to those
+    known on a date (see tenure_aligned_billings).
+    """
+    aligned, _ = tenure_aligned_billings(df, max_months=months, through=through)
+    if aligned is None or 'Estimated Book' not in df.columns:
+        return np.full(len(df), np.nan)
+    
+    monthly_book = pd.to_numeric(df['Estimated Book'], errors='coerce').to_numpy(dtype=float) / 12
+    observed = np.sum(~np.isnan(aligned), axis=1)
+    billed = np.nansum(aligned, axis=1)
+    speed = np.full(len(df), np.nan)
+    np.divide(billed / np.maximum(observed, 1), monthly_book, out=speed,
+              where=(observed >= min_months) & (monthly_book > 0))
+    return speed
+
+def peer_column(metric, group):
+    """Column holding the percentile of `metric` within the `group` peer group"""
+    return f"{metric} Percentile by {group}"
+
+def peer_percentiles(df):
+    """Place every attorney by percentile within each of their peer groups.
+    
+    Peer groups are department, office, start-year cohort and estimated-book
+    band; metrics are annualized revenue, variance to estimate and ramp
+    speed. Each peer group is one grouped rank over all metric columns at
+    once. Percentiles run from 0 to 100 with higher being better, and are NaN
+    where the metric or the group is unknown. The result shares df's index
+    and also carries the 'Book Band', 'Ramp Speed' and '<group> Peers'
+    (group size) columns.
+    """
+    metrics = pd.DataFrame(index=df.index)
+    for metric in ('Annualized', 'Variance to Est'):
+        if metric in df.columns:
+            metrics[metric] = pd.to_numeric(df[metric], errors='coerce')
+    metrics['Ramp Speed'] = ramp_speed(df)
+    
+    # Start Year is missing without a start date, which leaves the attorney out of any cohort
+    groups = {group: df[group] for group in ('Department', 'Office', 'Start Year') if group in df.columns}
+    if 'Estimated Book' in df.columns:
+        groups['Book Band'] = pd.cut(pd.to_numeric(df['Estimated Book'], errors='coerce'), BOOK_BANDS,
+                                     labels=BOOK_BAND_LABELS, right=False)
+    
+    result = {'Book Band': groups.get('Book Band'), 'Ramp Speed': metrics['Ramp Speed']}
+    for group, keys in groups.items():
+        grouped = metrics.groupby(keys.to_numpy(), observed=True, sort=False)
+        ranks = grouped.rank(pct=True) * 100
+        for metric in metrics.columns:
+            result[peer_column(metric, group)] = ranks[metric]
+        result[f"{group} Peers"] = grouped['Ramp Speed'].transform('size')
+    
+    return pd.DataFrame({col: values for col, values in result.items() if values is not None}, index=df.index)
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def cached_peer_percentiles(_df, version):
+    """Peer percentiles for the whole roster, ranked once per dataset version and shared by every session"""
+    return freeze_frame(peer_percentiles(_df))
+
+PEER_QUARTILES = ['Top quartile', 'Second quartile', 'Third quartile', 'Bottom quartile']
+
+def percentile_quartiles(percentiles):
+    """Quartile label for each percentile ('' where unknown)"""
+    percentiles = np.asarray(percentiles, dtype=float)
+    return np.select(
+        [percentiles > 75, percentiles > 50, percentiles > 25, percentiles >= 0],
+        PEER_QUARTILES,
+        default=''
+    )
+
+def peer_summary(peers, record):
+    """One attorney's percentiles as a table: one row per peer group, one column per metric"""
+    ranks = peers.loc[record.name]
+    rows = []
+    for group in PEER_GROUPS:
+        if f"{group} Peers" not in peers.columns or pd.isna(ranks[f"{group} Peers"]):
+            continue
+        value = ranks['Book Band'] if group == 'Book Band' else record.get(group)
+        row = {
+            'Peer Group': group,
+            'Group': str(int(value)) if group == 'Start Year' else value,
+            'Peers': int(ranks[f"{group} Peers"])
+        }
+        for metric in PEER_METRICS:
+            row[metric] = ranks.get(peer_column(metric, group), np.nan)
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def cached_ramp_speed(_roster, version, as_of_date):
+    """Ramp speeds of an as-of roster's rows (see ramp_speed), computed once per dataset version and date"""
+    through = None if as_of_date == datetime.date.today() else as_of_date
+    speed = ramp_speed(_roster, through=through)
+    speed.flags.writeable = False
+    return speed
+
+# Variance attribution (estimated book -> annualized revenue bridge)
+VARIANCE_DIMENSIONS = ['Cohort', 'Department', 'Office', 'Practice Group', 'Ramp', 'Status']
+
+RAMP_BANDS = [-np.inf, 0.5, 0.9, np.inf]
+RAMP_BAND_LABELS = ['Slow ramp (<50%)', 'Ramping (50-90%)', 'On pace (90%+)']
+
+def variance_dimensions(df):
+    """Dimensions the roster can attribute variance along"""
+    available = {'Cohort': 'Start Year', 'Department': 'Department', 'Office': 'Office',
+                 'Practice Group': 'Practice Group', 'Ramp': 'Attorney Name', 'Status': 'Leave Date'}
+    return [dim for dim in VARIANCE_DIMENSIONS if available[dim] in df.columns]
+
+def variance_dimension_labels(df, dim, ramp=None):
+    """Label of every row along one attribution dimension ('Unknown' where missing)"""
+    if dim == 'Cohort':
+        years = pd.Series(df['Start Year'].to_numpy(dtype=float))
+        return years.map('{:.0f}'.format, na_action='ignore').fillna('Unknown').to_numpy()
+    if dim == 'Ramp':
+        speed = ramp if ramp is not None else ramp_speed(df)
+        bands = pd.cut(pd.Series(np.asarray(speed, dtype=float)), RAMP_BANDS, labels=RAMP_BAND_LABELS, right=False)
+        return bands.astype(object).fillna('No ramp history').to_numpy()
+    if dim == 'Status':
+        return np.where(df['Leave Date'].isna().to_numpy(), 'Active', 'Left')
+    return df[dim].astype(object).fillna('Unknown').to_numpy()
+
+def variance_cells(df, hierarchy, ramp=None):
+    """Sum variance to estimate into cells along a hierarchy of dimensions in one grouped pass.
+    
+    Rows are dictionary-encoded per level and summed into the distinct
+    combinations (the cube's cell layout with a single month), so drilling
+    into any level is a rollup of the cells rather than a pass over rows.
+    Rows without a variance are left out, which keeps estimated book plus
+    the summed variance equal to annualized revenue. `ramp` optionally
+    passes precomputed ramp speeds (see ramp_speed).
+    """
+    variance = pd.to_numeric(df['Variance to Est'], errors='coerce').to_numpy(dtype=float)
+    known = ~np.isnan(variance)
+    book = pd.to_numeric(df['Estimated Book'], errors='coerce').fillna(0).to_numpy(dtype=float)
+    
+    codes, labels, sizes = {}, {}, {}
+    for dim in hierarchy:
+        codes[dim], labels[dim] = pd.factorize(variance_dimension_labels(df, dim, ramp)[known], sort=True)
+        sizes[dim] = max(len(labels[dim]), 1)
+    measures = {
+        'Variance': variance[known],
+        'Estimated Book': book[known],
+        'Attorneys': np.ones(int(known.sum()))
+    }
+    table = cube_table(np.zeros(int(known.sum()), dtype=np.int64), codes, measures, sizes)
+    
+    return {
+        'hierarchy': list(hierarchy),
+        'labels': {dim: np.asarray(labels[dim], dtype=object) for dim in hierarchy},
+        'codes': table['codes'],
+        'measures': table['measures']
+    }
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def cached_variance_cells(_df, key, hierarchy, _ramp=None):
+    """Variance cells for a filtered roster, shared by every drill-down of the same view and hierarchy"""
+    return variance_cells(_df, hierarchy, _ramp)
+
+def variance_breakdown(cells, path=()):
+    """Contribution of each member of the next hierarchy level below a drill path.
+    
+    `path` holds one label per leading level (e.g. ('2023', 'Tax')); the
+    result has one row per member of the following level with its
+    'Variance', 'Estimated Book', 'Annualized' and 'Attorneys', sorted from
+    the largest positive to the largest negative contribution.
+    """
+    hierarchy = cells['hierarchy']
+    level = hierarchy[len(path)]
+    
+    mask = np.ones(len(cells['measures']['Variance']), dtype=bool)
+    for dim, label in zip(hierarchy, path):
+        matches = np.flatnonzero(cells['labels'][dim] == label)
+        mask &= cells['codes'][dim] == (matches[0] if len(matches) else -1)
+    
+    groups = cells['codes'][level][mask]
+    size = len(cells['labels'][level])
+    sums = {name: np.bincount(groups, weights=values[mask], minlength=size)
+            for name, values in cells['measures'].items()}
+    
+    breakdown = pd.DataFrame({
+        level: cells['labels'][level],
+        'Variance': sums['Variance'],
+        'Estimated Book': sums['Estimated Book'],
+        'Annualized': sums['Estimated Book'] + sums['Variance'],
+        'Attorneys': sums['Attorneys'].astype(int)
+    })
+    breakdown = breakdown[breakdown['Attorneys'] > 0]
+    return breakdown.sort_values('Variance', ascending=False, ignore_index=True)
+
+# Time-based analysis functions
+PERIOD_GRANULARITIES = {
+    'Week': 'W',
+    'Month': 'M',
+    'Quarter': 'Q',
+    'Year': 'Y'
+}
+
+# Plotly hover date format per granularity (weekly periods keep the day they start on)
+HOVER_DATE_FORMATS = {
+    'Week': '%{x|%b %d, %Y}',
+    'Month': '%{x|%b %Y}',
+    'Quarter': '%{x|%b %Y}',
+    'Year': '%{x|%Y}'
+}
+
+def date_ordinals(dates):
+    """Convert a date column into day and month ordinals (days/months since 1970-01-01)"""
+    values = pd.to_datetime(pd.Series(dates), errors='coerce').to_numpy(dtype='datetime64[ns]')
+    valid = ~np.isnat(values)
+    
+    return {
+        'valid': valid,
+        'D': values.astype('datetime64[D]').astype(np.int64),
+        'M': values.astype('datetime64[M]').astype(np.int64)
+    }
+
+def last_completed_month(date):
+    """Month ordinal of the last month completed on `date` (its own month only on a month end)"""
+    date = pd.Timestamp(date)
+    return date.to_datetime64().astype('datetime64[M]').astype(np.int64) - (not date.is_month_end)
+
+def period_ordinals(ordinals, freq='M'):
+    """Map precomputed day/month ordinals onto week, month, quarter or year ordinals"""
+    if freq == 'W':
+        # 1970-01-01 is a Thursday, so shift by 3 days to get Monday-based weeks
+        return (ordinals['D'] + 3) // 7
+    if freq == 'M':
+        return ordinals['M']
+    if freq == 'Q':
+        return ordinals['M'] // 3
+    if freq == 'Y':
+        return ordinals['M'] // 12
+    raise ValueError(f"Unsupported period granularity: {freq}")
+
+def period_start_dates(period_ords, freq='M'):
+    """Convert period ordinals back to the timestamp at the start of each period"""
+    period_ords = np.asarray(period_ords, dtype=np.int64)
+    if freq == 'W':
+        starts = (period_ords * 7 - 3).astype('datetime64[D]')
+    elif freq == 'M':
+        starts = period_ords.astype('datetime64[M]')
+    elif freq == 'Q':
+        starts = (period_ords * 3).astype('datetime64[M]')
+    elif freq == 'Y':
+        starts = (period_ords * 12).astype('datetime64[M]')
+    else:
+        raise ValueError(f"Unsupported period granularity: {freq}")
+    return pd.DatetimeIndex(starts.astype('datetime64[ns]'))
+
+def period_labels(dates, freq='M'):
+    """Human-readable labels for period start dates"""
+    dates = pd.DatetimeIndex(dates)
+    if freq == 'W':
+        return dates.strftime('Wk of %b %d, %Y')
+    if freq == 'Q':
+        return dates.year.astype(str) + 'Q' + dates.quarter.astype(str)
+    if freq == 'Y':
+        return dates.year.astype(str)
+    return dates.strftime('%b %Y')
+
+def event_ordinals(df):
+    """Precompute start and leave date ordinals once so any granularity can reuse them"""
+    ordinals = {}
+    for key, col in (('start', 'Start Date'), ('leave', 'Leave Date')):
+        if col in df.columns:
+            ordinals[key] = date_ordinals(df[col])
+    return ordinals
+
+def ordinals_view(ordinals, rows):
+    """Event ordinals of a filtered view, taken from the whole roster's by row position"""
+    return {key: {name: values[rows] for name, values in dates.items()} for key, dates in ordinals.items()}
+
+def period_event_counts(ordinals, freq='M'):
+    """Count joiners and leavers per period over a complete calendar (no missing periods)"""
+    events = {}
+    for key, label in (('start', 'Joiners'), ('leave', 'Leavers')):
+        if key in ordinals:
+            events[label] = period_ordinals(ordinals[key], freq)[ordinals[key]['valid']]
         else:
-            monthly_leavers = pd.DataFrame(columns=['Date', 'Leavers'])
+            events[label] = np.empty(0, dtype=np.int64)
+    
+    all_events = np.concatenate(list(events.values()))
+    if all_events.size == 0:
+        return pd.DataFrame()
+    
+    first, last = all_events.min(), all_events.max()
+    n_periods = int(last - first) + 1
+    
+    counts = {
+        label: np.bincount(ords - first, minlength=n_periods)
+        for label, ords in events.items()
+    }
+    
+    dates = period_start_dates(np.arange(first, last + 1), freq)
+    period_data = pd.DataFrame({
+        'Date': dates,
+        'Period': period_labels(dates, freq),
+        'Joiners': counts['Joiners'],
+        'Leavers': counts['Leavers']
+    })
+    
+    # Calculate net change and running total (cumulative sum of net change)
+    period_data['Net Change'] = period_data['Joiners'] - period_data['Leavers']
+    period_data['Cumulative Change'] = period_data['Net Change'].cumsum()
+    
+    return period_data
+
+def monthly_joiners_leavers(df, freq='M'):
+    """Calculate joiners and leavers per period (monthly by default) for trend analysis"""
+    if 'Start Date' not in df.columns or df.empty:
+        return pd.DataFrame()
+    
+    return period_event_counts(event_ordinals(df), freq)
+
+def active_headcount(df, freq='M', dimensions=None, periods=None, include_total=False):
+    """Calculate the true active headcount at the end of each period.
+    
+    Uses a sweep over sorted start and leave dates: the headcount at a period
+    end is the number of starts on or before it minus the number of leaves on
+    or before it, answered with searchsorted in O((n + periods) log n).
+    Passing `dimensions` (e.g. ['Department', 'Office']) breaks the headcount
+    down by every group of every dimension in the same pass; `include_total`
+    adds a 'Total' dimension covering the whole roster alongside them.
+    """
+    if 'Start Date' not in df.columns or df.empty:
+        return pd.DataFrame()
+    
+    start = date_ordinals(df['Start Date'])
+    if 'Leave Date' in df.columns:
+        leave = date_ordinals(df['Leave Date'])
     else:
-        monthly_leavers = pd.DataFrame(columns=['Date', 'Leavers'])
-    
-    # Combine joiners and leavers
-    if not monthly_joiners.empty and not monthly_leavers.empty:
-        monthly_combined = pd.merge(monthly_joiners, monthly_leavers, on='Date', how='outer')
-    elif not monthly_joiners.empty:
-        monthly_combined = monthly_joiners
-        monthly_combined['Leavers'] = 0
-    elif not monthly_leavers.empty:
-        monthly_combined = monthly_leavers
-        monthly_combined['Joiners'] = 0
+        leave = {'valid': np.zeros(len(df), dtype=bool), 'D': np.zeros(len(df), dtype=np.int64)}
+    
+    # People are placed on the timeline by their start date; leavers without one
+    # (see leavers_without_start) were on staff before it begins, until they left
+    has_start = start['valid']
+    if not has_start.any():
+        return pd.DataFrame()
+    on_staff = has_start | leave['valid']
+    has_leave = on_staff & leave['valid']
+    
+    # Periods to evaluate: explicit period start dates, or the full event calendar
+    if periods is not None:
+        period_ords = np.unique(period_ordinals(date_ordinals(periods), freq))
     else:
+        event_ords = period_ordinals(start, freq)[has_start]
+        if has_leave.any():
+            event_ords = np.concatenate([event_ords, period_ordinals(leave, freq)[has_leave]])
+        period_ords = np.arange(event_ords.min(), event_ords.max() + 1)
+    if period_ords.size == 0:
         return pd.DataFrame()
     
-    # Fill NaN values with 0
-    monthly_combined = monthly_combined.fillna(0)
+    # Last day of each period (day before the next period starts)
+    period_dates = period_start_dates(period_ords, freq)
+    period_end_days = period_start_dates(period_ords + 1, freq).values.astype('datetime64[D]').astype(np.int64) - 1
+    
+    # Group codes: one shared key space across all requested dimensions
+    dimensions = [dim for dim in (dimensions or []) if dim in df.columns]
+    if dimensions:
+        codes, group_labels = [], []
+        if include_total:
+            codes.append(np.zeros(len(df), dtype=np.int64))
+            group_labels.append(('Total', 'All'))
+        for dim in dimensions:
+            dim_codes, dim_values = pd.factorize(df[dim], sort=True)
+            # Offset each dimension's codes past the previous dimensions' groups
+            codes.append(np.where(dim_codes >= 0, dim_codes + len(group_labels), -1))
+            group_labels.extend((dim, value) for value in dim_values)
+        n_groups = len(group_labels)
+    else:
+        codes = [np.zeros(len(df), dtype=np.int64)]
+        group_labels = [(None, None)]
+        n_groups = 1
+    
+    first_day = start['D'][has_start].min()
+    last_day = max(start['D'][has_start].max(), leave['D'][has_leave].max() if has_leave.any() else first_day)
+    span = int(last_day - first_day) + 2
+    start_days = np.where(has_start, start['D'], first_day)
     
-    # Calculate net change
-    monthly_combined['Net Change'] = monthly_combined['Joiners'] - monthly_combined['Leavers']
+    def sorted_event_keys(mask, days):
+        # Clip so that bad dates (e.g. leave before any start) stay inside their group's key range
+        keys = [code[mask & (code >= 0)] * span + np.clip(days[mask & (code >= 0)] - first_day, 0, span - 1)
+                for code in codes]
+        return np.sort(np.concatenate(keys))
     
-    # Sort by date
-    monthly_combined = monthly_combined.sort_values('Date')
+    start_keys = sorted_event_keys(on_staff, start_days)
+    leave_keys = sorted_event_keys(has_leave, leave['D'])
     
-    # Calculate running total (cumulative sum of net change)
-    monthly_combined['Cumulative Change'] = monthly_combined['Net Change'].cumsum()
+    # Query grid: (group, period end) pairs, clipped into each group's key range
+    offsets = np.clip(period_end_days - first_day, -1, span - 1)
+    group_base = np.arange(n_groups, dtype=np.int64)[:, None] * span
+    query_keys = group_base + offsets[None, :]
     
-    return monthly_combined
+    def count_on_or_before(keys):
+        return np.searchsorted(keys, query_keys, side='right') - np.searchsorted(keys, group_base, side='left')
+    
+    headcount = count_on_or_before(start_keys) - count_on_or_before(leave_keys)
+    
+    n_periods = len(period_ords)
+    headcount_data = pd.DataFrame({
+        'Date': np.tile(period_dates, n_groups),
+        'Period': np.tile(period_labels(period_dates, freq), n_groups),
+        'Headcount': headcount.ravel()
+    })
+    
+    if dimensions:
+        headcount_data.insert(2, 'Dimension', np.repeat([dim for dim, _ in group_labels], n_periods))
+        headcount_data.insert(3, 'Group', np.repeat([value for _, value in group_labels], n_periods))
+    
+    return headcount_data
 
 def quarterly_growth(df):
     """Calculate quarterly growth based on estimated book values"""
     if 'Start Date' not in df.columns or 'Estimated Book' not in df.columns or df.empty:
         return pd.DataFrame()
     
-    # Ensure dates are in datetime format
-    df['Start Date'] = pd.to_datetime(df['Start Date'], errors='coerce')
+    # Valid records only, grouped from column arrays (no copy of the caller's frame)
+    start_dates = pd.to_datetime(df['Start Date'], errors='coerce')
+    valid = start_dates.notna().to_numpy()
+    if not valid.any():
+        return pd.DataFrame()
     
-    # Get valid records only
-    valid_df = df.dropna(subset=['Start Date'])
+    # Book by start quarter, split into joiners (still here) and leavers
+    left = df['Leave Date'].notna().to_numpy()[valid] if 'Leave Date' in df.columns else np.zeros(int(valid.sum()), dtype=bool)
+    book = pd.DataFrame({
+        'Quarter': start_dates[valid].dt.to_period('Q').to_numpy(),
+        'Left': left,
+        'Estimated Book': df['Estimated Book'].to_numpy()[valid]
+    }).groupby(['Quarter', 'Left'])['Estimated Book'].sum().unstack(fill_value=0)
     
-    if not valid_df.empty:
-        # Create quarter column
-        valid_df['Quarter'] = valid_df['Start Date'].dt.to_period('Q')
-        
-        # For joiners
-        joiners_df = valid_df[valid_df['Leave Date'].isna()]
-        joiners_by_quarter = joiners_df.groupby('Quarter')['Estimated Book'].sum().reset_index(name='Joiners Book')
-        
-        # For leavers
-        if 'Leave Date' in valid_df.columns:
-            leavers_df = valid_df[valid_df['Leave Date'].notna()]
-            leavers_by_quarter = leavers_df.groupby('Quarter')['Estimated Book'].sum().reset_index(name='Leavers Book')
-        else:
-            leavers_by_quarter = pd.DataFrame(columns=['Quarter', 'Leavers Book'])
-        
-        # Combine data
-        if not joiners_by_quarter.empty and not leavers_by_quarter.empty:
-            quarterly_data = pd.merge(joiners_by_quarter, leavers_by_quarter, on='Quarter', how='outer')
-        elif not joiners_by_quarter.empty:
-            quarterly_data = joiners_by_quarter
-            quarterly_data['Leavers Book'] = 0
-        elif not leavers_by_quarter.empty:
-            quarterly_data = leavers_by_quarter
-            quarterly_data['Joiners Book'] = 0
-        else:
-            return pd.DataFrame()
-            
-        # Fill NaN values with 0
-        quarterly_data = quarterly_data.fillna(0)
-        
-        # Calculate net growth
-        quarterly_data['Net Growth'] = quarterly_data['Joiners Book'] - quarterly_data['Leavers Book']
-        
-        # Sort by quarter
-        quarterly_data = quarterly_data.sort_values('Quarter')
-        
-        # Add human-readable quarter label
-        quarterly_data['Quarter Label'] = quarterly_data['Quarter'].astype(str)
-        
-        return quarterly_data
+    # Sorted by quarter, missing sides as 0
+    quarterly_data = pd.DataFrame({
+        'Quarter': book.index,
+        'Joiners Book': book[False].to_numpy() if False in book.columns else 0,
+        'Leavers Book': book[True].to_numpy() if True in book.columns else 0
+    })
+    
+    # Calculate net growth
+    quarterly_data['Net Growth'] = quarterly_data['Joiners Book'] - quarterly_data['Leavers Book']
     
-    return pd.DataFrame()
+    # Add human-readable quarter label
+    quarterly_data['Quarter Label'] = quarterly_data['Quarter'].astype(str)
+    
+    return quarterly_data
 
 def department_performance(df):
     """Analyze performance by department if department data exists"""
@@ -495,12 +2849,15 @@ def create_attorney_heatmap_data(df):
     if 'Attorney Name' not in df.columns or 'Estimated Book' not in df.columns or 'Start Date' not in df.columns:
         return None
     
-    # Ensure dates are in datetime format
-    df['Start Date'] = pd.to_datetime(df['Start Date'], errors='coerce')
-    
-    # Add month and year columns
-    df['Month'] = df['Start Date'].dt.month
-    df['Month Name'] = df['Start Date'].dt.strftime('%b')
+    # Add month columns on a new frame (the input may be the shared dataset)
+    # (month names by lookup: strftime formats row by row and dominated this function)
+    start_dates = pd.to_datetime(df['Start Date'], errors='coerce')
+    months = start_dates.dt.month
+    month_names = np.array(list(calendar.month_abbr), dtype=object)[months.fillna(0).astype(int).to_numpy()]
+    df = df.assign(**{
+        'Month': months,
+        'Month Name': np.where(months.notna().to_numpy(), month_names, np.nan)
+    })
     
     # Create pivot table: attorneys vs months with estimated book values
     pivot_data = df.pivot_table(
@@ -511,14 +2868,194 @@ def create_attorney_heatmap_data(df):
         fill_value=0
     )
     
-    # Reorder columns by month
-    month_order = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
-                   'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-    ordered_cols = [col for col in month_order if col in pivot_data.columns]
-    if ordered_cols:
-        pivot_data = pivot_data[ordered_cols]
+    # Reorder columns by month
+    month_order = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
+                   'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+    ordered_cols = [col for col in month_order if col in pivot_data.columns]
+    if ordered_cols:
+        pivot_data = pivot_data[ordered_cols]
+    
+    return pivot_data
+
+# Period-over-period comparison
+COMPARISON_MODES = {
+    'Year over Year': 'YoY',
+    'Quarter over Quarter': 'QoQ',
+    'Same Period Last Year (to date)': 'YTD'
+}
+
+COMPARISON_MEASURES = ['Joiners', 'Leavers', 'Estimated Book', 'Billings', 'Net Headcount']
+
+PERIODS_PER_YEAR = {'W': 52, 'M': 12, 'Q': 4, 'Y': 1}
+
+def comparison_lag(freq, mode):
+    """Number of periods back to the comparison period (None when the mode does not fit the granularity)"""
+    if mode == 'QoQ':
+        return {'W': 13, 'M': 3, 'Q': 1}.get(freq)
+    return PERIODS_PER_YEAR[freq]
+
+def period_comparison(df, roster_df, freq='M', mode='YoY', ordinals=None):
+    """Aligned current vs comparison-period values for every measure and period.
+    
+    Joiners, leavers and their estimated book are counted from `df` by start
+    and leave period; billings (month columns) and the net headcount at each
+    period end come from `roster_df`. All measures are laid out as a
+    measures x periods matrix over one complete calendar of period ordinals,
+    so the comparison is a single shift of that matrix by the mode's lag:
+    a year for YoY, a quarter for QoQ, and for same-period-last-year the
+    additive measures are first accumulated year to date. Weekly years are
+    taken as 52 weeks.
+    
+    Returns a long frame with one row per (measure, period) that has a
+    comparison period inside the data. `ordinals` passes df's precomputed
+    event_ordinals (see ordinals_view).
+    """
+    lag = comparison_lag(freq, mode)
+    if lag is None or 'Start Date' not in df.columns:
+        return pd.DataFrame()
+    
+    ordinals = ordinals if ordinals is not None else event_ordinals(df)
+    start, leave = ordinals['start'], ordinals.get('leave')
+    start_periods = period_ordinals(start, freq)[start['valid']]
+    leave_periods = period_ordinals(leave, freq)[leave['valid']] if leave is not None else np.empty(0, dtype=np.int64)
+    book = (pd.to_numeric(df['Estimated Book'], errors='coerce').fillna(0).to_numpy(dtype=float)[start['valid']]
+            if 'Estimated Book' in df.columns else np.zeros(len(start_periods)))
+    
+    # Billing month columns summed per month, placed by the day their month ends
+    month_cols = billing_month_columns(roster_df)
+    month_totals = np.array([pd.to_numeric(roster_df[col], errors='coerce').sum() for col in month_cols])
+    month_ords = date_ordinals(pd.Series([str(col)[:10] for col in month_cols]))['M']
+    month_end_days = (month_ords + 1).astype('datetime64[M]').astype('datetime64[D]').astype(np.int64) - 1
+    billing_periods = period_ordinals({'D': month_end_days, 'M': month_ords}, freq)
+    
+    all_periods = np.concatenate([start_periods, leave_periods, billing_periods])
+    if all_periods.size == 0:
+        return pd.DataFrame()
+    first = all_periods.min()
+    n_periods = int(all_periods.max() - first) + 1
+    if n_periods <= lag:
+        return pd.DataFrame()
+    
+    values = np.zeros((len(COMPARISON_MEASURES), n_periods))
+    values[0] = np.bincount(start_periods - first, minlength=n_periods)
+    values[1] = np.bincount(leave_periods - first, minlength=n_periods)
+    values[2] = np.bincount(start_periods - first, weights=book, minlength=n_periods)
+    values[3] = np.bincount(billing_periods - first, weights=month_totals, minlength=n_periods)
+    
+    dates = period_start_dates(np.arange(first, first + n_periods), freq)
+    headcount = active_headcount(roster_df, freq, periods=dates)
+    if not headcount.empty:
+        values[4] = headcount.set_index('Date')['Headcount'].reindex(dates).fillna(0).to_numpy()
+    
+    if mode == 'YTD':
+        # Running totals that restart each calendar year (headcount is a level and stays as is)
+        year_start = np.r_[True, dates.year[1:] != dates.year[:-1]]
+        totals = np.cumsum(values[:4], axis=1)
+        before_year = (totals - values[:4])[:, year_start][:, np.cumsum(year_start) - 1]
+        values[:4] = totals - before_year
+    
+    # Shift the whole matrix by the lag: column j is compared with column j - lag
+    current, prior = values[:, lag:], values[:, :-lag]
+    change = current - prior
+    change_pct = np.divide(change, np.abs(prior), out=np.full(change.shape, np.nan), where=prior != 0) * 100
+    
+    labels = period_labels(dates, freq)
+    n_shown = n_periods - lag
+    return pd.DataFrame({
+        'Measure': np.repeat(COMPARISON_MEASURES, n_shown),
+        'Date': np.tile(dates[lag:], len(COMPARISON_MEASURES)),
+        'Period': np.tile(labels[lag:], len(COMPARISON_MEASURES)),
+        'Comparison Period': np.tile(labels[:-lag], len(COMPARISON_MEASURES)),
+        'Current': current.ravel(),
+        'Prior': prior.ravel(),
+        'Change': change.ravel(),
+        'Change %': change_pct.ravel()
+    })
+
+# Concurrent aggregate precompute
+# No more threads than cores: the aggregates are CPU-bound and contend for the GIL between numpy calls
+AGGREGATE_WORKERS = min(4, os.cpu_count() or 1)
+
+@st.cache_resource(show_spinner=False)
+def aggregate_executor():
+    """Bounded thread pool shared by every session for the per-rerun tab aggregates"""
+    return ThreadPoolExecutor(max_workers=AGGREGATE_WORKERS, thread_name_prefix='aggregates')
+
+def run_aggregate(task, superseded):
+    """Run one submitted aggregate task unless a newer rerun has replaced its run (CancelledError)"""
+    if superseded.is_set():
+        raise CancelledError()
+    return task()
+
+def start_aggregates(executor, tasks, superseded=None):
+    """Start independent aggregate computations together and return the run.
+    
+    `tasks` maps a name to a zero-argument callable. The run is a dict
+    with the {name: future} 'futures' and the 'superseded' event, its
+    generation token. Passing the earlier rerun's run that this one
+    replaces cancels its queued work and sets its token, so a task a worker
+    has already dequeued (which Future.cancel no longer reaches) stops
+    before it starts, and rapid filter changes do not pile up stale
+    computations. The aggregate functions themselves know nothing of it.
+    """
+    if superseded is not None:
+        superseded['superseded'].set()
+        for future in superseded['futures'].values():
+            future.cancel()
+    token = threading.Event()
+    return {
+        'futures': {name: executor.submit(run_aggregate, task, token) for name, task in tasks.items()},
+        'superseded': token
+    }
+
+def trend_aggregates(df, roster_df, freq, breakdown_dims, ordinals=None):
+    """Joiners/leavers per period with the active headcount at each period end (total and per breakdown).
+    
+    `ordinals` passes df's precomputed event_ordinals (see ordinals_view).
+    """
+    trend_ordinals = {}
+    if 'Start Date' in df.columns and not df.empty:
+        trend_ordinals = ordinals if ordinals is not None else event_ordinals(df)
+    monthly_data = period_event_counts(trend_ordinals, freq) if trend_ordinals else pd.DataFrame()
     
-    return pivot_data
+    # True active headcount at each period end, swept over the whole roster
+    headcount_data = pd.DataFrame()
+    if not monthly_data.empty:
+        headcount_data = active_headcount(roster_df, freq, dimensions=breakdown_dims,
+                                          periods=monthly_data['Date'], include_total=True)
+        if not headcount_data.empty:
+            if breakdown_dims:
+                totals = headcount_data[headcount_data['Dimension'] == 'Total'].set_index('Date')['Headcount']
+            else:
+                totals = headcount_data.set_index('Date')['Headcount']
+            monthly_data = monthly_data.assign(**{
+                'Active Headcount': monthly_data['Date'].map(totals).fillna(0).astype(int)
+            })
+    return monthly_data, headcount_data
+
+# Cached figure layer: chart JSON keyed by aggregate fingerprint and chart options
+
+def aggregate_fingerprint(data):
+    """Content hash of an aggregate frame (values, index, column names and dtypes)"""
+    digest = hashlib.sha1(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    digest.update(repr([(str(col), str(dtype)) for col, dtype in data.dtypes.items()]).encode('utf-8'))
+    return digest.hexdigest()
+
+@st.cache_resource(max_entries=256, show_spinner=False)
+def cached_figure_spec(chart, fingerprint, options, _build, _data):
+    """Serialized figure JSON, built and validated once per aggregate and options"""
+    return pio.to_json(_build(_data, *options), validate=False)
+
+def show_figure(chart, build, data, *options):
+    """Render a chart from its cached figure JSON.
+    
+    The figure is only built from the aggregate when the aggregate's content
+    or the chart options change; otherwise the stored JSON is rendered
+    through st.plotly_chart as is. JSON strings are immutable, so one cached
+    spec can serve every session.
+    """
+    spec = cached_figure_spec(chart, aggregate_fingerprint(data), options, build, data)
+    st.plotly_chart(go.Figure(json.loads(spec)), use_container_width=True, config={'displayModeBar': False})
 
 # Visualization functions
 def create_kpi_cards(kpis):
@@ -590,12 +3127,19 @@ def create_kpi_cards(kpis):
         </div>
         """.format(retention_color, kpis['retention_rate']), unsafe_allow_html=True)
 
-def plot_joiners_leavers_trend(monthly_data):
+def plot_joiners_leavers_trend(monthly_data, granularity='Month'):
     """Create plot for joiners and leavers trend"""
     if monthly_data.empty:
         st.info("No valid time-series data available for trend visualization.")
         return
     
+    show_figure('joiners_leavers_trend', joiners_leavers_trend_figure, monthly_data, granularity)
+
+def joiners_leavers_trend_figure(monthly_data, granularity):
+    """Dual-axis joiners / leavers / net change figure"""
+    # Hover date format matching the selected period granularity
+    hover_date = HOVER_DATE_FORMATS.get(granularity, '%{x|%b %Y}')
+    
     # Create plotly figure with dual axis
     fig = make_subplots(specs=[[{"secondary_y": True}]])
     
@@ -606,7 +3150,7 @@ def plot_joiners_leavers_trend(monthly_data):
             y=monthly_data['Joiners'],
             name="Joiners",
             marker_color='#3B82F6',
-            hovertemplate='<b>%{x|%b %Y}</b><br>Joiners: %{y}<extra></extra>'
+            hovertemplate='<b>' + hover_date + '</b><br>Joiners: %{y}<extra></extra>'
         ),
         secondary_y=False,
     )
@@ -617,7 +3161,7 @@ def plot_joiners_leavers_trend(monthly_data):
             y=monthly_data['Leavers'],
             name="Leavers",
             marker_color='#EF4444',
-            hovertemplate='<b>%{x|%b %Y}</b><br>Leavers: %{y}<extra></extra>'
+            hovertemplate='<b>' + hover_date + '</b><br>Leavers: %{y}<extra></extra>'
         ),
         secondary_y=False,
     )
@@ -629,26 +3173,27 @@ def plot_joiners_leavers_trend(monthly_data):
             y=monthly_data['Net Change'],
             name="Net Change",
             line=dict(color='#10B981', width=3, dash='solid'),
-            hovertemplate='<b>%{x|%b %Y}</b><br>Net Change: %{y}<extra></extra>'
+            hovertemplate='<b>' + hover_date + '</b><br>Net Change: %{y}<extra></extra>'
         ),
         secondary_y=False,
     )
     
-    # Add cumulative change line on secondary axis
+    # Add active headcount (or cumulative change if unavailable) on secondary axis
+    secondary_col = 'Active Headcount' if 'Active Headcount' in monthly_data.columns else 'Cumulative Change'
     fig.add_trace(
         go.Scatter(
             x=monthly_data['Date'],
-            y=monthly_data['Cumulative Change'],
-            name="Cumulative Change",
+            y=monthly_data[secondary_col],
+            name=secondary_col,
             line=dict(color='#8B5CF6', width=3, dash='dot'),
-            hovertemplate='<b>%{x|%b %Y}</b><br>Cumulative Change: %{y}<extra></extra>'
+            hovertemplate='<b>' + hover_date + '</b><br>' + secondary_col + ': %{y}<extra></extra>'
         ),
         secondary_y=True,
     )
     
     # Update layout
     fig.update_layout(
-        title='Monthly Joiners and Leavers Trend',
+        title=f'{granularity}ly Joiners and Leavers Trend',
         xaxis_title='',
         barmode='group',
         legend=dict(
@@ -665,11 +3210,213 @@ def plot_joiners_leavers_trend(monthly_data):
     )
     
     # Set y-axes titles
-    fig.update_yaxes(title_text="Monthly Count", secondary_y=False)
-    fig.update_yaxes(title_text="Cumulative Change", secondary_y=True)
+    fig.update_yaxes(title_text=f"{granularity}ly Count", secondary_y=False)
+    fig.update_yaxes(title_text=secondary_col, secondary_y=True)
+    
+    return fig
+
+def plot_headcount_breakdown(headcount_data, dimension, granularity='Month'):
+    """Create line plot of active headcount per group of a dimension"""
+    if headcount_data is None or headcount_data.empty:
+        st.info("No headcount data available for visualization.")
+        return
+    
+    hover_date = HOVER_DATE_FORMATS.get(granularity, '%{x|%b %Y}')
+    fig = go.Figure()
+    
+    for group, group_data in headcount_data.groupby('Group', sort=True):
+        fig.add_trace(
+            go.Scatter(
+                x=group_data['Date'],
+                y=group_data['Headcount'],
+                name=str(group),
+                mode='lines',
+                line=dict(width=2),
+                hovertemplate='<b>' + hover_date + '</b><br>' + str(group) + ': %{y}<extra></extra>'
+            )
+        )
+    
+    fig.update_layout(
+        title=f'Active Headcount by {dimension} ({granularity}-End)',
+        xaxis_title='',
+        yaxis_title='Active Headcount',
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        plot_bgcolor='white',
+        hovermode='x unified',
+        margin=dict(l=60, r=30, t=50, b=60),
+        height=400
+    )
+    
+    st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+
+def plot_period_comparison(comparison, measure, mode_label):
+    """Paired bars of each period against its comparison period, with the % change on a second axis"""
+    if comparison is None or comparison.empty:
+        st.info("Not enough history for this comparison at the selected granularity.")
+        return
+    
+    data = comparison[comparison['Measure'] == measure]
+    money = measure in ('Estimated Book', 'Billings')
+    value_format = '$%{y:,.0f}' if money else '%{y:,.0f}'
+    
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    
+    fig.add_trace(
+        go.Bar(
+            x=data['Period'],
+            y=data['Current'],
+            name="Current",
+            marker_color='#3B82F6',
+            hovertemplate='<b>%{x}</b><br>' + measure + ': ' + value_format + '<extra></extra>'
+        ),
+        secondary_y=False,
+    )
+    
+    fig.add_trace(
+        go.Bar(
+            x=data['Period'],
+            y=data['Prior'],
+            name="Comparison Period",
+            marker_color='#93C5FD',
+            customdata=data['Comparison Period'],
+            hovertemplate='<b>%{customdata}</b><br>' + measure + ': ' + value_format + '<extra></extra>'
+        ),
+        secondary_y=False,
+    )
+    
+    fig.add_trace(
+        go.Scatter(
+            x=data['Period'],
+            y=data['Change %'],
+            name="Change %",
+            mode='lines+markers',
+            line=dict(color='#F59E0B', width=2),
+            hovertemplate='<b>%{x}</b><br>Change: %{y:+.1f}%<extra></extra>'
+        ),
+        secondary_y=True,
+    )
+    
+    fig.update_layout(
+        title=f'{measure}: {mode_label}',
+        xaxis_title='',
+        barmode='group',
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        plot_bgcolor='white',
+        hovermode='x unified',
+        margin=dict(l=60, r=30, t=50, b=60),
+        height=450
+    )
+    
+    fig.update_yaxes(title_text=measure, secondary_y=False)
+    fig.update_yaxes(title_text="Change %", secondary_y=True)
+    
+    st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+
+def plot_collections(summary):
+    """Monthly billings against collections with the lag-aligned realization rate, and the cumulative conversion curve"""
+    monthly = summary['monthly']
+    fig = make_subplots(rows=1, cols=2, column_widths=[0.62, 0.38], horizontal_spacing=0.1,
+                        specs=[[{"secondary_y": True}, {}]],
+                        subplot_titles=("Billings vs Collections",
+                                        f"Cumulative Conversion (typical lag {summary['lag']} months)"))
+    
+    fig.add_trace(
+        go.Bar(x=monthly['Month'], y=monthly['Billed'], name="Billed", marker_color='#93C5FD',
+               hovertemplate='<b>%{x|%b %Y}</b><br>Billed: $%{y:,.0f}<extra></extra>'),
+        row=1, col=1, secondary_y=False
+    )
+    fig.add_trace(
+        go.Bar(x=monthly['Month'], y=monthly['Collected'], name="Collected", marker_color='#10B981',
+               hovertemplate='<b>%{x|%b %Y}</b><br>Collected: $%{y:,.0f}<extra></extra>'),
+        row=1, col=1, secondary_y=False
+    )
+    fig.add_trace(
+        go.Scatter(x=monthly['Month'], y=monthly['Realization'], name="Realization %", mode='lines+markers',
+                   line=dict(color='#F59E0B', width=2),
+                   hovertemplate='<b>%{x|%b %Y}</b><br>Realization: %{y:.1f}%<extra></extra>'),
+        row=1, col=1, secondary_y=True
+    )
+    
+    conversion = summary['conversion']
+    fig.add_trace(
+        go.Scatter(x=conversion['Lag (Months)'], y=conversion['Conversion'], name="Collected within lag",
+                   mode='lines+markers', line=dict(color='#1E40AF', width=3), fill='tozeroy',
+                   hovertemplate='Within %{x} months: %{y:.1f}%<extra></extra>'),
+        row=1, col=2
+    )
+    
+    fig.update_layout(
+        barmode='group',
+        legend=dict(orientation="h", yanchor="bottom", y=1.08, xanchor="right", x=1),
+        plot_bgcolor='white',
+        margin=dict(l=60, r=30, t=70, b=60),
+        height=450
+    )
+    fig.update_yaxes(title_text="Amount ($)", row=1, col=1, secondary_y=False)
+    fig.update_yaxes(title_text="Realization %", row=1, col=1, secondary_y=True)
+    fig.update_yaxes(title_text="% of Billings Collected", row=1, col=2)
+    fig.update_xaxes(title_text="Months After Billing", row=1, col=2)
+    
+    st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+
+def plot_attorney_profile(profile):
+    """Monthly billings, TTM and run-rate against the estimated book; ramp and variance below"""
+    series = profile['series']
+    if series.empty:
+        st.info("No monthly billings available for this attorney.")
+        return
+    
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    fig.add_trace(
+        go.Bar(x=series['Month'], y=series['Billings'], name='Monthly Billings', marker_color='#93C5FD',
+               hovertemplate='<b>%{x|%b %Y}</b><br>Billings: $%{y:,.0f}<extra></extra>'),
+        secondary_y=True
+    )
+    for col, color in (('TTM', '#1E40AF'), ('Annualized', '#10B981')):
+        fig.add_trace(
+            go.Scatter(x=series['Month'], y=series[col], name=col, mode='lines', line=dict(color=color, width=3),
+                       hovertemplate='<b>%{x|%b %Y}</b><br>' + col + ': $%{y:,.0f}<extra></extra>'),
+            secondary_y=False
+        )
+    estimated_book = profile['kpis']['estimated_book']
+    if pd.notna(estimated_book) and estimated_book:
+        fig.add_hline(y=estimated_book, line_dash='dash', line_color='#EF4444',
+                      annotation_text='Estimated Book', annotation_position='top left')
     
-    # Display the chart
+    fig.update_layout(
+        title='Billings, TTM and Annualized Run-Rate',
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        plot_bgcolor='white',
+        hovermode='x unified',
+        margin=dict(l=60, r=60, t=50, b=60),
+        height=420
+    )
+    fig.update_yaxes(title_text='TTM / Annualized ($)', secondary_y=False)
+    fig.update_yaxes(title_text='Monthly Billings ($)', secondary_y=True, showgrid=False)
     st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        ramp = series[series['Tenure Month'] >= 0]
+        fig = go.Figure(go.Bar(
+            x=ramp['Tenure Month'] + 1, y=ramp['Billings'], marker_color='#3B82F6',
+            hovertemplate='Month %{x}<br>Billings: $%{y:,.0f}<extra></extra>'
+        ))
+        fig.update_layout(title='Ramp (Billings by Month of Tenure)', xaxis_title='Month of Tenure',
+                          plot_bgcolor='white', margin=dict(l=60, r=30, t=50, b=60), height=320)
+        st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+    
+    with col2:
+        variance = series['Variance to Est']
+        fig = go.Figure(go.Bar(
+            x=series['Month'], y=variance,
+            marker_color=np.where(variance.fillna(0) >= 0, '#10B981', '#EF4444'),
+            hovertemplate='<b>%{x|%b %Y}</b><br>Variance: $%{y:,.0f}<extra></extra>'
+        ))
+        fig.update_layout(title='Variance to Estimate Over Time', plot_bgcolor='white',
+                          margin=dict(l=60, r=30, t=50, b=60), height=320)
+        st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
 
 def plot_quarterly_growth(quarterly_data):
     """Create plot for quarterly growth"""
@@ -677,6 +3424,10 @@ def plot_quarterly_growth(quarterly_data):
         st.info("No valid quarterly data available for growth visualization.")
         return
     
+    show_figure('quarterly_growth', quarterly_growth_figure, quarterly_data)
+
+def quarterly_growth_figure(quarterly_data):
+    """Joiners vs leavers book value bars with the net growth line"""
     # Create plotly figure
     fig = go.Figure()
     
@@ -733,8 +3484,7 @@ def plot_quarterly_growth(quarterly_data):
         height=450
     )
     
-    # Display the chart
-    st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+    return fig
 
 def plot_department_performance(dept_data):
     """Create plots for department performance"""
@@ -746,82 +3496,86 @@ def plot_department_performance(dept_data):
     col1, col2 = st.columns(2)
     
     with col1:
-        # Department Book Value and Revenue
-        fig1 = go.Figure()
-        
-        fig1.add_trace(
-            go.Bar(
-                x=dept_data['Department'],
-                y=dept_data['Estimated Book'],
-                name="Estimated Book",
-                marker_color='#3B82F6',
-                hovertemplate='<b>%{x}</b><br>Estimated Book: $%{y:,.0f}<extra></extra>'
-            )
-        )
-        
-        fig1.add_trace(
-            go.Bar(
-                x=dept_data['Department'],
-                y=dept_data['Annualized'],
-                name="Annualized Revenue",
-                marker_color='#10B981',
-                hovertemplate='<b>%{x}</b><br>Annualized Revenue: $%{y:,.0f}<extra></extra>'
-            )
+        show_figure('department_financials', department_financials_figure, dept_data)
+    
+    with col2:
+        show_figure('department_revenue_per_attorney', department_revenue_per_attorney_figure, dept_data)
+    
+    show_figure('department_performance_ratio', department_performance_ratio_figure, dept_data)
+
+def department_financials_figure(dept_data):
+    """Department Book Value and Revenue"""
+    fig1 = go.Figure()
+    
+    fig1.add_trace(
+        go.Bar(
+            x=dept_data['Department'],
+            y=dept_data['Estimated Book'],
+            name="Estimated Book",
+            marker_color='#3B82F6',
+            hovertemplate='<b>%{x}</b><br>Estimated Book: $%{y:,.0f}<extra></extra>'
         )
-        
-        fig1.update_layout(
-            title='Department Financial Performance',
-            xaxis_title='',
-            yaxis_title='Value ($)',
-            barmode='group',
-            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
-            plot_bgcolor='white',
-            height=350
+    )
+    
+    fig1.add_trace(
+        go.Bar(
+            x=dept_data['Department'],
+            y=dept_data['Annualized'],
+            name="Annualized Revenue",
+            marker_color='#10B981',
+            hovertemplate='<b>%{x}</b><br>Annualized Revenue: $%{y:,.0f}<extra></extra>'
         )
-        
-        st.plotly_chart(fig1, use_container_width=True, config={'displayModeBar': False})
+    )
     
-    with col2:
-        # Revenue per Attorney by Department
-        fig2 = go.Figure()
-        
-        color_scale = px.colors.sequential.Blues[3:]  # Get a subset of the Blues color scale
-        performance_colors = []
-        
-        for ratio in dept_data['Performance Ratio']:
-            if ratio >= 100:
-                performance_colors.append('#10B981')  # Green for good performance
-            elif ratio >= 90:
-                performance_colors.append('#FBBF24')  # Yellow for average performance
-            else:
-                performance_colors.append('#EF4444')  # Red for poor performance
-        
-        fig2.add_trace(
-            go.Bar(
-                x=dept_data['Department'],
-                y=dept_data['Revenue per Attorney'],
-                marker_color=color_scale,
-                text=dept_data['Attorney Name'],
-                textposition='auto',
-                hovertemplate=(
-                    '<b>%{x}</b><br>' +
-                    'Revenue per Attorney: $%{y:,.0f}<br>' +
-                    'Number of Attorneys: %{text}<extra></extra>'
-                )
+    fig1.update_layout(
+        title='Department Financial Performance',
+        xaxis_title='',
+        yaxis_title='Value ($)',
+        barmode='group',
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        plot_bgcolor='white',
+        height=350
+    )
+    
+    return fig1
+
+def department_revenue_per_attorney_figure(dept_data):
+    """Revenue per Attorney by Department"""
+    fig2 = go.Figure()
+    
+    color_scale = px.colors.sequential.Blues[3:]  # Get a subset of the Blues color scale
+    
+    fig2.add_trace(
+        go.Bar(
+            x=dept_data['Department'],
+            y=dept_data['Revenue per Attorney'],
+            marker_color=color_scale,
+            text=dept_data['Attorney Name'],
+            textposition='auto',
+            hovertemplate=(
+                '<b>%{x}</b><br>' +
+                'Revenue per Attorney: $%{y:,.0f}<br>' +
+                'Number of Attorneys: %{text}<extra></extra>'
             )
         )
-        
-        fig2.update_layout(
-            title='Revenue per Attorney by Department',
-            xaxis_title='',
-            yaxis_title='Revenue per Attorney ($)',
-            plot_bgcolor='white',
-            height=350
-        )
-        
-        st.plotly_chart(fig2, use_container_width=True, config={'displayModeBar': False})
+    )
+    
+    fig2.update_layout(
+        title='Revenue per Attorney by Department',
+        xaxis_title='',
+        yaxis_title='Revenue per Attorney ($)',
+        plot_bgcolor='white',
+        height=350
+    )
+    
+    return fig2
+
+def department_performance_ratio_figure(dept_data):
+    """Performance Ratio Chart"""
+    # Green for good performance, yellow for average, red for poor
+    ratio = dept_data['Performance Ratio'].to_numpy()
+    performance_colors = np.select([ratio >= 100, ratio >= 90], ['#10B981', '#FBBF24'], '#EF4444').tolist()
     
-    # Performance Ratio Chart
     fig3 = go.Figure()
     
     fig3.add_trace(
@@ -864,7 +3618,37 @@ def plot_department_performance(dept_data):
         )
     )
     
-    st.plotly_chart(fig3, use_container_width=True, config={'displayModeBar': False})
+    return fig3
+
+def plot_variance_waterfall(breakdown, level, scope):
+    """Bridge from estimated book to annualized revenue, one step per member of a hierarchy level"""
+    if breakdown is None or breakdown.empty:
+        st.info("No variance to attribute for the selected filters.")
+        return
+    
+    start = breakdown['Estimated Book'].sum()
+    fig = go.Figure(go.Waterfall(
+        x=['Estimated Book'] + breakdown[level].astype(str).tolist() + ['Annualized'],
+        measure=['absolute'] + ['relative'] * len(breakdown) + ['total'],
+        y=[start] + breakdown['Variance'].tolist() + [0],
+        connector=dict(line=dict(color='#9CA3AF', width=1)),
+        increasing=dict(marker=dict(color='#10B981')),
+        decreasing=dict(marker=dict(color='#EF4444')),
+        totals=dict(marker=dict(color='#3B82F6')),
+        hovertemplate='<b>%{x}</b><br>%{y:$,.0f}<extra></extra>'
+    ))
+    
+    fig.update_layout(
+        title=f'Variance to Estimate by {level}: {scope}',
+        xaxis_title='',
+        yaxis_title='Revenue ($)',
+        plot_bgcolor='white',
+        showlegend=False,
+        margin=dict(l=60, r=30, t=50, b=80),
+        height=450
+    )
+    
+    st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
 
 def plot_heatmap(pivot_data):
     """Create a heatmap visualization for attorney performance"""
@@ -872,6 +3656,10 @@ def plot_heatmap(pivot_data):
         st.info("No data available for heatmap visualization.")
         return
     
+    show_figure('heatmap', heatmap_figure, pivot_data)
+
+def heatmap_figure(pivot_data):
+    """Attorney x month book value heatmap"""
     # Create a custom colorscale from light to dark blue
     colorscale = [
         [0, '#EBF5FF'],  # Lightest blue
@@ -901,7 +3689,7 @@ def plot_heatmap(pivot_data):
         plot_bgcolor='white'
     )
     
-    st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+    return fig
 
 def display_recent_activity(df):
     """Display recent joiners and leavers"""
@@ -910,13 +3698,8 @@ def display_recent_activity(df):
     with col1:
         st.subheader("Recent Joiners")
         if 'Start Date' in df.columns and 'Attorney Name' in df.columns:
-            recent_joiners = df.sort_values('Start Date', ascending=False).head(5)
-            
-            # Format data for display
-            if 'Leave Date' in df.columns:
-                joiners_df = recent_joiners[recent_joiners['Leave Date'].isna()]
-            else:
-                joiners_df = recent_joiners
+            # The five latest starts, including joiners who have since left
+            joiners_df = df.iloc[top_rows(df['Start Date'].to_numpy(), 5)]
             
             if not joiners_df.empty:
                 display_cols = ['Start Date', 'Attorney Name']
@@ -927,6 +3710,9 @@ def display_recent_activity(df):
                 
                 # Apply formatting
                 formatted_joiners = joiners_df[display_cols].copy()
+                if 'Leave Date' in joiners_df.columns:
+                    formatted_joiners['Status'] = np.where(joiners_df['Leave Date'].isna(), 'Active',
+                                                           'Left ' + joiners_df['Leave Date'].dt.strftime('%b %Y'))
                 if 'Estimated Book' in formatted_joiners.columns:
                     formatted_joiners['Estimated Book'] = formatted_joiners['Estimated Book'].apply(lambda x: f"${x:,.0f}")
                 if 'Start Date' in formatted_joiners.columns:
@@ -941,7 +3727,7 @@ def display_recent_activity(df):
     with col2:
         st.subheader("Recent Leavers")
         if 'Leave Date' in df.columns and 'Attorney Name' in df.columns:
-            leavers_df = df[df['Leave Date'].notna()].sort_values('Leave Date', ascending=False).head(5)
+            leavers_df = df.iloc[top_rows(df['Leave Date'].to_numpy(), 5)]
             
             if not leavers_df.empty:
                 display_cols = ['Leave Date', 'Attorney Name']
@@ -965,6 +3751,73 @@ def display_recent_activity(df):
         else:
             st.info("Leavers data not available.")
 
+def display_table_page(roster, sort_index, member, columns, sort_options, key, column_config=None):
+    """One server-side page of a presorted roster table, with its sort order and page picker"""
+    total = int(np.count_nonzero(member)) if member is not None else len(roster)
+    n_pages = max(-(-total // TABLE_PAGE_SIZE), 1)
+    
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        sort_label = st.selectbox("Sort by", options=list(sort_options), key=f"{key}_sort")
+    # A narrower filter can leave the remembered page past the end (the widget takes its
+    # value from the session state only, starting at min_value, so the two never conflict)
+    if st.session_state.get(f"{key}_page", 1) > n_pages:
+        st.session_state[f"{key}_page"] = n_pages
+    with col2:
+        page = st.number_input("Page", min_value=1, max_value=n_pages, step=1, key=f"{key}_page")
+    
+    sort_col, ascending = sort_options[sort_label]
+    positions = table_page(sort_index, sort_col, member, page - 1, ascending=ascending)
+    st.dataframe(roster.iloc[positions][columns], hide_index=True, use_container_width=True,
+                 column_config=column_config)
+    first = (page - 1) * TABLE_PAGE_SIZE
+    st.caption(f"Rows {min(first + 1, total):,}-{first + len(positions):,} of {total:,}")
+
+def display_validation_report(report, frame):
+    """Admin view of the ingestion data-quality report"""
+    if not report:
+        st.info("No data-quality report available.")
+        return
+    
+    rules = pd.DataFrame(report['rules'])
+    flagged = rules[rules['count'] > 0]
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Rows Checked", f"{report['rows_checked']:,}")
+    col2.metric("Errors", int(flagged.loc[flagged['severity'] == 'error', 'count'].sum()))
+    col3.metric("Warnings", int(flagged.loc[flagged['severity'] == 'warning', 'count'].sum()))
+    st.caption(f"{len(rules)} rules checked in {report['seconds'] * 1000:,.0f} ms at ingestion")
+    
+    st.dataframe(
+        rules[['severity', 'rule', 'description', 'count']].rename(columns=str.title),
+        hide_index=True,
+        use_container_width=True
+    )
+    
+    for _, rule in flagged.iterrows():
+        with st.expander(f"{rule['description']} ({rule['count']:,})"):
+            if rule['columns']:
+                st.markdown(f"**Columns:** {', '.join(map(str, rule['columns']))}")
+            if rule['rows']:
+                display_cols = [col for col in ['Attorney Name', 'Billing Name', 'Block', 'Start Date', 'Leave Date',
+                                                'Estimated Book', 'TTM'] if col in frame.columns]
+                sample = frame.iloc[[row for row in rule['rows'] if row < len(frame)]]
+                st.dataframe(sample[display_cols], use_container_width=True)
+                if rule['count'] > len(rule['rows']):
+                    st.caption(f"Showing the first {len(rule['rows'])} of {rule['count']:,} rows")
+
+def display_mapping_report(mapping):
+    """Coverage of the external department / office / practice group mapping"""
+    if not mapping:
+        st.caption("No dimension mapping file (set JOINERS_LEAVERS_MAPPING or add attorney_mapping.csv).")
+        return
+    
+    st.markdown(f"**Dimension mapping:** {mapping['path']} (version {mapping['version']})")
+    st.caption(f"{mapping['matched_rows']:,} of {mapping['rows']:,} rows matched an attorney in the mapping file")
+    if mapping['unmatched_names']:
+        with st.expander(f"Unmatched attorneys ({len(mapping['unmatched_names'])} shown)"):
+            st.write(", ".join(mapping['unmatched_names']))
+
 # Main application
 def main():
     # Check authentication
@@ -981,17 +3834,69 @@ def main():
     # Dashboard header
     st.markdown('<h1 class="main-header">Joiners & Leavers Dashboard</h1>', unsafe_allow_html=True)
     
-    # Load data
+    # Load the shared, read-only dataset (one copy per process, read by reference)
     with st.spinner("Loading data..."):
-        df = load_data()
+        dataset = load_shared_dataset()
+        # A newly published snapshot or an edited mapping file replaces the dataset on the next rerun
+        if dataset_is_stale(dataset):
+            load_shared_dataset.clear()
+            dataset = load_shared_dataset()
+    
+    if dataset['source'] == 'sample':
+        st.warning("⚠️ Could not load data from GitHub or local file. Using sample data.")
+    elif not st.session_state.get('data_source_notified'):
+        st.session_state.data_source_notified = True
+        if dataset['source'] == 'github':
+            st.toast("✅ Data successfully loaded from GitHub")
+        elif dataset['source'] == 'synthetic':
+            st.toast("✅ Using synthetic sample data")
+        elif dataset['source'] == 'workbook':
+            st.toast("✅ Data loaded from the source workbook")
+        else:
+            st.toast("✅ Data loaded from local file")
+    if dataset['error']:
+        st.error(f"Error loading data: {dataset['error']}")
+    if dataset['basis'] == 'Collections':
+        st.warning("The workbook was saved with its toggle on Collections, so monthly figures are collections, not billings.")
     
     # Sidebar filters
     st.sidebar.markdown("### Filters")
     
+    # Point-in-time view: the roster, tenure, TTM and KPIs as they stood on the selected date
+    roster = dataset['frame']
+    as_of_date = datetime.date.today()
+    as_of_view = None
+    if dataset['as_of_index'] is not None:
+        as_of_date = st.sidebar.date_input(
+            "As of",
+            value=datetime.date.today(),
+            help="Show the firm as it stood on this date (e.g. a past quarter-end)"
+        )
+        as_of_view = shared_as_of(dataset, as_of_date)
+        roster = as_of_view['roster']
+    
+    # Optional SQLite backend: today's roster is stored once per dataset version and day,
+    # and filters and aggregations run as SQL against it (past as-of dates stay in pandas)
+    pool = None
+    if sqlite_store_path() and as_of_date == datetime.date.today():
+        pool = cached_sqlite_pool(roster, f"{dataset['version']}:{as_of_date}", sqlite_store_path())
+    
+    # Sidebar widgets build one filter spec, resolved by filter_rows (or compiled to SQL)
+    # exactly as the API server resolves its query string; no frame is copied
+    filters = {}
+    
+    def filter_options(col):
+        """Values of a column among the rows the filters so far have kept"""
+        if pool is not None:
+            return sqlite_store.distinct_values(pool, col, filters)
+        values = roster[col].to_numpy()[filter_rows(roster, filters)]
+        # Non-null values only, like sqlite_store.distinct_values (unmapped attorneys have no department)
+        return sorted(pd.unique(values[pd.notna(values)]).tolist())
+    
     # Date range filter
-    if 'Start Date' in df.columns and not df['Start Date'].isna().all():
-        min_date = df['Start Date'].min().date()
-        max_date = df['Start Date'].max().date()
+    if 'Start Date' in roster.columns and not roster['Start Date'].isna().all():
+        min_date = roster['Start Date'].min().date()
+        max_date = roster['Start Date'].max().date()
         
         date_range = st.sidebar.date_input(
             "Date Range",
@@ -1000,57 +3905,113 @@ def main():
             max_value=max_date
         )
         
-        if len(date_range) == 2:
+        # The full range is no bound, so leavers without a start date stay in view
+        if len(date_range) == 2 and tuple(date_range) != (min_date, max_date):
             start_date, end_date = pd.to_datetime(date_range[0]), pd.to_datetime(date_range[1])
-            df = df[(df['Start Date'] >= start_date) & (df['Start Date'] <= end_date)]
+            filters['start_date'], filters['end_date'] = start_date, end_date
     
     # Year filter
-    if 'Start Year' in df.columns:
-        years = sorted(df['Start Year'].dropna().unique().astype(int).tolist())
+    if 'Start Year' in roster.columns:
+        years = sorted(int(year) for year in filter_options('Start Year'))
         if years:
             selected_years = st.sidebar.multiselect(
                 "Year",
                 options=years,
                 default=years
             )
-            if selected_years:
-                df = df[df['Start Year'].isin(selected_years)]
+            # Every year selected is no bound either
+            if selected_years and len(selected_years) < len(years):
+                filters['years'] = selected_years
     
-    # Attorney filter
-    if 'Attorney Name' in df.columns:
-        attorneys = sorted(df['Attorney Name'].unique().tolist())
+    # Attorney filter: search the name index rather than shipping every name to the browser
+    if 'Attorney Name' in roster.columns:
+        query = st.sidebar.text_input("Find Attorney", key='attorney_query', placeholder="Type a name or group member")
+        selected_attorneys = st.session_state.get('attorney_filter', [])
+        matches = search_names(dataset['name_index'], query, k=20)
         selected_attorneys = st.sidebar.multiselect(
             "Attorney",
-            options=attorneys,
-            default=[]
+            options=selected_attorneys + [name for name in matches if name not in selected_attorneys],
+            key='attorney_filter'
         )
         if selected_attorneys:
-            df = df[df['Attorney Name'].isin(selected_attorneys)]
+            filters['attorneys'] = selected_attorneys
     
     # Department filter
-    if 'Department' in df.columns:
-        departments = sorted(df['Department'].unique().tolist())
+    if 'Department' in roster.columns:
+        departments = filter_options('Department')
         selected_departments = st.sidebar.multiselect(
             "Department",
             options=departments,
             default=[]
         )
         if selected_departments:
-            df = df[df['Department'].isin(selected_departments)]
+            filters['departments'] = selected_departments
     
     # Office filter
-    if 'Office' in df.columns:
-        offices = sorted(df['Office'].unique().tolist())
+    if 'Office' in roster.columns:
+        offices = filter_options('Office')
         selected_offices = st.sidebar.multiselect(
             "Office",
             options=offices,
             default=[]
         )
         if selected_offices:
-            df = df[df['Office'].isin(selected_offices)]
+            filters['offices'] = selected_offices
     
-    # Calculate KPIs from filtered data
-    kpis = calculate_kpis(df)
+    # The session keeps only the row positions of its filtered view
+    if pool is not None:
+        st.session_state.filtered_rows = sqlite_store.filtered_row_ids(pool, filters)
+    else:
+        st.session_state.filtered_rows = filter_rows(roster, filters)
+    df = shared_filtered_view(roster, view_key(dataset, as_of_date, st.session_state.filtered_rows),
+                              st.session_state.filtered_rows)
+    
+    # Roster for headcount: dimension filters only, so attorneys who joined before
+    # the selected date window still count towards the active headcount
+    dimension_filters = {key: filters[key] for key in ('attorneys', 'departments', 'offices') if key in filters}
+    if pool is not None:
+        roster_rows = sqlite_store.filtered_row_ids(pool, dimension_filters)
+    else:
+        roster_rows = filter_rows(roster, dimension_filters)
+    roster_df = shared_filtered_view(roster, view_key(dataset, as_of_date, roster_rows), roster_rows)
+    
+    # Aggregates come from SQLite when it is enabled, else from the pre-aggregated cube
+    # when its month grain answers the filters exactly, else from the filtered rows
+    cube = None
+    if pool is None and as_of_view is not None and cube_is_exact(dataset['as_of_index'], filters):
+        cube = as_of_view['cube']
+    
+    # Independent tab aggregates start together on the shared thread pool; each tab joins
+    # its own result just before rendering, and a newer rerun stops this one's work
+    breakdown_dims = [col for col in ['Department', 'Office'] if col in roster_df.columns]
+    granularity = st.session_state.get('trend_granularity', 'Month')
+    if pool is not None:
+        aggregate_tasks = {
+            'kpis': partial(sqlite_store.kpis, pool, filters),
+            'quarterly': partial(sqlite_store.quarterly_growth, pool, filters),
+            'departments': partial(sqlite_store.department_performance, pool, filters)
+        }
+    elif cube is not None:
+        aggregate_tasks = {
+            'kpis': partial(cube_kpis, cube, filters),
+            'quarterly': partial(cube_quarterly_growth, cube, filters),
+            'departments': partial(cube_department_performance, cube, filters)
+        }
+    else:
+        aggregate_tasks = {
+            'kpis': partial(calculate_kpis, df),
+            'quarterly': partial(quarterly_growth, df),
+            'departments': partial(department_performance, df)
+        }
+    # Start and leave ordinals come from the shared as-of view, computed once per version and date
+    view_ordinals = ordinals_view(as_of_view['ordinals'], st.session_state.filtered_rows) if as_of_view is not None else None
+    aggregate_tasks['trend'] = partial(trend_aggregates, df, roster_df, PERIOD_GRANULARITIES[granularity], breakdown_dims,
+                                       view_ordinals)
+    aggregate_tasks['heatmap'] = partial(create_attorney_heatmap_data, df)
+    st.session_state.aggregate_run = start_aggregates(aggregate_executor(), aggregate_tasks,
+                                                      st.session_state.get('aggregate_run'))
+    aggregates = st.session_state.aggregate_run['futures']
+    kpis = aggregates['kpis'].result()
     
     # Create tabs for different views
     tabs = st.tabs([
@@ -1058,7 +4019,9 @@ def main():
         "📈 Trends", 
         "🔄 Joiners & Leavers", 
         "📊 Department Analysis",
-        "🔥 Heatmap"
+        "🔥 Heatmap",
+        "👤 Attorney Profile",
+        "🩺 Data Quality"
     ])
     
     # Tab 1: Overview
@@ -1066,61 +4029,185 @@ def main():
         # Display KPI cards
         create_kpi_cards(kpis)
         
+        # What the last refresh changed, from the fingerprints of the previous and current loads
+        if dataset['changes'] is not None:
+            changelog = dataset['changes']['changelog']
+            with st.expander(f"Changes Since Last Refresh ({len(changelog):,})"):
+                st.caption(f"Data loaded {dataset['changes']['loaded_at'].replace('T', ' ')} compared with the "
+                           f"previous load of {dataset['changes']['since'].replace('T', ' ')}")
+                if changelog.empty:
+                    st.info("No attorneys were added, removed or revised.")
+                else:
+                    counts = changelog['Change'].value_counts()
+                    for col, (change, count) in zip(st.columns(len(counts)), counts.items()):
+                        col.metric(change, f"{count:,}")
+                    st.dataframe(changelog, hide_index=True, use_container_width=True)
+                    st.download_button(
+                        label="Download Changelog",
+                        data=changelog.to_csv(index=False).encode('utf-8'),
+                        file_name=f"changelog_{dataset['changes']['loaded_at'][:10]}.csv",
+                        mime="text/csv"
+                    )
+        
         st.markdown('<h2 class="sub-header">Recent Activity</h2>', unsafe_allow_html=True)
         display_recent_activity(df)
         
         # Quarterly growth chart
         st.markdown('<h2 class="sub-header">Quarterly Book Value Growth</h2>', unsafe_allow_html=True)
-        quarterly_data = quarterly_growth(df)
-        plot_quarterly_growth(quarterly_data)
+        plot_quarterly_growth(aggregates['quarterly'].result())
+        
+        # Monte Carlo attrition simulation over the as-of roster's history
+        st.markdown('<h2 class="sub-header">Revenue at Risk (Next 24 Months)</h2>', unsafe_allow_html=True)
+        with st.spinner("Simulating attrition scenarios..."):
+            risk_data = cached_revenue_at_risk(roster, dataset['version'], as_of_date)
+        if not risk_data.empty:
+            if filters.get('departments'):
+                risk_data = risk_data[risk_data['Department'].isin(filters['departments'] + ['Firm Total'])]
+            st.dataframe(
+                risk_data,
+                hide_index=True,
+                use_container_width=True,
+                column_config={
+                    'Annualized': st.column_config.NumberColumn('Annualized Revenue', format="$%d"),
+                    'Expected Loss': st.column_config.NumberColumn('Expected Loss', format="$%d"),
+                    'P50 Loss': st.column_config.NumberColumn('P50 Loss', format="$%d"),
+                    'P90 Loss': st.column_config.NumberColumn('P90 Loss', format="$%d"),
+                    'P95 Loss': st.column_config.NumberColumn('P95 Loss', format="$%d"),
+                    'P99 Loss': st.column_config.NumberColumn('P99 Loss', format="$%d")
+                }
+            )
+            st.caption("Annualized revenue lost to leavers within 24 months across 100,000 simulated scenarios, "
+                       "using leave probabilities by tenure from the roster's history.")
+        else:
+            st.info("Not enough start and leave history to simulate attrition.")
     
     # Tab 2: Trends
     with tabs[1]:
         st.markdown('<h2 class="sub-header">Joiners and Leavers Trends</h2>', unsafe_allow_html=True)
-        monthly_data = monthly_joiners_leavers(df)
-        plot_joiners_leavers_trend(monthly_data)
+        
+        # Period granularity; its trend aggregate was started from the widget state before the tabs
+        granularity = st.radio(
+            "Granularity",
+            options=list(PERIOD_GRANULARITIES.keys()),
+            index=1,
+            horizontal=True,
+            key='trend_granularity'
+        )
+        monthly_data, headcount_data = aggregates['trend'].result()
+        
+        plot_joiners_leavers_trend(monthly_data, granularity)
+        
+        if breakdown_dims and not headcount_data.empty:
+            breakdown_dim = st.selectbox("Headcount by", options=breakdown_dims)
+            plot_headcount_breakdown(headcount_data[headcount_data['Dimension'] == breakdown_dim], breakdown_dim, granularity)
+        
+        # Comparison mode: each period side by side with the same period a year (or quarter) earlier
+        st.markdown('<h2 class="sub-header">Period Comparison</h2>', unsafe_allow_html=True)
+        col1, col2 = st.columns(2)
+        with col1:
+            comparison_label = st.radio("Compare", options=list(COMPARISON_MODES.keys()), horizontal=True)
+        with col2:
+            comparison_measure = st.selectbox("Measure", options=COMPARISON_MEASURES)
+        comparison_mode = COMPARISON_MODES[comparison_label]
+        if comparison_lag(PERIOD_GRANULARITIES[granularity], comparison_mode) is None:
+            st.info(f"{comparison_label} needs a granularity finer than {granularity.lower()}s.")
+        else:
+            comparison = period_comparison(df, roster_df, PERIOD_GRANULARITIES[granularity], comparison_mode, view_ordinals) if not df.empty else pd.DataFrame()
+            plot_period_comparison(comparison, comparison_measure, comparison_label)
+            if not comparison.empty:
+                with st.expander("View Comparison Data"):
+                    st.dataframe(
+                        comparison[comparison['Measure'] == comparison_measure].drop(columns=['Measure', 'Date']),
+                        hide_index=True,
+                        use_container_width=True,
+                        column_config={'Change %': st.column_config.NumberColumn('Change %', format="%.1f%%")}
+                    )
         
         # Display trend data table
         with st.expander("View Detailed Trend Data"):
             if not monthly_data.empty:
-                # Format date for display
-                formatted_monthly = monthly_data.copy()
-                formatted_monthly['Date'] = formatted_monthly['Date'].dt.strftime('%b %Y')
-                
-                # Round numeric columns
-                numeric_cols = ['Joiners', 'Leavers', 'Net Change', 'Cumulative Change']
-                formatted_monthly[numeric_cols] = formatted_monthly[numeric_cols].round(0).astype(int)
-                
-                st.dataframe(formatted_monthly[['Date', 'Joiners', 'Leavers', 'Net Change', 'Cumulative Change']], 
-                             use_container_width=True)
+                trend_cols = ['Period', 'Joiners', 'Leavers', 'Net Change', 'Cumulative Change']
+                if 'Active Headcount' in monthly_data.columns:
+                    trend_cols.append('Active Headcount')
+                st.dataframe(monthly_data[trend_cols], use_container_width=True)
             else:
                 st.info("No trend data available.")
+        
+        # Billings to collections: lag and cash conversion from an optional collections export
+        st.markdown('<h2 class="sub-header">Billings to Collections</h2>', unsafe_allow_html=True)
+        collections_file = collections_path()
+        collections = None
+        if collections_file and 'Attorney Name' in roster.columns:
+            try:
+                collections = cached_collection_analytics(roster, dataset['version'], as_of_date, collections_file,
+                                                          file_signature(collections_file))
+            except Exception as e:
+                st.error(f"Could not read {collections_file}: {e}")
+        if collections is not None:
+            collection_rows = roster.index.get_indexer(df.index)
+            summary = collection_summary(collections, collection_rows[collection_rows >= 0])
+            if summary is not None:
+                col1, col2 = st.columns(2)
+                col1.metric("Typical Collection Lag", f"{summary['lag']} months")
+                col2.metric(f"Collected Within {CONVERSION_MAX_LAG} Months", f"{summary['realization']:.1f}%")
+                plot_collections(summary)
+                
+                with st.expander("View Collection Lag by Attorney"):
+                    st.dataframe(
+                        collections['attorneys'][collections['attorneys'].index.isin(df.index)]
+                        .sort_values('Typical Lag', ascending=False),
+                        hide_index=True,
+                        use_container_width=True,
+                        column_config={
+                            'Typical Lag': st.column_config.NumberColumn('Typical Lag (Months)', format="%d"),
+                            'Lag Correlation': st.column_config.NumberColumn('Lag Correlation', format="%.2f"),
+                            'Realization': st.column_config.NumberColumn(f'Collected Within {CONVERSION_MAX_LAG}M', format="%.1f%%")
+                        }
+                    )
+            else:
+                st.info("No billings to compare with collections for the selected filters.")
+        elif not collections_file:
+            st.caption("Add a collections export (JOINERS_LEAVERS_COLLECTIONS or collections.csv, one column per "
+                       "month like the billing months) to see collection lags and cash conversion.")
     
     # Tab 3: Joiners & Leavers
     with tabs[2]:
+        # Tables page through the presorted roster indexes; only the visible page is materialised
+        sort_index = as_of_view['sort_index'] if as_of_view is not None else dataset['sort_index']
+        in_view = None
+        if len(st.session_state.filtered_rows) < len(roster):
+            in_view = np.zeros(len(roster), dtype=bool)
+            in_view[st.session_state.filtered_rows] = True
+        joiner_rows = ~sort_index['left'] if in_view is None else in_view & ~sort_index['left']
+        leaver_rows = sort_index['left'] if in_view is None else in_view & sort_index['left']
+        # Totals read the roster's columns at those positions; no joiner or leaver frame is built
+        joiner_positions, leaver_positions = np.flatnonzero(joiner_rows), np.flatnonzero(leaver_rows)
+        money_columns = {
+            'Estimated Book': st.column_config.NumberColumn('Estimated Book', format="$%d"),
+            'Annualized': st.column_config.NumberColumn('Annualized', format="$%d")
+        }
+        
         col1, col2 = st.columns(2)
         
         with col1:
             st.markdown('<h2 class="sub-header">Joiners Data</h2>', unsafe_allow_html=True)
             if 'Leave Date' in df.columns:
-                joiners_df = df[df['Leave Date'].isna()]
-                
                 st.markdown(f"""
                 <div class="metric-card">
-                    <div class="metric-value">{len(joiners_df)}</div>
+                    <div class="metric-value">{len(joiner_positions)}</div>
                     <div class="metric-label">Total Joiners</div>
                 </div>
                 """, unsafe_allow_html=True)
                 
-                if not joiners_df.empty:
+                if len(joiner_positions):
                     # Display additional joiners stats
-                    if 'Estimated Book' in joiners_df.columns:
+                    if 'Estimated Book' in roster.columns:
                         col1a, col1b = st.columns(2)
                         with col1a:
-                            st.metric("Total Estimated Book", f"${joiners_df['Estimated Book'].sum():,.0f}")
+                            st.metric("Total Estimated Book", f"${roster['Estimated Book'].to_numpy()[joiner_positions].sum():,.0f}")
                         with col1b:
-                            if 'Annualized' in joiners_df.columns:
-                                st.metric("Total Annualized Revenue", f"${joiners_df['Annualized'].sum():,.0f}")
+                            if 'Annualized' in roster.columns:
+                                st.metric("Total Annualized Revenue", f"${roster['Annualized'].to_numpy()[joiner_positions].sum():,.0f}")
                     
                     # Display joiners data table
                     display_cols = ['Start Date', 'Attorney Name']
@@ -1131,8 +4218,12 @@ def main():
                     if 'Department' in df.columns:
                         display_cols.append('Department')
                     
-                    st.dataframe(joiners_df[display_cols].sort_values('Start Date', ascending=False), 
-                                 use_container_width=True)
+                    display_table_page(
+                        roster, sort_index, joiner_rows, display_cols,
+                        {label: option for label, option in JOINER_SORTS.items() if option[0] in sort_index},
+                        key='joiners_table',
+                        column_config=money_columns
+                    )
                 else:
                     st.info("No joiners data available for the selected filters.")
             else:
@@ -1141,24 +4232,24 @@ def main():
         with col2:
             st.markdown('<h2 class="sub-header">Leavers Data</h2>', unsafe_allow_html=True)
             if 'Leave Date' in df.columns:
-                leavers_df = df[df['Leave Date'].notna()]
-                
                 st.markdown(f"""
                 <div class="metric-card">
-                    <div class="metric-value">{len(leavers_df)}</div>
+                    <div class="metric-value">{len(leaver_positions)}</div>
                     <div class="metric-label">Total Leavers</div>
                 </div>
                 """, unsafe_allow_html=True)
                 
-                if not leavers_df.empty:
+                if len(leaver_positions):
                     # Display additional leavers stats
-                    if 'Estimated Book' in leavers_df.columns:
+                    if 'Estimated Book' in roster.columns:
                         col2a, col2b = st.columns(2)
                         with col2a:
-                            st.metric("Total Estimated Book", f"${leavers_df['Estimated Book'].sum():,.0f}")
+                            st.metric("Total Estimated Book", f"${roster['Estimated Book'].to_numpy()[leaver_positions].sum():,.0f}")
                         with col2b:
-                            if 'Tenure Months' in leavers_df.columns:
-                                st.metric("Avg. Tenure (Months)", f"{leavers_df['Tenure Months'].mean():.1f}")
+                            if 'Tenure Months' in roster.columns:
+                                # Mean over known tenures (leavers without a start date have none)
+                                tenure = pd.Series(roster['Tenure Months'].to_numpy()[leaver_positions]).mean()
+                                st.metric("Avg. Tenure (Months)", f"{tenure:.1f}")
                     
                     # Display leavers data table
                     display_cols = ['Leave Date', 'Attorney Name']
@@ -1169,17 +4260,54 @@ def main():
                     if 'Department' in df.columns:
                         display_cols.append('Department')
                     
-                    st.dataframe(leavers_df[display_cols].sort_values('Leave Date', ascending=False), 
-                                 use_container_width=True)
+                    display_table_page(
+                        roster, sort_index, leaver_rows, display_cols,
+                        {label: option for label, option in LEAVER_SORTS.items() if option[0] in sort_index},
+                        key='leavers_table',
+                        column_config=money_columns
+                    )
                 else:
                     st.info("No leavers data available for the selected filters.")
             else:
                 st.info("Leave Date column not found. Cannot identify leavers.")
+        
+        # Revenue forecast for recent joiners (fitted on the as-of roster, cached per version and date)
+        st.markdown('<h2 class="sub-header">Revenue Forecast (Recent Joiners)</h2>', unsafe_allow_html=True)
+        forecast = cached_revenue_forecast(roster, dataset['version'], as_of_date)
+        if not forecast.empty:
+            forecast = forecast[forecast.index.isin(df.index)]
+        
+        if not forecast.empty:
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Next 12M Forecast", f"${forecast['Next 12M Forecast'].sum():,.0f}")
+            with col2:
+                p10, p90 = forecast_total_interval(forecast)
+                st.metric("P10 - P90 Range", f"${p10:,.0f} - ${p90:,.0f}")
+            with col3:
+                st.metric("Year-End Variance to Est", f"${forecast['Year-End Variance to Est'].sum():,.0f}")
+            
+            st.dataframe(
+                forecast,
+                hide_index=True,
+                use_container_width=True,
+                column_config={
+                    'Start Date': st.column_config.DateColumn('Start Date', format="MMM DD, YYYY"),
+                    'Ramp Level': st.column_config.NumberColumn('Ramp Level', format="%.2f"),
+                    'Next 12M Forecast': st.column_config.NumberColumn('Next 12M Forecast', format="$%d"),
+                    'Forecast P10': st.column_config.NumberColumn('Forecast P10', format="$%d"),
+                    'Forecast P90': st.column_config.NumberColumn('Forecast P90', format="$%d"),
+                    'Year-End Annualized': st.column_config.NumberColumn('Year-End Annualized', format="$%d"),
+                    'Year-End Variance to Est': st.column_config.NumberColumn('Year-End Variance to Est', format="$%d")
+                }
+            )
+        else:
+            st.info("No recent joiners with monthly billings available for forecasting.")
     
     # Tab 4: Department Analysis
     with tabs[3]:
         st.markdown('<h2 class="sub-header">Department Performance Analysis</h2>', unsafe_allow_html=True)
-        dept_data = department_performance(df)
+        dept_data = aggregates['departments'].result()
         
         if dept_data is not None and not dept_data.empty:
             col1, col2 = st.columns(2)
@@ -1214,11 +4342,76 @@ def main():
             plot_department_performance(dept_data)
         else:
             st.info("Department data not available for analysis. Make sure the dataset includes a 'Department' column.")
+        
+        # Variance attribution: split the gap between estimated book and annualized revenue
+        # along a chosen hierarchy, then drill into one member of each level
+        st.markdown('<h2 class="sub-header">Variance Attribution</h2>', unsafe_allow_html=True)
+        dimensions = variance_dimensions(df) if {'Estimated Book', 'Variance to Est'} <= set(df.columns) else []
+        if dimensions and not df.empty:
+            hierarchy = st.multiselect(
+                "Attribute variance by",
+                options=dimensions,
+                default=[dim for dim in ('Cohort', 'Department') if dim in dimensions] or dimensions[:1],
+                help="Levels in drill-down order"
+            )
+            if hierarchy:
+                ramp = None
+                if 'Ramp' in hierarchy:
+                    # Ramp comes from the as-of roster (df is a view of it)
+                    ramp = cached_ramp_speed(roster, dataset['version'], as_of_date)[st.session_state.filtered_rows]
+                cells = cached_variance_cells(df, view_key(dataset, as_of_date, st.session_state.filtered_rows),
+                                              tuple(hierarchy), ramp)
+                
+                path = []
+                drill_cols = st.columns(max(len(hierarchy) - 1, 1))
+                for i, level in enumerate(hierarchy[:-1]):
+                    members = variance_breakdown(cells, path)[level].tolist()
+                    with drill_cols[i]:
+                        choice = st.selectbox(f"Drill into {level}", options=['All'] + members, key=f"variance_drill_{i}")
+                    if choice == 'All':
+                        break
+                    path.append(choice)
+                
+                level = hierarchy[len(path)]
+                breakdown = variance_breakdown(cells, path)
+                plot_variance_waterfall(breakdown, level, ' / '.join(path) if path else 'All attorneys')
+                with st.expander("View Variance Attribution Data"):
+                    st.dataframe(
+                        breakdown,
+                        hide_index=True,
+                        use_container_width=True,
+                        column_config={
+                            'Variance': st.column_config.NumberColumn('Variance to Estimate', format="$%d"),
+                            'Estimated Book': st.column_config.NumberColumn('Estimated Book', format="$%d"),
+                            'Annualized': st.column_config.NumberColumn('Annualized Revenue', format="$%d")
+                        }
+                    )
+        else:
+            st.info("Variance attribution needs Estimated Book and Variance to Est columns.")
     
     # Tab 5: Heatmap
     with tabs[4]:
         st.markdown('<h2 class="sub-header">Attorney Performance Heatmap</h2>', unsafe_allow_html=True)
-        pivot_data = create_attorney_heatmap_data(df)
+        
+        # Peer benchmarking: narrow the heatmap to a quartile of a peer group (e.g. top quartile of 2023 hires)
+        peers = cached_peer_percentiles(dataset['frame'], dataset['version'])
+        peer_groups = [group for group in PEER_GROUPS if f"{group} Peers" in peers.columns]
+        heatmap_df = df
+        if peer_groups:
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                quartile = st.selectbox("Show", options=['All attorneys'] + PEER_QUARTILES)
+            with col2:
+                peer_metric = st.selectbox("Ranked on", options=PEER_METRICS)
+            with col3:
+                peer_group = st.selectbox("Within", options=peer_groups)
+            if quartile != 'All attorneys':
+                percentiles = peers[peer_column(peer_metric, peer_group)].reindex(df.index)
+                heatmap_df = filtered_view(df, np.flatnonzero(percentile_quartiles(percentiles) == quartile))
+                st.caption(f"{len(heatmap_df):,} of {len(df):,} attorneys in the {quartile.lower()} "
+                           f"of their {peer_group.lower()} peers on {peer_metric.lower()}")
+        
+        pivot_data = aggregates['heatmap'].result() if heatmap_df is df else create_attorney_heatmap_data(heatmap_df)
         plot_heatmap(pivot_data)
         
         with st.expander("View Heatmap Data"):
@@ -1235,6 +4428,86 @@ def main():
             else:
                 st.info("No data available for heatmap.")
     
+    # Tab 6: Attorney Profile
+    with tabs[5]:
+        st.markdown('<h2 class="sub-header">Attorney Profile</h2>', unsafe_allow_html=True)
+        attorney_index = dataset['attorney_index']
+        if attorney_index is not None and attorney_index['names']:
+            profile_query = st.text_input("Search attorneys", key='profile_query',
+                                          placeholder="Type a name or group member")
+            # Keep the current choice selectable while the query changes
+            current = st.session_state.get('profile_attorney')
+            profile_matches = search_names(dataset['name_index'], profile_query, k=20)
+            selected_name = st.selectbox(
+                "Attorney",
+                options=([current] if current else []) + [name for name in profile_matches if name != current],
+                index=None,
+                placeholder="Choose an attorney",
+                key='profile_attorney'
+            )
+            if selected_name is not None:
+                positions = attorney_index['positions'][selected_name]
+                position = positions[0]
+                if len(positions) > 1:
+                    # The same name on several rows (e.g. a rehire): pick the stint by start date
+                    stints = {
+                        f"Started {dataset['frame']['Start Date'].iloc[p]:%b %d, %Y}"
+                        if 'Start Date' in dataset['frame'].columns and pd.notna(dataset['frame']['Start Date'].iloc[p])
+                        else f"Row {p + 1}": p
+                        for p in positions
+                    }
+                    position = stints[st.radio("Stint", options=list(stints), horizontal=True)]
+                
+                profile = attorney_profile(attorney_index, position)
+                record, profile_kpis = profile['record'], profile['kpis']
+                
+                col1, col2, col3, col4 = st.columns(4)
+                col1.metric("Estimated Book", f"${profile_kpis['estimated_book']:,.0f}")
+                col2.metric("TTM", f"${profile_kpis['ttm']:,.0f}")
+                col3.metric("Annualized", f"${profile_kpis['annualized']:,.0f}",
+                            delta=f"${profile_kpis['variance']:,.0f} vs est")
+                col4.metric("Tenure", f"{profile_kpis['tenure_months']:,.1f} months")
+                
+                details = [f"**{label}:** {record[col]}" for label, col in
+                           (('Department', 'Department'), ('Office', 'Office'), ('Practice group', 'Practice Group'),
+                            ('Billing name', 'Billing Name'))
+                           if col in record.index and pd.notna(record[col])]
+                if 'Start Date' in record.index and pd.notna(record['Start Date']):
+                    details.append(f"**Started:** {record['Start Date']:%b %d, %Y}")
+                if 'Leave Date' in record.index and pd.notna(record['Leave Date']):
+                    details.append(f"**Left:** {record['Leave Date']:%b %d, %Y}")
+                details.append(f"**Months billed:** {profile_kpis['months_billed']}")
+                st.markdown(" · ".join(details))
+                
+                # Where this attorney sits among their peers
+                peers = cached_peer_percentiles(dataset['frame'], dataset['version'])
+                summary = peer_summary(peers, record)
+                if not summary.empty:
+                    st.markdown("**Peer percentiles** (100 = best in group)")
+                    cohort = summary[summary['Peer Group'] == 'Start Year']
+                    if not cohort.empty and pd.notna(cohort['Annualized'].iloc[0]):
+                        st.caption(f"{percentile_quartiles(cohort['Annualized'])[0]} of "
+                                   f"{cohort['Group'].iloc[0]} hires on annualized revenue")
+                    st.dataframe(
+                        summary,
+                        hide_index=True,
+                        use_container_width=True,
+                        column_config={
+                            metric: st.column_config.ProgressColumn(metric, format="%.0f", min_value=0, max_value=100)
+                            for metric in PEER_METRICS
+                        }
+                    )
+                
+                plot_attorney_profile(profile)
+        else:
+            st.info("Attorney data not available.")
+    
+    # Tab 7: Data Quality
+    with tabs[6]:
+        st.markdown('<h2 class="sub-header">Data Quality Report</h2>', unsafe_allow_html=True)
+        display_validation_report(dataset['validation'], dataset['frame'])
+        display_mapping_report(dataset['mapping'])
+    
     # Download filtered data button
     st.sidebar.markdown("---")
     st.sidebar.download_button(
@@ -1247,7 +4520,15 @@ def main():
     # Add timestamp and data info
     st.sidebar.markdown("---")
     st.sidebar.markdown(f"**Data Updated:** {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}")
-    st.sidebar.markdown(f"**Records:** {len(df)} shown of {len(load_data())} total")
+    st.sidebar.markdown(f"**Records:** {len(df)} shown of {len(dataset['frame'])} total")
+    
+    # Memory accounting: shared data is paid once per process, sessions only hold row positions
+    with st.sidebar.expander("Memory Usage"):
+        memory = memory_report(dataset)
+        st.markdown(f"**Shared dataset:** {memory['shared_bytes'] / 1024 ** 2:,.2f} MB (once per process)")
+        st.markdown(f"**This session:** {memory['session_bytes'] / 1024:,.1f} KB")
+        if memory['peak_rss_bytes'] is not None:
+            st.markdown(f"**Process peak RSS:** {memory['peak_rss_bytes'] / 1024 ** 2:,.1f} MB")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,286 @@
+"""Batch renderer for static report packs (PNG pages and a PDF per pack).
+
+Renders the dashboard's KPI cards, joiners/leavers trend, quarterly book
+growth, department performance and attorney heatmap with matplotlib for
+many filter specs at once: a firm-wide pack plus one pack per value of
+each --by column. Aggregates for every pack are computed up front in this
+process from the shared dataset (from the pre-aggregated cube where it
+answers a filter spec exactly), so the process pool workers only receive
+small aggregate tables and do nothing but draw.
+
+Usage:
+    python report_pack.py --by Office --by Department --out reports --format pdf png
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+from matplotlib.backends.backend_pdf import PdfPages  # noqa: E402
+from matplotlib.colors import LinearSegmentedColormap  # noqa: E402
+from matplotlib.figure import Figure  # noqa: E402
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, APP_DIR)
+
+import main as app  # noqa: E402  (the dashboard module; its UI only runs under `streamlit run`)
+
+PAGE_SIZE = (11, 8.5)
+HEATMAP_ATTORNEYS = 40
+BY_FILTERS = {'Department': 'departments', 'Office': 'offices', 'Start Year': 'years'}
+HEATMAP_COLORS = LinearSegmentedColormap.from_list(
+    "book", ['#EBF5FF', '#DBEAFE', '#93C5FD', '#60A5FA', '#3B82F6', '#1E40AF'])
+
+
+def pack_specs(roster, by):
+    """(name, filters) for the firm-wide pack and one pack per value of each `by` column"""
+    specs = [("Firm", {})]
+    for col in by:
+        if col not in roster.columns:
+            raise ValueError(f"cannot split packs by {col!r}: not in the dataset")
+        values = roster[col].dropna()
+        if col == 'Start Year':
+            # Stored as float because attorneys without a start date have no year
+            values = values.astype(int)
+        for value in sorted(pd.unique(values.to_numpy()).tolist()):
+            specs.append((f"{col} - {value}", {BY_FILTERS[col]: [value]}))
+    return specs
+
+
+def pack_aggregates(dataset, roster, cube, filters):
+    """Everything a pack draws, computed the same way the dashboard computes it"""
+    df = app.filtered_view(roster, app.filter_rows(roster, filters))
+    dimension_filters = {key: filters[key] for key in ('attorneys', 'departments', 'offices') if key in filters}
+    roster_df = app.filtered_view(roster, app.filter_rows(roster, dimension_filters))
+
+    # The cube answers KPIs, quarterly growth and departments when its month grain matches the filters
+    if cube is not None and not app.cube_is_exact(dataset['as_of_index'], filters):
+        cube = None
+    kpis = app.cube_kpis(cube, filters) if cube is not None else app.calculate_kpis(df)
+    quarterly = app.cube_quarterly_growth(cube, filters) if cube is not None else app.quarterly_growth(df)
+    departments = (app.cube_department_performance(cube, filters) if cube is not None
+                   else app.department_performance(df))
+
+    trend = pd.DataFrame()
+    if 'Start Date' in df.columns and not df.empty:
+        trend = app.period_event_counts(app.event_ordinals(df), 'M')
+        if not trend.empty:
+            headcount = app.active_headcount(roster_df, 'M', periods=trend['Date'])
+            if not headcount.empty:
+                totals = headcount.set_index('Date')['Headcount']
+                trend = trend.assign(**{'Active Headcount': trend['Date'].map(totals).fillna(0).astype(int)})
+
+    heatmap = app.create_attorney_heatmap_data(df)
+    if heatmap is not None and len(heatmap) > HEATMAP_ATTORNEYS:
+        heatmap = heatmap.loc[heatmap.sum(axis=1).nlargest(HEATMAP_ATTORNEYS).index]
+
+    return {
+        'kpis': kpis,
+        'trend': trend,
+        'quarterly': quarterly,
+        'departments': departments,
+        'heatmap': heatmap,
+        'rows': len(df)
+    }
+
+
+def slug(name):
+    """File-system friendly name for a pack"""
+    return re.sub(r'[^A-Za-z0-9]+', '-', name).strip('-').lower()
+
+
+def new_page(title, subtitle):
+    """A landscape page with the pack title"""
+    fig = Figure(figsize=PAGE_SIZE)
+    fig.suptitle(title, fontsize=16, fontweight='bold', color='#1E3A8A', x=0.05, ha='left')
+    fig.text(0.05, 0.915, subtitle, fontsize=10, color='#6B7280')
+    return fig
+
+
+def no_data(ax, message):
+    """Blank the axes and say why there is no chart"""
+    ax.axis('off')
+    ax.text(0.5, 0.5, message, ha='center', va='center', fontsize=12, color='#6B7280')
+
+
+def money(value):
+    """Dollar amount as shown on the dashboard"""
+    return f"${value:,.0f}"
+
+
+def draw_kpis(fig, kpis):
+    """The dashboard's KPI cards: financial row on top, operational row below"""
+    variance = kpis['total_variance']
+    retention = kpis['retention_rate']
+    rows = [
+        [(money(kpis['total_estimated_book']), "Total Estimated Book Value", '#1E3A8A'),
+         (money(kpis['total_annualized']), "Total Annualized Revenue", '#1E3A8A'),
+         (money(variance), "Overall Variance to Estimate", '#10B981' if variance >= 0 else '#EF4444')],
+        [(money(kpis['revenue_per_attorney']), "Revenue per Attorney", '#1E3A8A'),
+         (f"{kpis['joiners_count']:,}", "Active Attorneys", '#1E3A8A'),
+         (f"{kpis['leavers_count']:,}", "Leavers", '#1E3A8A'),
+         (f"{retention:.1f}%", "Retention Rate",
+          '#10B981' if retention >= 80 else '#FBBF24' if retention >= 70 else '#EF4444')]
+    ]
+    for r, cards in enumerate(rows):
+        for c, (value, label, color) in enumerate(cards):
+            width = 0.9 / len(cards)
+            ax = fig.add_axes([0.05 + c * width + 0.01, 0.55 - r * 0.35, width - 0.02, 0.28])
+            ax.set_xticks([])
+            ax.set_yticks([])
+            ax.set_facecolor('#F9FAFB')
+            for spine in ax.spines.values():
+                spine.set_color('#E5E7EB')
+            ax.text(0.5, 0.58, value, ha='center', va='center', fontsize=20, fontweight='bold', color=color)
+            ax.text(0.5, 0.3, label, ha='center', va='center', fontsize=11, color='#6B7280')
+
+
+def draw_trend(fig, trend):
+    """Monthly joiner/leaver bars with net change, and active headcount on a second axis"""
+    ax = fig.add_axes([0.08, 0.1, 0.82, 0.75])
+    if trend.empty:
+        return no_data(ax, "No valid time-series data available.")
+    x = np.arange(len(trend))
+    ax.bar(x - 0.2, trend['Joiners'], width=0.4, color='#3B82F6', label="Joiners")
+    ax.bar(x + 0.2, trend['Leavers'], width=0.4, color='#EF4444', label="Leavers")
+    ax.plot(x, trend['Net Change'], color='#10B981', linewidth=2.5, label="Net Change")
+    ax.set_ylabel("Monthly Count")
+    secondary = 'Active Headcount' if 'Active Headcount' in trend.columns else 'Cumulative Change'
+    twin = ax.twinx()
+    twin.plot(x, trend[secondary], color='#8B5CF6', linewidth=2.5, linestyle=':', label=secondary)
+    twin.set_ylabel(secondary)
+    step = max(1, len(x) // 12)
+    ax.set_xticks(x[::step], trend['Period'].iloc[::step], rotation=45, ha='right')
+    handles = ax.get_legend_handles_labels()[0] + twin.get_legend_handles_labels()[0]
+    ax.legend(handles=handles, loc='upper left', ncol=4, frameon=False)
+    ax.set_title("Monthly Joiners and Leavers Trend", loc='left')
+
+
+def draw_quarterly(fig, quarterly):
+    """Joiners' book above the axis, leavers' book below, net growth as a line"""
+    ax = fig.add_axes([0.1, 0.12, 0.85, 0.73])
+    if quarterly is None or quarterly.empty:
+        return no_data(ax, "No quarterly book value data available.")
+    x = np.arange(len(quarterly))
+    ax.bar(x, quarterly['Joiners Book'], color='#3B82F6', label="Joiners Book Value")
+    ax.bar(x, -quarterly['Leavers Book'], color='#EF4444', label="Leavers Book Value")
+    ax.plot(x, quarterly['Net Growth'], color='#10B981', linewidth=3, marker='o', label="Net Growth")
+    ax.axhline(0, color='#9CA3AF', linewidth=0.8)
+    ax.yaxis.set_major_formatter(lambda value, _: money(value))
+    ax.set_xticks(x, quarterly['Quarter Label'], rotation=45, ha='right')
+    ax.legend(loc='upper left', ncol=3, frameon=False)
+    ax.set_title("Quarterly Book Value Growth", loc='left')
+
+
+def draw_departments(fig, departments):
+    """Estimated book against annualized revenue per department"""
+    ax = fig.add_axes([0.1, 0.18, 0.85, 0.67])
+    if departments is None or departments.empty:
+        return no_data(ax, "Department data not available.")
+    x = np.arange(len(departments))
+    ax.bar(x - 0.2, departments['Estimated Book'], width=0.4, color='#3B82F6', label="Estimated Book")
+    ax.bar(x + 0.2, departments['Annualized'], width=0.4, color='#10B981', label="Annualized Revenue")
+    ax.yaxis.set_major_formatter(lambda value, _: money(value))
+    ax.set_xticks(x, departments['Department'], rotation=30, ha='right')
+    ax.legend(loc='upper left', ncol=2, frameon=False)
+    ax.set_title("Department Financial Performance", loc='left')
+
+
+def draw_heatmap(fig, heatmap):
+    """Attorney x start-month book values"""
+    ax = fig.add_axes([0.22, 0.08, 0.68, 0.77])
+    if heatmap is None or heatmap.empty:
+        return no_data(ax, "No data available for heatmap.")
+    image = ax.imshow(heatmap.to_numpy(dtype=float), aspect='auto', cmap=HEATMAP_COLORS)
+    ax.set_xticks(np.arange(heatmap.shape[1]), heatmap.columns)
+    ax.set_yticks(np.arange(heatmap.shape[0]), heatmap.index, fontsize=max(5, 10 - len(heatmap) // 8))
+    colorbar = fig.colorbar(image, ax=ax, fraction=0.04, format=lambda value, _: money(value))
+    colorbar.set_label("Book Value ($)")
+    shown = f" (top {len(heatmap)} by book)" if len(heatmap) == HEATMAP_ATTORNEYS else ""
+    ax.set_title(f"Attorney Performance Heatmap by Month{shown}", loc='left')
+
+
+PAGES = [
+    ('kpis', draw_kpis),
+    ('trend', draw_trend),
+    ('quarterly', draw_quarterly),
+    ('departments', draw_departments),
+    ('heatmap', draw_heatmap)
+]
+
+
+def render_pack(args):
+    """Draw one pack's pages; returns the files written"""
+    name, aggregates, subtitle, out_dir, formats = args
+    files = []
+    pdf = PdfPages(os.path.join(out_dir, f"{slug(name)}.pdf")) if 'pdf' in formats else None
+    try:
+        for page, draw in PAGES:
+            fig = new_page(f"Joiners & Leavers: {name}", subtitle)
+            draw(fig, aggregates[page])
+            if pdf is not None:
+                pdf.savefig(fig)
+            if 'png' in formats:
+                png_dir = os.path.join(out_dir, slug(name))
+                os.makedirs(png_dir, exist_ok=True)
+                path = os.path.join(png_dir, f"{page}.png")
+                fig.savefig(path, dpi=150)
+                files.append(path)
+    finally:
+        if pdf is not None:
+            pdf.close()
+            files.append(os.path.join(out_dir, f"{slug(name)}.pdf"))
+    return files
+
+
+def render_packs(dataset, specs, out_dir, formats=('pdf',), as_of_date=None, max_workers=None):
+    """Render a pack per (name, filters) spec across a process pool; returns the files written"""
+    view = app.shared_as_of(dataset, as_of_date or pd.Timestamp.today()) if dataset['as_of_index'] is not None else None
+    roster = view['roster'] if view is not None else dataset['frame']
+    cube = view['cube'] if view is not None else None
+    as_of_label = (view['as_of'] if view is not None else pd.Timestamp.today()).strftime('%b %d, %Y')
+
+    os.makedirs(out_dir, exist_ok=True)
+    tasks = []
+    for name, filters in specs:
+        aggregates = pack_aggregates(dataset, roster, cube, filters)
+        subtitle = f"As of {as_of_label} · {aggregates['rows']:,} attorneys · dataset {dataset['version']}"
+        tasks.append((name, aggregates, subtitle, out_dir, tuple(formats)))
+
+    if len(tasks) == 1:
+        return render_pack(tasks[0])
+
+    max_workers = max_workers or min(len(tasks), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return [path for files in pool.map(render_pack, tasks) for path in files]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--by", action="append", default=[], choices=sorted(BY_FILTERS),
+                        help="also render one pack per value of this column (repeatable)")
+    parser.add_argument("--out", default="reports", help="output directory")
+    parser.add_argument("--format", nargs="+", default=["pdf"], choices=["pdf", "png"])
+    parser.add_argument("--as-of", help="render the firm as it stood on this date (default: today)")
+    parser.add_argument("--workers", type=int, help="render processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    dataset = app.build_shared_dataset()
+    as_of_date = pd.Timestamp(args.as_of).normalize() if args.as_of else None
+    specs = pack_specs(dataset['frame'], args.by)
+    files = render_packs(dataset, specs, args.out, args.format, as_of_date, args.workers)
+    print(f"Rendered {len(specs)} packs ({len(files)} files) to {args.out} "
+          f"in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
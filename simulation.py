@@ -0,0 +1,113 @@
+"""Monte Carlo attrition and revenue-at-risk simulation.
+
+Kept free of Streamlit so that the chunk worker can be pickled and run in a
+process pool from the dashboard (or any other script).
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Largest paths x attorneys block simulated at once (32MB of uniform draws)
+MAX_BLOCK_CELLS = 4_000_000
+
+
+def tenure_hazard(start_months, leave_months, end_month, max_tenure=60, min_exposure=10):
+    """Estimate the monthly leave probability for each month of tenure.
+
+    A life table over the roster history: everyone contributes exposure for
+    each tenure month they were employed (up to leaving, or `end_month` for
+    people still active), and leavers contribute an event in the tenure month
+    they left. Tenure beyond `max_tenure` is pooled into the last month, and
+    months with fewer than `min_exposure` people at risk share one pooled rate.
+
+    start_months / leave_months are month ordinals; leave_months uses -1 for
+    people who have not left.
+    """
+    start_months = np.asarray(start_months, dtype=np.int64)
+    leave_months = np.asarray(leave_months, dtype=np.int64)
+
+    left = leave_months >= 0
+    exit_months = np.where(left, leave_months, end_month)
+    tenure = np.clip(exit_months - start_months, 0, max_tenure - 1)
+
+    # At risk in month k = everyone whose exit tenure is >= k
+    exits = np.bincount(tenure, minlength=max_tenure)
+    at_risk = exits[::-1].cumsum()[::-1]
+    events = np.bincount(tenure[left], minlength=max_tenure)
+
+    hazard = np.zeros(max_tenure)
+    np.divide(events, at_risk, out=hazard, where=at_risk > 0)
+
+    # The tail has little exposure: pool everything from the first sparse month onwards
+    sparse = np.flatnonzero(at_risk < min_exposure)
+    if sparse.size:
+        tail = sparse[0]
+        pooled_risk = at_risk[tail:].sum()
+        hazard[tail:] = events[tail:].sum() / pooled_risk if pooled_risk > 0 else 0
+
+    return np.clip(hazard, 0, 1)
+
+
+def leave_probability_curves(tenure, hazard, horizon):
+    """Cumulative probability of having left by each month of the horizon, per attorney"""
+    months = np.clip(np.asarray(tenure)[:, None] + np.arange(horizon)[None, :], 0, len(hazard) - 1)
+    survival = np.cumprod(1 - hazard[months], axis=1)
+    return 1 - survival
+
+
+def simulate_chunk(args):
+    """Simulate one chunk of scenario paths; returns lost annualized revenue per path and group.
+
+    Each path draws one uniform per attorney and compares it with the
+    attorney's probability of leaving within the horizon, so no path is
+    stepped through time month by month. Paths are drawn in blocks of at
+    most MAX_BLOCK_CELLS paths x attorneys, so a worker's memory does not
+    grow with the roster; the draws are the same as in one block.
+    """
+    leave_probability, annualized, group_codes, n_groups, n_paths, seed = args
+    rng = np.random.default_rng(seed)
+    n_attorneys = len(annualized)
+
+    # Lost run-rate per group: (paths x attorneys) @ (attorneys x groups)
+    weights = np.zeros((n_attorneys, n_groups))
+    weights[np.arange(n_attorneys), group_codes] = annualized
+
+    losses = np.empty((n_paths, n_groups))
+    block = max(1, MAX_BLOCK_CELLS // max(n_attorneys, 1))
+    for lo in range(0, n_paths, block):
+        size = min(block, n_paths - lo)
+        left = rng.random((size, n_attorneys)) < leave_probability[None, :]
+        losses[lo:lo + size] = left @ weights
+    return losses
+
+
+def simulate_revenue_at_risk(tenure, annualized, group_codes, n_groups, hazard, horizon=24,
+                             n_paths=100_000, chunk_size=10_000, max_workers=None, seed=None):
+    """Run `n_paths` attrition scenarios and return the lost-revenue matrix (paths x groups).
+
+    Paths are split into chunks with independent random streams and fanned out
+    across a process pool; small runs are simulated inline.
+    """
+    annualized = np.asarray(annualized, dtype=np.float64)
+    group_codes = np.asarray(group_codes, dtype=np.int64)
+    if len(annualized) == 0:
+        return np.zeros((n_paths, n_groups))
+
+    leave_probability = leave_probability_curves(tenure, hazard, horizon)[:, -1]
+
+    chunk_sizes = [chunk_size] * (n_paths // chunk_size)
+    if n_paths % chunk_size:
+        chunk_sizes.append(n_paths % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+    tasks = [(leave_probability, annualized, group_codes, n_groups, size, chunk_seed)
+             for size, chunk_seed in zip(chunk_sizes, seeds)]
+
+    if len(tasks) == 1:
+        return simulate_chunk(tasks[0])
+
+    max_workers = max_workers or min(len(tasks), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(simulate_chunk, tasks))
+
+    return np.vstack(results)
@@ -0,0 +1,180 @@
+"""Memory-mapped binary snapshot of the cleaned roster and its billings.
+
+Ingestion writes the cleaned frame and the attorney x month cumulative
+billings matrix to one versioned file. Every Streamlit server process
+behind a load balancer then maps it read-only instead of parsing the
+export itself: the numeric, date and billing columns are zero-copy views
+on the mapping, so all workers share one physical copy through the page
+cache and start without re-cleaning or re-hashing the data. Text columns
+are stored as integer codes plus their distinct values and decoded on
+load.
+
+A new version is published by writing a new file under a temporary name
+and renaming it over the old one. Processes pick it up the next time they
+load the dataset; mappings of the previous file stay valid until released.
+
+File layout: an 8-byte magic, the JSON header length (little-endian
+uint64), the JSON header, then each array at a 64-byte aligned offset
+recorded in the header.
+
+Usage:
+    python snapshot_store.py /srv/joiners/snapshot.bin
+"""
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+MAGIC = b'JLSNAP1\n'
+ALIGNMENT = 64
+
+
+def _aligned(offset):
+    """Round an offset up to the array alignment"""
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _json_value(value):
+    """Plain JSON value for a distinct text-column value"""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def read_header(path):
+    """The snapshot's JSON header (None if the file is missing or not a snapshot)"""
+    try:
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            length = int.from_bytes(f.read(8), 'little')
+            header = json.loads(f.read(length))
+    except (OSError, ValueError):
+        return None
+    header['data_offset'] = _aligned(len(MAGIC) + 8 + length)
+    return header
+
+
+def snapshot_version(path):
+    """Dataset version recorded in an existing snapshot (None if missing or unreadable)"""
+    header = read_header(path)
+    return header['version'] if header else None
+
+
+def write_snapshot(df, path, version, arrays=None):
+    """Write a frame (plus extra named arrays) to a snapshot file.
+
+    Skipped when the file already holds this dataset version. The file is
+    written under a temporary name in the same directory and renamed over
+    `path`, so readers in other processes never see a half-written file.
+    """
+    if snapshot_version(path) == version:
+        return path
+
+    blocks, columns, entries = [], [], {}
+    for col in df.columns:
+        values = df[col].to_numpy()
+        if values.dtype.kind in 'biufM':
+            columns.append({'name': str(col), 'kind': 'values'})
+            blocks.append((f"column:{col}", np.ascontiguousarray(values)))
+        else:
+            codes, uniques = pd.factorize(values, use_na_sentinel=True)
+            columns.append({'name': str(col), 'kind': 'text',
+                            'categories': [_json_value(value) for value in uniques]})
+            blocks.append((f"column:{col}", codes.astype(np.int32)))
+    for name, values in (arrays or {}).items():
+        blocks.append((f"array:{name}", np.ascontiguousarray(values)))
+
+    # Offsets are relative to the start of the data section
+    offset = 0
+    for name, values in blocks:
+        offset = _aligned(offset)
+        entries[name] = {'dtype': values.dtype.str, 'shape': list(values.shape), 'offset': offset}
+        offset += values.nbytes
+
+    header = json.dumps({
+        'version': version,
+        'rows': len(df),
+        'columns': columns,
+        'blocks': entries,
+        'attrs': {key: value for key, value in df.attrs.items() if key != 'version'}
+    }, default=str).encode('utf-8')
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix='.snapshot', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC)
+            f.write(len(header).to_bytes(8, 'little'))
+            f.write(header)
+            data_offset = _aligned(len(MAGIC) + 8 + len(header))
+            for name, values in blocks:
+                f.seek(data_offset + entries[name]['offset'])
+                f.write(values.tobytes())
+            f.truncate(data_offset + offset)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+def read_snapshot(path):
+    """Map a snapshot read-only.
+
+    Returns (frame, arrays, version): the frame's numeric and date columns
+    and every extra array are read-only views on the mapping; text columns
+    are decoded from their codes. The frame carries the stored attrs.
+    """
+    header = read_header(path)
+    if header is None:
+        raise ValueError(f"{path} is not a dataset snapshot")
+
+    mapping = np.memmap(path, dtype=np.uint8, mode='r')
+
+    def block(name):
+        entry = header['blocks'][name]
+        start = header['data_offset'] + entry['offset']
+        dtype = np.dtype(entry['dtype'])
+        count = int(np.prod(entry['shape'], dtype=np.int64))
+        return mapping[start:start + count * dtype.itemsize].view(dtype).reshape(entry['shape'])
+
+    columns = {}
+    for column in header['columns']:
+        values = block(f"column:{column['name']}")
+        if column['kind'] == 'text':
+            categories = np.empty(len(column['categories']) + 1, dtype=object)
+            categories[:-1] = column['categories']
+            categories[-1] = np.nan
+            # Code -1 (missing) picks the trailing NaN
+            values = categories[values]
+            values.flags.writeable = False
+        columns[column['name']] = values
+
+    frame = pd.DataFrame(columns, index=pd.RangeIndex(header['rows']), copy=False)
+    frame.attrs.update(header['attrs'])
+    arrays = {name.split(':', 1)[1]: block(name) for name in header['blocks'] if name.startswith('array:')}
+    return frame, arrays, header['version']
+
+
+def main():
+    if len(sys.argv) != 2:
+        print(__doc__)
+        sys.exit(2)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import main as app  # the dashboard module; its UI only runs under `streamlit run`
+
+    path = sys.argv[1]
+    df = app.ingest_dataset()
+    version = app.dataset_version(df)
+    app.write_dataset_snapshot(df, path, version)
+    print(f"Wrote snapshot {version} ({len(df):,} rows) to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""Embedded SQLite analytic backend for the Joiners & Leavers dashboard.
+
+The cleaned roster and its monthly billing facts are written to an indexed
+SQLite file once per dataset version. Sidebar filter specs compile to
+parameterized SQL (so sqlite3's per-connection statement cache reuses the
+prepared statements), and aggregations run inside SQLite. Connections come
+from a small thread-safe pool of read-only connections, so several threads
+or worker processes can share one store file.
+"""
+import json
+import os
+import queue
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+# Roster columns stored in SQL: dataframe column -> (sql column, sql type)
+ROSTER_COLUMNS = {
+    'Attorney Name': ('attorney_name', 'TEXT'),
+    'Start Date': ('start_date', 'TEXT'),
+    'Leave Date': ('leave_date', 'TEXT'),
+    'Start Year': ('start_year', 'INTEGER'),
+    'Estimated Book': ('estimated_book', 'REAL'),
+    'TTM': ('ttm', 'REAL'),
+    'Annualized': ('annualized', 'REAL'),
+    'Variance to Est': ('variance_to_est', 'REAL'),
+    'Tenure Months': ('tenure_months', 'REAL'),
+    'Department': ('department', 'TEXT'),
+    'Office': ('office', 'TEXT')
+}
+
+INDEXED_COLUMNS = ['start_date', 'leave_date', 'start_year', 'attorney_name', 'department', 'office']
+
+# How often a caller waiting for a pooled connection checks whether the pool was closed
+CLOSED_POLL_SECONDS = 0.1
+
+
+def store_version(path):
+    """Dataset version recorded in an existing store (None if missing or unreadable)"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with sqlite3.connect(f"file:{path}?mode=ro", uri=True) as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return row[0] if row else None
+    except sqlite3.Error:
+        return None
+
+
+def build_store(df, path, version, month_columns=()):
+    """Write the roster and monthly billing facts to an indexed SQLite file.
+
+    Skipped when the file already holds this dataset version. The file is
+    built under a temporary name and swapped in atomically, so readers in
+    other processes never see a half-written store.
+    """
+    if store_version(path) == version:
+        return path
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix='.sqlite', dir=directory)
+    os.close(fd)
+
+    # Every roster column exists in SQL (NULL when the export lacks it); the
+    # columns actually present are recorded in meta for the aggregations
+    present = [col for col in ROSTER_COLUMNS if col in df.columns]
+    columns = [(col, sql_col, sql_type) for col, (sql_col, sql_type) in ROSTER_COLUMNS.items()]
+    roster = pd.DataFrame({'row_id': np.arange(len(df))})
+    for col, sql_col, sql_type in columns:
+        if col not in df.columns:
+            roster[sql_col] = None
+            continue
+        values = df[col]
+        if sql_col.endswith('_date'):
+            values = pd.to_datetime(values, errors='coerce').dt.strftime('%Y-%m-%d')
+        roster[sql_col] = values.to_numpy()
+
+    try:
+        with sqlite3.connect(tmp_path) as conn:
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+            column_defs = ', '.join(f"{sql_col} {sql_type}" for _, sql_col, sql_type in columns)
+            conn.execute(f"CREATE TABLE roster (row_id INTEGER PRIMARY KEY, {column_defs})")
+            conn.executemany(
+                f"INSERT INTO roster VALUES ({', '.join('?' * (len(columns) + 1))})",
+                roster.astype(object).where(roster.notna(), None).itertuples(index=False, name=None)
+            )
+            for sql_col in INDEXED_COLUMNS:
+                if sql_col in roster.columns:
+                    conn.execute(f"CREATE INDEX idx_roster_{sql_col} ON roster ({sql_col})")
+
+            # Monthly facts in long form: one row per attorney and billed month
+            conn.execute("CREATE TABLE monthly_billings (row_id INTEGER, month TEXT, amount REAL)")
+            if len(month_columns):
+                billings = df[list(month_columns)].apply(pd.to_numeric, errors='coerce').fillna(0).to_numpy(dtype=float)
+                rows, cols = np.nonzero(billings)
+                months = np.array([str(col)[:7] for col in month_columns])
+                conn.executemany(
+                    "INSERT INTO monthly_billings VALUES (?, ?, ?)",
+                    zip(rows.tolist(), months[cols].tolist(), billings[rows, cols].tolist())
+                )
+            conn.execute("CREATE INDEX idx_billings_month ON monthly_billings (month, row_id)")
+            conn.execute("CREATE INDEX idx_billings_row ON monthly_billings (row_id, month)")
+
+            conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("INSERT INTO meta VALUES ('version', ?)", (version,))
+            conn.execute("INSERT INTO meta VALUES ('columns', ?)", (json.dumps(present),))
+            conn.execute("ANALYZE")
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return path
+
+
+class ConnectionPool:
+    """A fixed-size pool of read-only SQLite connections shared between threads"""
+
+    def __init__(self, path, size=4):
+        self.path = path
+        self._closed = False
+        self._connections = queue.Queue(maxsize=size)
+        for _ in range(size):
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False,
+                                   cached_statements=256)
+            conn.execute("PRAGMA query_only = ON")
+            self._connections.put(conn)
+
+        with self.connection() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'columns'").fetchone()
+        self.columns = set(json.loads(row[0])) if row else set()
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection, waiting for one to be returned if all are in use.
+
+        Raises sqlite3.ProgrammingError once the pool is closed (its store
+        may have been rewritten), including for callers already waiting.
+        """
+        conn = None
+        while conn is None:
+            if self._closed:
+                raise sqlite3.ProgrammingError(f"Connection pool on {self.path} is closed")
+            try:
+                conn = self._connections.get(timeout=CLOSED_POLL_SECONDS)
+            except queue.Empty:
+                pass
+        try:
+            yield conn
+        finally:
+            if self._closed:
+                # Checked out when the pool was closed: close it instead of returning it
+                conn.close()
+            else:
+                self._connections.put(conn)
+
+    def query(self, sql, params=()):
+        """Run a parameterized query and return the result as a DataFrame"""
+        with self.connection() as conn:
+            cursor = conn.execute(sql, params)
+            columns = [description[0] for description in cursor.description]
+            return pd.DataFrame(cursor.fetchall(), columns=columns)
+
+    def close(self):
+        """Close idle connections now, and checked-out ones as they are returned"""
+        self._closed = True
+        while not self._connections.empty():
+            self._connections.get_nowait().close()
+
+
+def compile_filters(filters):
+    """Compile a sidebar filter spec into a SQL WHERE clause and its parameters.
+
+    Supported keys: 'start_date' / 'end_date' (inclusive bounds on Start
+    Date), 'years', 'attorneys', 'departments' and 'offices' (value lists).
+    Values are always bound as parameters, never interpolated.
+    """
+    clauses, params = [], []
+    filters = filters or {}
+
+    if filters.get('start_date') is not None:
+        clauses.append("start_date >= ?")
+        params.append(pd.Timestamp(filters['start_date']).strftime('%Y-%m-%d'))
+    if filters.get('end_date') is not None:
+        clauses.append("start_date <= ?")
+        params.append(pd.Timestamp(filters['end_date']).strftime('%Y-%m-%d'))
+
+    for key, sql_col in (('years', 'start_year'), ('attorneys', 'attorney_name'),
+                         ('departments', 'department'), ('offices', 'office')):
+        values = filters.get(key)
+        if values:
+            clauses.append(f"{sql_col} IN ({', '.join('?' * len(values))})")
+            params.extend(int(v) if key == 'years' else v for v in values)
+
+    where = ' WHERE ' + ' AND '.join(clauses) if clauses else ''
+    return where, params
+
+
+def filtered_row_ids(pool, filters):
+    """Row positions (in the source frame) matching the filters"""
+    where, params = compile_filters(filters)
+    with pool.connection() as conn:
+        rows = conn.execute(f"SELECT row_id FROM roster{where} ORDER BY row_id", params).fetchall()
+    return np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+
+
+def distinct_values(pool, column, filters):
+    """Sorted distinct non-null values of a roster column among the filtered rows"""
+    sql_col = ROSTER_COLUMNS[column][0]
+    where, params = compile_filters(filters)
+    where = (where + ' AND' if where else ' WHERE') + f' {sql_col} IS NOT NULL'
+    with pool.connection() as conn:
+        rows = conn.execute(f"SELECT DISTINCT {sql_col} FROM roster{where} ORDER BY {sql_col}", params).fetchall()
+    return [row[0] for row in rows]
+
+
+def kpis(pool, filters):
+    """The calculate_kpis set computed inside SQLite"""
+    where, params = compile_filters(filters)
+    has_leave_dates = 'Leave Date' in pool.columns
+    row = pool.query(f"""
+        SELECT
+            COALESCE(SUM(estimated_book), 0) AS total_estimated_book,
+            COALESCE(SUM(annualized), 0) AS total_annualized,
+            COALESCE(SUM(variance_to_est), 0) AS total_variance,
+            COUNT(DISTINCT attorney_name) AS num_attorneys,
+            SUM(leave_date IS NULL) AS joiners_count,
+            SUM(leave_date IS NOT NULL) AS leavers_count,
+            COUNT(*) AS total,
+            AVG(tenure_months) AS avg_tenure_months,
+            AVG(CASE WHEN leave_date IS NOT NULL THEN tenure_months END) AS avg_leaver_tenure_months
+        FROM roster{where}
+    """, params).iloc[0].astype(float)
+
+    total = int(row['total'])
+    joiners_count = int(row['joiners_count']) if has_leave_dates and pd.notna(row['joiners_count']) else total
+    return {
+        'total_estimated_book': float(row['total_estimated_book']),
+        'total_annualized': float(row['total_annualized']),
+        'total_variance': float(row['total_variance']),
+        'revenue_per_attorney': float(row['total_annualized']) / row['num_attorneys'] if row['num_attorneys'] else 0,
+        'joiners_count': joiners_count,
+        'leavers_count': total - joiners_count,
+        'retention_rate': (joiners_count / total) * 100 if total else (0 if has_leave_dates else 100),
+        'avg_tenure_months': float(row['avg_tenure_months']) if 'Tenure Months' in pool.columns else 0,
+        'avg_leaver_tenure_months': float(row['avg_leaver_tenure_months'])
+        if pd.notna(row['avg_leaver_tenure_months']) else 0
+    }
+
+
+def quarterly_growth(pool, filters):
+    """Joiners' and leavers' estimated book per start quarter, grouped in SQLite"""
+    where, params = compile_filters(filters)
+    where = (where + ' AND' if where else ' WHERE') + ' start_date IS NOT NULL'
+    if 'Start Date' not in pool.columns or 'Estimated Book' not in pool.columns:
+        return pd.DataFrame()
+    data = pool.query(f"""
+        SELECT
+            strftime('%Y', start_date) || 'Q' || ((CAST(strftime('%m', start_date) AS INTEGER) + 2) / 3) AS quarter,
+            SUM(CASE WHEN leave_date IS NULL THEN estimated_book ELSE 0 END) AS joiners_book,
+            SUM(CASE WHEN leave_date IS NOT NULL THEN estimated_book ELSE 0 END) AS leavers_book
+        FROM roster{where}
+        GROUP BY quarter
+        ORDER BY quarter
+    """, params)
+    if data.empty:
+        return pd.DataFrame()
+
+    quarterly_data = pd.DataFrame({
+        'Quarter': pd.PeriodIndex(data['quarter'], freq='Q'),
+        'Joiners Book': data['joiners_book'].astype(float),
+        'Leavers Book': data['leavers_book'].astype(float)
+    })
+    quarterly_data['Net Growth'] = quarterly_data['Joiners Book'] - quarterly_data['Leavers Book']
+    quarterly_data['Quarter Label'] = quarterly_data['Quarter'].astype(str)
+    return quarterly_data
+
+
+def department_performance(pool, filters):
+    """Per-department sums and ratios, grouped in SQLite (None without departments)"""
+    if 'Department' not in pool.columns:
+        return None
+
+    where, params = compile_filters(filters)
+    where = (where + ' AND' if where else ' WHERE') + ' department IS NOT NULL'
+    data = pool.query(f"""
+        SELECT
+            department AS "Department",
+            SUM(estimated_book) AS "Estimated Book",
+            SUM(annualized) AS "Annualized",
+            COUNT(DISTINCT attorney_name) AS "Attorney Name",
+            SUM(variance_to_est) AS "Variance to Est"
+        FROM roster{where}
+        GROUP BY department
+        ORDER BY department
+    """, params)
+    if data.empty:
+        return None
+
+    data['Revenue per Attorney'] = data['Annualized'] / data['Attorney Name'].where(data['Attorney Name'] > 0, 1)
+    data['Performance Ratio'] = (data['Annualized'] / data['Estimated Book'].where(data['Estimated Book'] > 0, 1)) * 100
+    return data
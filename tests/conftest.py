@@ -0,0 +1,24 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import main as app
+
+
+@pytest.fixture
+def sample_roster():
+    """Cleaned synthetic roster (seeded, so every run sees the same data)"""
+    np.random.seed(7)
+    return app.clean_data(app.create_sample_data(200))
+
+
+@pytest.fixture
+def export_roster():
+    """Cleaned copy of the bundled CSV export (leavers without start dates included)"""
+    return app.clean_data(pd.read_csv(os.path.join(ROOT, '2023_Joiners_Leavers.csv')))
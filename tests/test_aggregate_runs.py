@@ -0,0 +1,35 @@
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+import pytest
+
+import main as app
+
+
+def test_superseded_task_does_not_start():
+    token = threading.Event()
+    calls = []
+    token.set()
+    with pytest.raises(CancelledError):
+        app.run_aggregate(lambda: calls.append(1), token)
+    assert calls == []
+
+
+def test_newer_run_cancels_the_queued_work_of_the_one_it_replaces():
+    started, release = threading.Event(), threading.Event()
+
+    def running():
+        started.set()
+        release.wait()
+        return 'finished'
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        first = app.start_aggregates(executor, {'running': running, 'queued': lambda: 'stale'})
+        started.wait()
+        second = app.start_aggregates(executor, {'running': lambda: 'fresh'}, superseded=first)
+        release.set()
+        
+        assert first['superseded'].is_set()
+        assert first['futures']['running'].result() == 'finished'
+        assert first['futures']['queued'].cancelled()
+        assert second['futures']['running'].result() == 'fresh'
@@ -0,0 +1,67 @@
+import http.client
+import json
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import api_server
+import main as app
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(api_server.AggregateHandler, 'cache', api_server.ResponseCache())
+    monkeypatch.setattr(api_server.AggregateHandler, 'datasets', api_server.DatasetHolder())
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), api_server.AggregateHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def get(port, path, headers=None):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    try:
+        connection.request('GET', path, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, response.getheader('ETag'), response.read()
+    finally:
+        connection.close()
+
+
+def test_kpis_then_not_modified(server):
+    status, etag, body = get(server, '/kpis?years=2024')
+    assert status == 200
+    payload = json.loads(body)
+    assert payload['filters'] == {'years': [2024]}
+    assert 'joiners_count' in payload['data']
+
+    status, again, body = get(server, '/kpis?years=2024', {'If-None-Match': etag})
+    assert (status, again, body) == (304, etag, b'')
+
+    # A different query is a different resource
+    status, other, _ = get(server, '/kpis?years=2023', {'If-None-Match': etag})
+    assert status == 200 and other != etag
+
+
+@pytest.mark.parametrize('query', ['freq=X', 'years=last'])
+def test_bad_parameters_are_rejected(server, query):
+    status, _, body = get(server, f'/monthly?{query}')
+    assert status == 400
+    assert 'error' in json.loads(body)
+
+
+def test_as_of_without_start_dates_is_rejected(server, monkeypatch):
+    dataset = dict(app.build_shared_dataset(record_changes=False), as_of_index=None)
+    monkeypatch.setattr(api_server.AggregateHandler.datasets, 'get', lambda: dataset)
+    status, _, _ = get(server, '/kpis?as_of=2024-06-30')
+    assert status == 400
+
+
+def test_loading_does_not_record_fingerprints(monkeypatch):
+    def record_fingerprint(fingerprint):
+        raise AssertionError("the API server moved the dashboard's changelog baseline")
+    monkeypatch.setattr(app, 'record_fingerprint', record_fingerprint)
+    assert api_server.DatasetHolder().get()['changes'] is None
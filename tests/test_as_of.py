@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+import main as app
+
+
+def test_as_of_today_keeps_the_export_figures(export_roster):
+    view = app.as_of(app.build_as_of_index(export_roster), pd.Timestamp.today())
+    roster = view['roster']
+    assert len(roster) == len(export_roster)
+    for col in ['TTM', 'Annualized', 'Variance to Est']:
+        np.testing.assert_allclose(roster[col].to_numpy(), export_roster.loc[roster.index, col].to_numpy(), err_msg=col)
+
+
+def test_as_of_today_matches_the_unfiltered_kpis(export_roster):
+    view = app.as_of(app.build_as_of_index(export_roster), pd.Timestamp.today())
+    kpis = app.calculate_kpis(view['roster'])
+    expected = app.calculate_kpis(export_roster)
+    assert kpis['leavers_count'] == expected['leavers_count'] == 8
+    assert kpis['joiners_count'] == expected['joiners_count']
+    np.testing.assert_allclose(kpis['retention_rate'], expected['retention_rate'])
+
+
+def test_leavers_without_start_count_once_they_have_left(export_roster):
+    index = app.build_as_of_index(export_roster)
+    no_start = app.leavers_without_start(export_roster)
+    date = pd.Timestamp('2023-07-31')
+    roster = app.as_of(index, date)['roster']
+
+    expected = export_roster.index[no_start & (export_roster['Leave Date'] <= date)]
+    included = roster.index[roster['Start Date'].isna()]
+    assert sorted(included) == sorted(expected)
+    assert roster.loc[included, 'Leave Date'].notna().all()
+    assert roster.loc[included, 'Tenure Months'].isna().all()
+    assert app.calculate_kpis(roster)['leavers_count'] == len(expected)
+
+
+def test_as_of_past_date_blanks_later_events(sample_roster):
+    index = app.build_as_of_index(sample_roster)
+    date = sample_roster['Start Date'].quantile(0.5)
+    roster = app.as_of(index, date)['roster']
+
+    started = sample_roster['Start Date'] <= date
+    assert sorted(roster.index) == sorted(sample_roster.index[started])
+    assert (roster['Leave Date'].dropna() <= date).all()
+    assert (roster['Tenure Months'] >= 0).all()
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import main as app
+
+
+def month_filters(roster):
+    """Filter specs the cube answers exactly: none, whole-month windows, years and dimensions"""
+    starts = roster['Start Date'].dropna()
+    first = starts.min() + pd.offsets.MonthBegin(1)
+    last = starts.max() - pd.offsets.MonthEnd(1)
+    years = sorted(int(year) for year in roster['Start Year'].dropna().unique())
+    specs = [
+        {},
+        {'start_date': first, 'end_date': last},
+        {'years': years[:1]},
+    ]
+    for key, col in (('departments', 'Department'), ('offices', 'Office'), ('attorneys', 'Attorney Name')):
+        if col in roster.columns:
+            values = sorted(roster[col].dropna().unique())
+            specs.append({key: values[:2]})
+    return specs
+
+
+def assert_kpis_equal(expected, actual):
+    assert expected.keys() == actual.keys()
+    for key, value in expected.items():
+        np.testing.assert_allclose(actual[key], value, rtol=1e-9, err_msg=key)
+
+
+@pytest.fixture(params=['sample_roster', 'export_roster'])
+def roster(request):
+    return request.getfixturevalue(request.param)
+
+
+def test_cube_answers_are_exact(roster):
+    index = app.build_as_of_index(roster)
+    for filters in month_filters(roster):
+        assert app.cube_is_exact(index, filters), filters
+
+
+def test_cube_kpis_match_calculate_kpis(roster):
+    cube = app.build_cube(roster)
+    for filters in month_filters(roster):
+        df = roster.take(app.filter_rows(roster, filters))
+        assert_kpis_equal(app.calculate_kpis(df), app.cube_kpis(cube, filters))
+
+
+def test_cube_quarterly_growth_matches_quarterly_growth(roster):
+    cube = app.build_cube(roster)
+    columns = ['Quarter Label', 'Joiners Book', 'Leavers Book', 'Net Growth']
+    for filters in month_filters(roster):
+        expected = app.quarterly_growth(roster.take(app.filter_rows(roster, filters)))
+        actual = app.cube_quarterly_growth(cube, filters)
+        if expected.empty:
+            assert actual.empty, filters
+            continue
+        pd.testing.assert_frame_equal(actual[columns].reset_index(drop=True),
+                                      expected[columns].reset_index(drop=True),
+                                      check_dtype=False)
+
+
+def test_cube_department_performance_matches_department_performance(roster):
+    if 'Department' not in roster.columns:
+        pytest.skip("The export carries no Department column")
+    cube = app.build_cube(roster)
+    for filters in month_filters(roster):
+        expected = app.department_performance(roster.take(app.filter_rows(roster, filters)))
+        actual = app.cube_department_performance(cube, filters)
+        pd.testing.assert_frame_equal(actual[expected.columns].reset_index(drop=True),
+                                      expected.reset_index(drop=True),
+                                      check_dtype=False)
@@ -0,0 +1,37 @@
+import json
+
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+from streamlit.testing.v1 import AppTest
+
+from conftest import ROOT
+
+SCRIPT = f"""
+import sys
+
+import pandas as pd
+import plotly.express as px
+
+sys.path.insert(0, {ROOT!r})
+import main as app
+
+data = pd.DataFrame({{'Quarter': ['2024Q1', '2024Q2'], 'Book': [100.0, 250.0]}})
+app.show_figure('test_bar', lambda frame, title: px.bar(frame, x='Quarter', y='Book', title=title), data, 'Book')
+"""
+
+
+def test_show_figure_renders_the_cached_spec():
+    at = AppTest.from_string(SCRIPT, default_timeout=120)
+    # The second run renders from the cached spec
+    at.run()
+    at.run()
+    assert not at.exception
+    charts = at.get('plotly_chart')
+    assert len(charts) == 1
+    data = pd.DataFrame({'Quarter': ['2024Q1', '2024Q2'], 'Book': [100.0, 250.0]})
+    expected = json.loads(pio.to_json(px.bar(data, x='Quarter', y='Book', title='Book'), validate=False))
+    spec = json.loads(charts[0].proto.figure.spec)
+    assert spec['data'] == expected['data']
+    assert spec['layout']['title'] == expected['layout']['title']
+    assert json.loads(charts[0].proto.figure.config)['displayModeBar'] is False
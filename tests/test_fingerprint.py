@@ -0,0 +1,42 @@
+import pytest
+
+import main as app
+
+
+@pytest.fixture(autouse=True)
+def fingerprint_directory(tmp_path, monkeypatch):
+    monkeypatch.setenv('JOINERS_LEAVERS_FINGERPRINTS', str(tmp_path))
+
+
+def next_day(df):
+    """The same export loaded a day later: only the tenure measured to today moves"""
+    return df.assign(**{'Tenure Months': df['Tenure Months'] + 1 / 30.44})
+
+
+def test_fingerprint_version_ignores_volatile_columns(export_roster):
+    assert app.dataset_version(next_day(export_roster)) != app.dataset_version(export_roster)
+    assert (app.dataset_fingerprint(next_day(export_roster))['version'] ==
+            app.dataset_fingerprint(export_roster)['version'])
+
+
+def test_reloading_the_same_export_keeps_the_last_changes(export_roster):
+    restated = export_roster.copy()
+    month = app.billing_month_columns(restated)[0]
+    restated.loc[0, month] = restated.loc[0, month] + 1000
+
+    assert app.dataset_changes(export_roster) is None
+    first = app.dataset_changes(restated)
+    later = app.dataset_changes(next_day(restated))
+
+    for changes in (first, later):
+        changelog = changes['changelog']
+        assert changelog['Change'].tolist() == ['Billings restated']
+        assert changelog['Attorney Name'].tolist() == [export_roster.loc[0, 'Attorney Name']]
+    assert later['since'] == first['since']
+
+
+def test_removed_rows_stay_reported_after_a_reload(export_roster):
+    app.dataset_changes(export_roster)
+    app.dataset_changes(export_roster.iloc[:-1])
+    changes = app.dataset_changes(next_day(export_roster.iloc[:-1]))
+    assert changes['changelog']['Change'].tolist() == ['Removed']
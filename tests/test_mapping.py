@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import main as app
+
+
+def write_mapping(tmp_path, text):
+    path = tmp_path / 'attorney_mapping.csv'
+    path.write_text(text)
+    return str(path)
+
+
+@pytest.fixture
+def roster():
+    return app.clean_data(pd.DataFrame({
+        'Attorney Name': ['Jane Doe', 'John Roe'],
+        'Start Date': ['2020-03-01', '2021-06-01'],
+        'Leave Date': [None, None],
+        'Estimated Book': [500000, 750000]
+    }))
+
+
+def test_header_only_mapping_maps_nobody(tmp_path, roster):
+    path = write_mapping(tmp_path, "Attorney Name,Department,Office,Effective Date\n")
+    mapping = app.load_mapping(path, app.file_signature(path))
+    names = roster['Attorney Name'].to_numpy(dtype=object)
+    days = np.zeros(len(roster), dtype=np.int64)
+    joined = app.cached_dimension_join(names, days, 'header-only', mapping, mapping['version'])
+    assert not joined['matched'].any()
+    assert all(value is None for values in joined['columns'].values() for value in values)
+
+    mapped = app.join_dimension_mapping(roster, path)
+    assert mapped.attrs['mapping']['matched_rows'] == 0
+    assert mapped['Department'].isna().all()
+    assert 'error' not in mapped.attrs
+
+
+def test_failed_join_falls_back_to_the_unmapped_roster(tmp_path, roster, monkeypatch):
+    path = write_mapping(tmp_path, "Attorney Name,Department\nJane Doe,Tax\n")
+
+    def broken_join(*args):
+        raise IndexError("index 0 is out of bounds")
+
+    monkeypatch.setattr(app, 'cached_dimension_join', broken_join)
+    mapped = app.join_dimension_mapping(roster, path)
+    assert 'mapping' not in mapped.attrs
+    assert 'Department' not in mapped.columns
+    assert 'index 0 is out of bounds' in mapped.attrs['error']
+
+
+def test_coverage_counts_attorneys_mapped_without_a_department(tmp_path, roster):
+    path = write_mapping(tmp_path, "Attorney Name,Department,Office,Effective Date\nJane Doe,,Chicago,2020-01-01\n")
+    mapped = app.join_dimension_mapping(roster, path)
+    assert mapped.loc[mapped['Attorney Name'] == 'Jane Doe', 'Office'].tolist() == ['Chicago']
+    assert mapped.attrs['mapping']['matched_rows'] == 1
+    assert mapped.attrs['mapping']['unmatched_names'] == ['John Roe']
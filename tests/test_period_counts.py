@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import main as app
+
+
+def groupby_counts(dates, freq):
+    """Events per period the way monthly_joiners_leavers used to count them: to_period and groupby"""
+    periods = pd.to_datetime(dates, errors='coerce').dropna().dt.to_period(freq)
+    return periods.groupby(periods).size().rename(index=lambda period: period.start_time)
+
+
+@pytest.fixture(params=['sample_roster', 'export_roster'])
+def roster(request):
+    return request.getfixturevalue(request.param)
+
+
+@pytest.mark.parametrize('freq', ['W', 'M', 'Q', 'Y'])
+def test_period_counts_match_groupby(roster, freq):
+    counts = app.monthly_joiners_leavers(roster, freq).set_index('Date')
+
+    # A complete calendar: one row per period, none missing
+    expected_dates = pd.period_range(counts.index[0], counts.index[-1], freq=freq).start_time
+    pd.testing.assert_index_equal(counts.index, expected_dates, check_names=False)
+
+    for label, col in (('Joiners', 'Start Date'), ('Leavers', 'Leave Date')):
+        expected = groupby_counts(roster[col], freq).reindex(counts.index, fill_value=0)
+        np.testing.assert_array_equal(counts[label].to_numpy(), expected.to_numpy(), err_msg=label)
+
+    np.testing.assert_array_equal(counts['Cumulative Change'].to_numpy(),
+                                  np.cumsum(counts['Joiners'] - counts['Leavers']).to_numpy())
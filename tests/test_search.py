@@ -0,0 +1,49 @@
+import pandas as pd
+import pytest
+
+import main as app
+
+
+def brute_force_search(df, query, k=10):
+    """Rank every name by scanning its aliases: first-word matches first, then alphabetical"""
+    terms = app.normalise_name(query).split()
+    alias_cols = [col for col in df.columns if col in ('Attorney Name', 'Billing Name') or col.startswith('Group Member')]
+    ranked = []
+    for name in sorted(df['Attorney Name'].dropna().astype(str).unique()):
+        rows = df[df['Attorney Name'] == name]
+        aliases = [app.normalise_name(alias).split() for col in alias_cols for alias in rows[col].dropna().astype(str)]
+        tokens = [token for alias in aliases for token in alias]
+        if all(any(token.startswith(term) for token in tokens) for term in terms):
+            first = any(alias and alias[0].startswith(terms[0]) for alias in aliases)
+            ranked.append((not first, name))
+    return [name for _, name in sorted(ranked)[:k]]
+
+
+def queries(roster):
+    """Single letters, name prefixes and two-word prefixes taken from the roster itself"""
+    names = sorted(roster['Attorney Name'].dropna().astype(str).unique())
+    words = [name.split() for name in names[::7]]
+    return (['a', 'j', 'm', 'zz'] + [parts[-1][:3] for parts in words] +
+            [f"{parts[0][:2]} {parts[-1][:2]}" for parts in words if len(parts) > 1])
+
+
+@pytest.fixture(params=['sample_roster', 'export_roster'])
+def roster(request):
+    return request.getfixturevalue(request.param)
+
+
+@pytest.mark.parametrize('k', [1, 3, 10])
+def test_search_names_matches_brute_force_ranking(roster, k):
+    index = app.build_name_index(roster)
+    for query in queries(roster):
+        assert app.search_names(index, query, k) == brute_force_search(roster, query, k), query
+
+
+def test_search_names_finds_aliases(export_roster):
+    aliased = export_roster[export_roster['Billing Name'].notna() &
+                            (export_roster['Billing Name'] != export_roster['Attorney Name'])]
+    if aliased.empty:
+        pytest.skip("No billing names differ from attorney names")
+    row = aliased.iloc[0]
+    index = app.build_name_index(export_roster)
+    assert row['Attorney Name'] in app.search_names(index, row['Billing Name'], k=50)
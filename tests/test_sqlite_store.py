@@ -0,0 +1,68 @@
+import sqlite3
+import threading
+
+import numpy as np
+import pytest
+
+import main as app
+import sqlite_store
+from test_cube import month_filters
+
+
+@pytest.fixture(params=['sample_roster', 'export_roster'])
+def store(request, tmp_path):
+    roster = request.getfixturevalue(request.param)
+    path = str(tmp_path / 'roster.sqlite')
+    sqlite_store.build_store(roster, path, 'test', app.billing_month_columns(roster))
+    pool = sqlite_store.ConnectionPool(path)
+    yield roster, pool
+    pool.close()
+
+
+def test_filtered_row_ids_match_filter_rows(store):
+    roster, pool = store
+    for filters in month_filters(roster):
+        np.testing.assert_array_equal(np.sort(sqlite_store.filtered_row_ids(pool, filters)),
+                                      app.filter_rows(roster, filters), err_msg=str(filters))
+
+
+def test_kpis_match_calculate_kpis(store):
+    roster, pool = store
+    for filters in month_filters(roster):
+        expected = app.calculate_kpis(roster.take(app.filter_rows(roster, filters)))
+        actual = sqlite_store.kpis(pool, filters)
+        for key in ('joiners_count', 'leavers_count', 'total_estimated_book', 'total_annualized'):
+            np.testing.assert_allclose(actual[key], expected[key], rtol=1e-9, err_msg=f"{key} {filters}")
+
+
+def test_connection_after_close_raises(store):
+    _, pool = store
+    pool.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        with pool.connection():
+            pass
+
+
+def test_waiting_for_a_connection_stops_when_the_pool_closes(store):
+    _, pool = store
+    held = [pool.connection() for _ in range(pool._connections.maxsize)]
+    for context in held:
+        context.__enter__()
+
+    errors = []
+
+    def wait_for_connection():
+        try:
+            with pool.connection():
+                pass
+        except sqlite3.ProgrammingError as e:
+            errors.append(e)
+
+    waiter = threading.Thread(target=wait_for_connection)
+    waiter.start()
+    pool.close()
+    waiter.join(timeout=5)
+    assert not waiter.is_alive()
+    assert len(errors) == 1
+    for context in held:
+        context.__exit__(None, None, None)
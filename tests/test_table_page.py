@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import main as app
+
+
+@pytest.fixture(params=['sample_roster', 'export_roster'])
+def roster(request):
+    return request.getfixturevalue(request.param)
+
+
+def expected_order(roster, col, member, ascending):
+    """The rows a full sort shows: sort_values on the key, missing values last"""
+    rows = roster if member is None else roster[member]
+    return rows[col].sort_values(ascending=ascending, na_position='last', kind='stable')
+
+
+@pytest.mark.parametrize('ascending', [False, True])
+@pytest.mark.parametrize('page_size', [7, 50])
+def test_table_pages_match_sort_values(roster, ascending, page_size):
+    sort_index = app.build_sort_index(roster)
+    left = sort_index['left']
+    for col in app.SORT_KEYS:
+        for member in (None, left, ~left):
+            expected = expected_order(roster, col, member, ascending)
+            pages = []
+            for page in range(len(expected) // page_size + 2):
+                positions = app.table_page(sort_index, col, member, page, page_size, ascending)
+                # Ties may come in either order, so compare the keys shown on each page
+                head = expected.iloc[page * page_size:(page + 1) * page_size]
+                np.testing.assert_array_equal(roster[col].to_numpy()[positions], head.to_numpy(),
+                                              err_msg=f"{col} page {page}")
+                pages.append(positions)
+            # Every row appears on exactly one page
+            shown = np.concatenate(pages)
+            assert len(np.unique(shown)) == len(shown) == len(expected)
+            np.testing.assert_array_equal(np.sort(shown), np.sort(roster.index.get_indexer(expected.index)))
+
+
+@pytest.mark.parametrize('largest', [True, False])
+@pytest.mark.parametrize('k', [1, 5, 10_000])
+def test_top_rows_match_sort_values_head(roster, largest, k):
+    for col in ('Start Date', 'Estimated Book', 'Annualized'):
+        values = roster[col]
+        positions = app.top_rows(values.to_numpy(), k, largest)
+        expected = values.dropna().sort_values(ascending=not largest, kind='stable').head(k)
+        np.testing.assert_array_equal(values.to_numpy()[positions], expected.to_numpy(), err_msg=col)